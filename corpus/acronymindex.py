@@ -0,0 +1,129 @@
+from corpus.cachemeta import TableMeta
+from corpus.event import EventStorage
+from corpus.normalizer import EventNormalizer
+from corpus.sqlpool import ConnectionPool
+from lodstorage.sql import SQLDB
+import time
+
+class AcronymIndex(object):
+    '''
+    inverted index of normalized acronym tokens to the events of all data sources
+    persisted in the EventCorpus.db and kept in memory for fast lookups
+    '''
+    tableName="acronymindex"
+
+    def __init__(self,sqlDB:SQLDB,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database with the event tables
+            debug(bool): if True show progress information
+        '''
+        self.sqlDB=sqlDB
+        self.debug=debug
+        # token and (token,year) -> set of (sourceTable,eventId) refs - loaded lazily
+        self.tokenIndex=None
+        # (sourceTable,eventId) -> (stem,year)
+        self.refs=None
+
+    def ensureTable(self):
+        '''
+        make sure my table exists
+        '''
+        tableName=AcronymIndex.tableName
+        self.sqlDB.execute(f"CREATE TABLE IF NOT EXISTS {tableName} (token TEXT,year INTEGER,stem TEXT,acronym TEXT,sourceTable TEXT,eventId TEXT)")
+        self.sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_token ON {tableName}(token,year)")
+        self.sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_sourceTable ON {tableName}(sourceTable)")
+
+    def isIndexed(self)->bool:
+        '''
+        check whether the index has been built
+        '''
+        exists=self.sqlDB.query("SELECT name FROM sqlite_master WHERE type='table' AND name=?",(AcronymIndex.tableName,))
+        return len(exists)>0
+
+    def update(self,sourceTables:list=None)->int:
+        '''
+        (re)index the events of the given source tables
+
+        Args:
+            sourceTables(list): the event tables to index - default: all event tables
+
+        Return:
+            int: the number of index entries written
+        '''
+        startTime=time.time()
+        self.ensureTable()
+        if sourceTables is None:
+            sourceTables=list(EventStorage.getSourceTableSchemas("event",self.sqlDB).keys())
+        tableName=AcronymIndex.tableName
+        rows=[]
+        with ConnectionPool.getWriteLock(self.sqlDB):
+            for sourceTable in sourceTables:
+                self.sqlDB.c.execute(f"DELETE FROM {tableName} WHERE sourceTable=?",(sourceTable,))
+                columns=[columnInfo["name"] for columnInfo in self.sqlDB.query(f"pragma table_info('{sourceTable}')")]
+                if not "eventId" in columns or not "acronym" in columns:
+                    continue
+                yearColumn="year" if "year" in columns else "NULL"
+                for record in self.sqlDB.query(f"SELECT eventId,acronym,{yearColumn} AS year FROM {sourceTable} WHERE acronym IS NOT NULL"):
+                    acronym=record["acronym"]
+                    year=record["year"]
+                    if year is None or not str(year).isdigit():
+                        year=EventNormalizer.extractYear(acronym)
+                    stem=EventNormalizer.getAcronymStem(acronym)
+                    if stem is None:
+                        continue
+                    for token in set(stem.split(" ")):
+                        rows.append((token,int(year) if year is not None else None,stem,acronym,sourceTable,str(record["eventId"])))
+            self.sqlDB.c.executemany(f"INSERT INTO {tableName} VALUES (?,?,?,?,?,?)",rows)
+            self.sqlDB.c.commit()
+            TableMeta.recordChange(self.sqlDB,tableName)
+        self.tokenIndex=None
+        if self.debug:
+            print(f"indexing {len(sourceTables)} event tables with {len(rows)} acronym tokens took {time.time()-startTime:5.1f} s")
+        return len(rows)
+
+    def warmUp(self):
+        '''
+        load the persisted index into memory
+        '''
+        tokenIndex={}
+        refs={}
+        for record in self.sqlDB.query(f"SELECT token,year,stem,sourceTable,eventId FROM {AcronymIndex.tableName}"):
+            ref=(record["sourceTable"],record["eventId"])
+            tokenIndex.setdefault(record["token"],set()).add(ref)
+            tokenIndex.setdefault((record["token"],record["year"]),set()).add(ref)
+            refs[ref]=(record["stem"],record["year"])
+        self.tokenIndex=tokenIndex
+        self.refs=refs
+
+    def lookupEvent(self,text:str,year:int=None)->list:
+        '''
+        lookup the events matching the given acronym text e.g. "ISWC 2019" or "SIGMIS CPR '06"
+
+        all normalized tokens of the text need to match - events with exactly the same stem come first
+
+        Args:
+            text(str): the acronym to look for
+            year(int): the year of the event - default: the year in the text if any
+
+        Return:
+            list: a list of dicts with the sourceTable,eventId,stem and year of the matching events
+        '''
+        if self.tokenIndex is None:
+            self.warmUp()
+        if year is None:
+            year=EventNormalizer.extractYear(text)
+        stem=EventNormalizer.getAcronymStem(text)
+        if stem is None:
+            return []
+        keys=[(token,year) if year is not None else token for token in stem.split(" ")]
+        tokenRefs=sorted([self.tokenIndex.get(key,set()) for key in keys],key=len)
+        refs=set.intersection(*tokenRefs)
+        result=[]
+        for ref in refs:
+            refStem,refYear=self.refs[ref]
+            result.append({"sourceTable":ref[0],"eventId":ref[1],"stem":refStem,"year":refYear})
+        result.sort(key=lambda record:(record["stem"]!=stem,record["sourceTable"],record["eventId"]))
+        return result
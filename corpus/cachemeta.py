@@ -0,0 +1,344 @@
+from lodstorage.sql import SQLDB
+from corpus.sqlpool import ConnectionPool
+from datetime import datetime
+import hashlib
+import json
+import os
+
+class MetaTable(object):
+    '''
+    a small bookkeeping table in the EventCorpus.db
+    '''
+
+    def __init__(self,tableName:str,primaryKey:str,columns:dict):
+        '''
+        constructor
+
+        Args:
+            tableName(str): the name of the table
+            primaryKey(str): the name of the primary key column
+            columns(dict): map of column names to SQL types
+        '''
+        self.tableName=tableName
+        self.primaryKey=primaryKey
+        self.columns=columns
+
+    def ensureTable(self,sqlDB:SQLDB):
+        '''
+        make sure my table exists and has all my columns
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+        '''
+        columnDDL=",\n  ".join([f"{column} {sqlType}{' PRIMARY KEY' if column==self.primaryKey else ''}" for column,sqlType in self.columns.items()])
+        ddl=f"CREATE TABLE IF NOT EXISTS {self.tableName} (\n  {columnDDL}\n)"
+        sqlDB.execute(ddl)
+        tableInfo=sqlDB.query(f"pragma table_info('{self.tableName}')")
+        existingColumns=[columnInfo["name"] for columnInfo in tableInfo]
+        # tables created by older versions might miss some columns
+        for column,sqlType in self.columns.items():
+            if not column in existingColumns:
+                sqlDB.execute(f"ALTER TABLE {self.tableName} ADD COLUMN {column} {sqlType}")
+
+    def upsert(self,sqlDB:SQLDB,record:dict):
+        '''
+        insert or replace the given record
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            record(dict): the record to store - missing columns are set to None
+        '''
+        with ConnectionPool.getWriteLock(sqlDB):
+            self.ensureTable(sqlDB)
+            columns=list(self.columns.keys())
+            values={column:record.get(column,None) for column in columns}
+            placeholders=",".join([f":{column}" for column in columns])
+            sqlDB.c.execute(f"INSERT OR REPLACE INTO {self.tableName} ({','.join(columns)}) VALUES ({placeholders})",values)
+            sqlDB.c.commit()
+
+    def upsertMany(self,sqlDB:SQLDB,records:list):
+        '''
+        insert or replace the given records in a single transaction
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            records(list): the records to store - missing columns are set to None
+        '''
+        with ConnectionPool.getWriteLock(sqlDB):
+            self.ensureTable(sqlDB)
+            columns=list(self.columns.keys())
+            placeholders=",".join(["?" for _column in columns])
+            rows=[tuple([record.get(column,None) for column in columns]) for record in records]
+            sqlDB.c.executemany(f"INSERT OR REPLACE INTO {self.tableName} ({','.join(columns)}) VALUES ({placeholders})",rows)
+            sqlDB.c.commit()
+
+    def merge(self,sqlDB:SQLDB,record:dict):
+        '''
+        update the given columns of the record with the primary key of the given record
+        keeping the values of all other columns
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            record(dict): the record to merge - must contain the primary key
+        '''
+        with ConnectionPool.getWriteLock(sqlDB):
+            self.ensureTable(sqlDB)
+            existing=sqlDB.query(f"SELECT * FROM {self.tableName} WHERE {self.primaryKey}=?",(record[self.primaryKey],))
+            merged=existing[0] if existing else {}
+            merged.update(record)
+            self.upsert(sqlDB,merged)
+
+    def exists(self,sqlDB:SQLDB)->bool:
+        '''
+        check whether my table exists
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+        '''
+        tables=sqlDB.query("SELECT name FROM sqlite_master WHERE type='table' AND name=?",(self.tableName,))
+        return len(tables)>0
+
+    def getLookup(self,sqlDB:SQLDB)->dict:
+        '''
+        get my records as a map by primary key - read only: the table is not created
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+
+        Return:
+            dict: the map of primary key values to records - empty if my table does not exist
+        '''
+        lookup={}
+        if not self.exists(sqlDB):
+            return lookup
+        for record in sqlDB.query(f"SELECT * FROM {self.tableName}"):
+            # tables created by older versions might miss some columns
+            for column in self.columns.keys():
+                record.setdefault(column,None)
+            lookup[record[self.primaryKey]]=record
+        return lookup
+
+class SourceMeta(object):
+    '''
+    freshness metadata for the data sources of the EventCorpus
+    '''
+    table=MetaTable("sourcemeta","lookupId",{
+        "lookupId":"TEXT",
+        "loadTime":"TIMESTAMP",
+        "eventCount":"INTEGER",
+        "seriesCount":"INTEGER",
+        "fingerprint":"TEXT",
+        "duration":"REAL",
+        "status":"TEXT",
+        "startupTime":"REAL",
+        "linkCount":"INTEGER"
+    })
+
+    @staticmethod
+    def fileFingerprint(filePaths:list)->str:
+        '''
+        get a fingerprint for the given files based on their path, modification time and size
+
+        Args:
+            filePaths(list): the list of files to fingerprint
+
+        Return:
+            str: the fingerprint or None if none of the files exists
+        '''
+        fingerprint=None
+        sha=hashlib.sha1()
+        for filePath in sorted(filePaths):
+            if os.path.isfile(filePath):
+                stats=os.stat(filePath)
+                sha.update(f"{filePath}:{stats.st_mtime}:{stats.st_size}\n".encode())
+                fingerprint=sha.hexdigest()
+        return fingerprint
+
+    @staticmethod
+    def lodFingerprint(listOfDicts:list)->str:
+        '''
+        get a content fingerprint for the given list of dicts e.g. a SPARQL query result
+
+        Args:
+            listOfDicts(list): the records to fingerprint
+
+        Return:
+            str: the fingerprint
+        '''
+        sha=hashlib.sha1()
+        for record in listOfDicts:
+            sha.update(json.dumps(record,sort_keys=True,default=str).encode())
+        return sha.hexdigest()
+
+    @staticmethod
+    def getMetaData(sqlDB:SQLDB)->dict:
+        '''
+        get the freshness metadata of all data sources
+
+        Return:
+            dict: map of lookupId to metadata record
+        '''
+        return SourceMeta.table.getLookup(sqlDB)
+
+    @staticmethod
+    def recordLoad(sqlDB:SQLDB,lookupId:str,eventCount:int,seriesCount:int,fingerprint:str,duration:float,loadTime:datetime=None):
+        '''
+        record that the data source with the given lookupId has been loaded from its source
+        '''
+        if loadTime is None:
+            loadTime=datetime.now()
+        record={
+            "lookupId":lookupId,
+            "loadTime":loadTime,
+            "eventCount":eventCount,
+            "seriesCount":seriesCount,
+            "fingerprint":fingerprint,
+            "duration":duration
+        }
+        SourceMeta.table.merge(sqlDB,record)
+
+    @staticmethod
+    def recordStartup(sqlDB:SQLDB,lookupId:str,status:str,startupTime:float):
+        '''
+        record the status and the time it took to get the data source with the given lookupId ready
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            lookupId(str): the lookupId of the data source
+            status(str): fetched, cached or missing
+            startupTime(float): the startup time in seconds
+        '''
+        SourceMeta.table.merge(sqlDB,{"lookupId":lookupId,"status":status,"startupTime":startupTime})
+
+    @staticmethod
+    def recordLinks(sqlDB:SQLDB,lookupId:str,linkCount:int):
+        '''
+        record the number of links between the events and event series of the data source with the given lookupId
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            lookupId(str): the lookupId of the data source
+            linkCount(int): the number of links - 0 if the data source has been linked without any link
+        '''
+        SourceMeta.table.merge(sqlDB,{"lookupId":lookupId,"linkCount":linkCount})
+
+class TableMeta(object):
+    '''
+    instance counts and change times of the tables of the EventCorpus maintained by the write paths
+    '''
+    table=MetaTable("tablemeta","tableName",{
+        "tableName":"TEXT",
+        "instances":"INTEGER",
+        "updated":"TIMESTAMP"
+    })
+
+    @staticmethod
+    def getCounts(sqlDB:SQLDB)->dict:
+        '''
+        get the recorded instance counts
+
+        Return:
+            dict: map of table names to instance counts - tables with an invalidated count are left out
+        '''
+        lookup=TableMeta.table.getLookup(sqlDB)
+        counts={tableName:record["instances"] for tableName,record in lookup.items() if record["instances"] is not None}
+        return counts
+
+    @staticmethod
+    def recordChange(sqlDB:SQLDB,tableName:str,instances:int=None):
+        '''
+        record that the given table has been changed
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            tableName(str): the name of the table
+            instances(int): the new number of instances - if None the recorded count is invalidated
+        '''
+        TableMeta.table.upsert(sqlDB,{"tableName":tableName,"instances":instances,"updated":datetime.now()})
+
+    @staticmethod
+    def recordCount(sqlDB:SQLDB,tableName:str,instances:int=None)->int:
+        '''
+        record the instance count of the given table
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            tableName(str): the name of the table
+            instances(int): the number of instances - if None count the instances
+
+        Return:
+            int: the number of instances
+        '''
+        if instances is None:
+            instances=sqlDB.query(f"SELECT count(*) AS count FROM {tableName}")[0]["count"]
+        TableMeta.recordChange(sqlDB,tableName,instances)
+        return instances
+
+class RefreshPlanner(object):
+    '''
+    plan which data sources of an EventCorpus need to be reloaded
+    '''
+
+    def __init__(self,eventCorpus,sqlDB:SQLDB,now:datetime=None,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            eventCorpus(EventCorpus): the corpus with the data sources to check
+            sqlDB(SQLDB): the database holding the freshness metadata
+            now(datetime): the point in time to check the time to live against - default: now
+            debug(bool): if True show the reasons for reloading
+        '''
+        self.eventCorpus=eventCorpus
+        self.sqlDB=sqlDB
+        self.now=now if now is not None else datetime.now()
+        self.debug=debug
+
+    def getStaleReason(self,eventDataSource,metaData:dict)->str:
+        '''
+        check whether the given eventDataSource is stale
+
+        Args:
+            eventDataSource(EventDataSource): the data source to check
+            metaData(dict): the freshness metadata by lookupId
+
+        Return:
+            str: the reason why the data source is stale or None if it is fresh
+        '''
+        sourceConfig=eventDataSource.sourceConfig
+        meta=metaData.get(sourceConfig.lookupId,None)
+        if meta is None or meta["loadTime"] is None:
+            return "never loaded"
+        if sourceConfig.ttl is not None:
+            age=(self.now-meta["loadTime"]).total_seconds()
+            if age>sourceConfig.ttl:
+                return f"time to live {sourceConfig.ttl} s exceeded ({age:.0f} s)"
+        fingerprint=eventDataSource.getFingerprint()
+        if fingerprint is not None and fingerprint!=meta["fingerprint"]:
+            return "source changed"
+        return None
+
+    def plan(self,lookupIds:list=None)->list:
+        '''
+        get the lookupIds of the data sources that need to be reloaded
+
+        Args:
+            lookupIds(list): the candidates to check - if None or containing "all" check all data sources
+
+        Return:
+            list: the lookupIds of the stale data sources
+        '''
+        eventDataSources=self.eventCorpus.eventDataSources
+        if lookupIds is None or "all" in lookupIds:
+            lookupIds=list(eventDataSources.keys())
+        metaData=SourceMeta.getMetaData(self.sqlDB)
+        staleIds=[]
+        for lookupId in lookupIds:
+            if not lookupId in eventDataSources:
+                raise Exception(f"unknown data source {lookupId}")
+            reason=self.getStaleReason(eventDataSources[lookupId],metaData)
+            if reason is not None:
+                staleIds.append(lookupId)
+            if self.debug:
+                print(f"{lookupId}: {reason if reason else 'fresh'}")
+        return staleIds
@@ -0,0 +1,167 @@
+import gc
+import tracemalloc
+from lodstorage.lod import LOD
+
+class CompactEntity(object):
+    '''
+    generate compact variants of entity classes with __slots__ for the fields of their samples
+
+    the values of the sample fields are stored in slots instead of the per instance dict - other
+    attributes still end up in the instance dict - use asDict or getDict to get all attributes
+    since __dict__ and vars only show the instance dict
+    '''
+    # (entity class,fields) -> compact class
+    compactClasses={}
+
+    @staticmethod
+    def asDict(entity)->dict:
+        '''
+        get a dict of the attributes of the given compact entity - the asDict method of compact entities
+
+        Args:
+            entity: the compact entity
+
+        Return:
+            dict: a new dict with the slot values followed by the other attributes
+        '''
+        record={}
+        for slot in entity.compactFields:
+            if hasattr(entity,slot):
+                record[slot]=getattr(entity,slot)
+        record.update(vars(entity))
+        return record
+
+    @staticmethod
+    def getDict(entity)->dict:
+        '''
+        get the attributes of the given entity as a dict
+
+        Args:
+            entity: a compact or normal entity
+
+        Return:
+            dict: a new dict for compact entities and the instance dict of other entities
+        '''
+        if hasattr(entity,"compactFields"):
+            return CompactEntity.asDict(entity)
+        return entity.__dict__
+
+    @staticmethod
+    def toJsonAbleValue(entity,value):
+        '''
+        the toJsonAbleValue method of compact entities - compact values are converted with asDict
+
+        Args:
+            entity: the compact entity that is converted to JSON
+            value: the value to convert
+        '''
+        if hasattr(value,"compactFields"):
+            return CompactEntity.asDict(value)
+        return entity.entityClass.toJsonAbleValue(entity,value)
+
+    @staticmethod
+    def getFields(clazz,lod:list,sampleCount:int=100)->list:
+        '''
+        get the fields for the slots of the compact variant of the given class for the given records
+
+        unused slots would cost memory as well - so the sample fields the records do not have are skipped
+        and the fields of the records that are not in the samples are added
+
+        Args:
+            clazz: the entity class
+            lod(list): the list of dicts the entities will be created from
+            sampleCount(int): the number of records to check for fields
+
+        Return:
+            list: the fields
+        '''
+        recordFields=LOD.getFields(lod[:sampleCount])
+        sampleFields=[]
+        if hasattr(clazz,"getSamples") and callable(clazz.getSamples):
+            sampleFields=LOD.getFields(clazz.getSamples())
+        fields=[field for field in sampleFields if field in recordFields]
+        fields.extend([field for field in recordFields if not field in fields])
+        return fields
+
+    @staticmethod
+    def getCompactClass(clazz,fields:list=None):
+        '''
+        get the compact variant of the given entity class - generated only once per class and fields
+
+        Args:
+            clazz: the entity class e.g. DblpEvent
+            fields(list): the fields to store in slots - default: the fields of the samples of the class
+
+        Return:
+            the subclass of the given class with slots for the fields
+        '''
+        if "compactFields" in vars(clazz):
+            return clazz
+        if fields is None:
+            fields=LOD.getFields(clazz.getSamples()) if hasattr(clazz,"getSamples") else []
+        # class attributes e.g. properties and templateName can not be slots
+        fields=tuple([field for field in fields if not hasattr(clazz,field) and field.isidentifier()])
+        key=(clazz,fields)
+        compactClass=CompactEntity.compactClasses.get(key,None)
+        if compactClass is None:
+            compactClass=type(f"Compact{clazz.__name__}",(clazz,),{
+                "__slots__":fields,
+                "__module__":clazz.__module__,
+                "__doc__":clazz.__doc__,
+                "entityClass":clazz,
+                "compactFields":fields,
+                "asDict":CompactEntity.asDict,
+                "toJsonAbleValue":CompactEntity.toJsonAbleValue
+            })
+            CompactEntity.compactClasses[key]=compactClass
+        return compactClass
+
+    @staticmethod
+    def getMemoryUsage(clazz,lod:list)->int:
+        '''
+        get the memory used by the instances of the given class for the given list of dicts
+
+        Args:
+            clazz: the entity class
+            lod(list): the list of dicts to create the instances from
+
+        Return:
+            int: the number of bytes allocated for the instances
+        '''
+        gc.collect()
+        tracemalloc.start()
+        startSize,_peak=tracemalloc.get_traced_memory()
+        entities=[]
+        for record in lod:
+            entity=clazz()
+            entity.fromDict(record)
+            entities.append(entity)
+        size,_peak=tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size-startSize
+
+    @staticmethod
+    def getMemoryReport(classes:list,lod:list,per:int=100000)->list:
+        '''
+        compare the memory used by the instances of the given classes and their compact variants
+
+        Args:
+            classes(list): the entity classes
+            lod(list): the list of dicts to create the instances from
+            per(int): the number of instances to report the memory for
+
+        Return:
+            list: a list of dicts with the class name, the MB per given number of instances before and after and the ratio
+        '''
+        report=[]
+        for clazz in classes:
+            before=CompactEntity.getMemoryUsage(clazz,lod)
+            after=CompactEntity.getMemoryUsage(CompactEntity.getCompactClass(clazz,CompactEntity.getFields(clazz,lod)),lod)
+            scale=per/len(lod)/1024/1024 if lod else 0
+            report.append({
+                "class":clazz.__name__,
+                "before":round(before*scale,1),
+                "after":round(after*scale,1),
+                "ratio":round(after/before,2) if before else None
+            })
+        return report
@@ -8,7 +8,7 @@ class EventDataSourceConfig(object):
     '''
     holds configuration parameters for an EventDataSource
     '''
-    def __init__(self,lookupId:str,name:str,title:str,url:str,tableSuffix:str):
+    def __init__(self,lookupId:str,name:str,title:str,url:str,tableSuffix:str,ttl:int=None,seriesForeignKey:str=None,seriesKey:str="acronym"):
         '''
         constructor 
         
@@ -18,12 +18,18 @@ class EventDataSourceConfig(object):
           title(str): the title of the data source
           url(str): the link to the data source homepage
           tableSuffix(str): the tableSuffix to use
+          ttl(int): time to live of the cached data in seconds - None if the cache does not expire by time
+          seriesForeignKey(str): the column of the events referencing their series - None if events are not linked to series
+          seriesKey(str): the column of the event series the seriesForeignKey refers to
         '''  
         self.lookupId=lookupId
         self.name=name
         self.title=title
         self.url=url
         self.tableSuffix=tableSuffix
+        self.ttl=ttl
+        self.seriesForeignKey=seriesForeignKey
+        self.seriesKey=seriesKey
         
     def getTableName(self,entityName:str):
         '''
@@ -35,4 +41,25 @@ class EventDataSourceConfig(object):
         tableName=f"{entityName.lower()}_{self.tableSuffix}"
         return tableName
    
-        
\ No newline at end of file
+        
+class GeocoderConfig(object):
+    '''
+    holds configuration parameters for the geocoder backend of the location lookup
+    '''
+    backends=["nominatim","offline"]
+
+    def __init__(self,backend:str="nominatim",endpoint:str=None,maxWorkers:int=None):
+        '''
+        constructor
+
+        Args:
+          backend(str): nominatim to cross check the geograpy results with a Nominatim service or
+            offline to only use the alias index derived from the geograpy3 location data
+          endpoint(str): the Nominatim endpoint e.g. of a self hosted service - default: the public Nominatim service
+          maxWorkers(int): the maximum number of concurrent Nominatim queries - default: 1 for the public service and 8 otherwise
+        '''
+        if not backend in GeocoderConfig.backends:
+            raise Exception(f"unknown geocoder backend {backend} - use one of {','.join(GeocoderConfig.backends)}")
+        self.backend=backend
+        self.endpoint=endpoint
+        self.maxWorkers=maxWorkers
@@ -5,15 +5,15 @@ Created on 2020-07-11
 '''
 from corpus.event import Event,EventSeries,EventManager,EventSeriesManager
 from lodstorage.storageconfig import StorageConfig
-from lodstorage.sql import SQLDB
 import html
 import re
 import os
 import json
 from corpus.eventcorpus import EventDataSourceConfig,EventDataSource
+from corpus.cachemeta import SourceMeta
 
 class Confref(EventDataSource):
-    sourceConfig=EventDataSourceConfig(lookupId="confref",name="confref.org",url="http://portal.confref.org",title="ConfRef",tableSuffix="confref")
+    sourceConfig=EventDataSourceConfig(lookupId="confref",name="confref.org",url="http://portal.confref.org",title="ConfRef",tableSuffix="confref",seriesForeignKey="dblpSeriesId",seriesKey="eventSeriesId")
     
     '''
     ConfRef platform
@@ -23,6 +23,12 @@ class Confref(EventDataSource):
         construct me 
         '''
         super().__init__(ConfrefEventManager(),ConfrefEventSeriesManager(),Confref.sourceConfig)
+        
+    def getFingerprint(self)->str:
+        '''
+        get the fingerprint of the confref json file
+        '''
+        return SourceMeta.fileFingerprint([self.eventManager.getJsonFilePath()])
 
     @staticmethod
     def htmlUnEscapeDict(htmlDict:dict):
@@ -121,15 +127,22 @@ class ConfrefEventManager(EventManager):
         '''
         # nothing to do - there is a get ListOfDicts below
     
-    def getListOfDicts(self):
+    def getJsonFilePath(self)->str:
         '''
-        get my content from the json file
+        get the path of the json file with my content
         '''
         cachePath=self.config.getCachePath()
         jsondir=f"{cachePath}/confref"
         if not os.path.exists(jsondir):
                 os.makedirs(jsondir)
-        self.jsonFilePath=f"{jsondir}/confref-conferences.json"
+        jsonFilePath=f"{jsondir}/confref-conferences.json"
+        return jsonFilePath
+    
+    def getListOfDicts(self):
+        '''
+        get my content from the json file
+        '''
+        self.jsonFilePath=self.getJsonFilePath()
         with open(self.jsonFilePath) as jsonFile:
             rawEvents=json.load(jsonFile)
         lod=[]
@@ -160,13 +173,7 @@ class ConfrefEventSeriesManager(EventSeriesManager):
         '''
         get my data
         '''
-        query="""select dblpSeriesId as eventSeriesId,acronym,seriesTitle as title,count(*) as count,min(year) as minYear,max(year) as maxYear
-from event_confref
-where dblpSeriesId is not Null
-group by dblpSeriesId"""
-        sqlDB=SQLDB(self.getCacheFile())
-        listOfDicts=sqlDB.query(query)
-        self.setAllAttr(listOfDicts, "source", "confref")
+        listOfDicts=self.getInducedLoD(seriesKey="dblpSeriesId",title="seriesTitle")
         self.postProcessLodRecords(listOfDicts)
         return listOfDicts
  
\ No newline at end of file
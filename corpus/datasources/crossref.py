@@ -15,6 +15,7 @@ import time
 from datetime import datetime
 
 from corpus.eventcorpus import EventDataSource, EventDataSourceConfig
+from corpus.cachemeta import SourceMeta
 
 
 class Crossref(EventDataSource):
@@ -29,6 +30,12 @@ class Crossref(EventDataSource):
         '''
         self.cr = habanero.Crossref()   
         super().__init__(CrossrefEventManager(), CrossrefEventSeriesManager(), Crossref.sourceConfig)
+        
+    def getFingerprint(self)->str:
+        '''
+        get the fingerprint of the crossref json files
+        '''
+        return SourceMeta.fileFingerprint(self.eventManager.jsonFiles())
      
     def doiMetaData(self, doi):
         ''' get the meta data for the given doi '''
@@ -281,8 +288,7 @@ class CrossrefEventSeriesManager(EventSeriesManager):
         
     def getListOfDicts(self):
         '''
-        get my data
+        get my data - crossref has no series data so the series are induced from the events
         '''
-        # TODO Replace this stub
-        lod = [{'source':'crossref', 'eventSeriesId':'dummy'}]
+        lod = self.getInducedLoD()
         return lod
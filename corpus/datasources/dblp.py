@@ -7,19 +7,27 @@ from corpus.event import EventSeriesManager, EventSeries, Event, EventManager
 from lodstorage.storageconfig import StorageConfig
 from corpus.datasources.dblpxml import DblpXml
 from corpus.eventcorpus import EventDataSource, EventDataSourceConfig
+from corpus.cachemeta import SourceMeta
 
 
 class Dblp(EventDataSource):
     '''
     scientific events from https://dblp.org
     '''
-    sourceConfig = EventDataSourceConfig(lookupId="dblp", name="dblp", url='https://dblp.org/', title='dblp computer science bibliography', tableSuffix="dblp")
+    sourceConfig = EventDataSourceConfig(lookupId="dblp", name="dblp", url='https://dblp.org/', title='dblp computer science bibliography', tableSuffix="dblp", seriesForeignKey="series", seriesKey="eventSeriesId")
     
     def __init__(self):
         '''
         constructor
         '''
         super().__init__(DblpEventManager(), DblpEventSeriesManager(), Dblp.sourceConfig)
+        
+    def getFingerprint(self)->str:
+        '''
+        get the fingerprint of the dblp xml dump
+        '''
+        dblpXml=self.eventManager.dblpXml if hasattr(self.eventManager,"dblpXml") else DblpXml()
+        return SourceMeta.fileFingerprint([dblpXml.xmlfile])
 
         
 class DblpEvent(Event):
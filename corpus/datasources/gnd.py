@@ -14,7 +14,7 @@ class GND(EventDataSource):
     '''
     endpoint="https://confident.dbis.rwth-aachen.de/jena/gnd/sparql"
     limit=1000000
-    sourceConfig = EventDataSourceConfig(lookupId="gnd", name="GND", url='https://d-nb.info/standards/elementset/gnd', title='Gemeinsame Normdatei', tableSuffix="gnd")
+    sourceConfig = EventDataSourceConfig(lookupId="gnd", name="GND", url='https://d-nb.info/standards/elementset/gnd', title='Gemeinsame Normdatei', tableSuffix="gnd", ttl=7*86400)
     
     def __init__(self,debug=False):
         '''
@@ -112,16 +112,8 @@ class GndEventSeriesManager(EventSeriesManager):
         '''
         if not hasattr(self, "getListOfDicts"):
             #self.getListOfDicts=self.getLoDfromEndpoint  
-            self.getListOfDicts=self.getDummyLoD
-            
-    def getDummyLoD(self):
-        lod=[
-            {
-                "seriesId":"0",
-                "title":""
-            }
-        ]
-        return lod
+            # there is no series data yet so the series are induced from the events
+            self.getListOfDicts=self.getInducedLoD
         
     def getSparqlQuery(self):
         '''
@@ -38,7 +38,8 @@ class OR(EventDataSource):
             url=wikiUser.getWikiUrl()
         else:
             url='https://www.openresearch.org/wiki/Main_Page' if wikiId=="or" else "https://confident.dbis.rwth-aachen.de/or/index.php?title=Main_Page"
-        sourceConfig=EventDataSourceConfig(lookupId=lookupId,name=name,url=url,title=title,tableSuffix=tableSuffix)
+        # the api gives the current wiki state, backups are updated daily
+        sourceConfig=EventDataSourceConfig(lookupId=lookupId,name=name,url=url,title=title,tableSuffix=tableSuffix,ttl=86400,seriesForeignKey="inEventSeries",seriesKey="acronym")
         super().__init__(OREventManager(sourceConfig=sourceConfig),OREventSeriesManager(sourceConfig=sourceConfig),sourceConfig)
 
 class OREventManager(EventManager):
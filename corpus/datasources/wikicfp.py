@@ -11,12 +11,13 @@ from corpus.eventcorpus import EventDataSource, EventDataSourceConfig
 from corpus.quality.rating import Rating, RatingType
 from datetime import datetime
 from corpus.datasources import wikicfpscrape
+from corpus.cachemeta import SourceMeta
 
 class WikiCfp(EventDataSource):
     '''
     scientific event from http://www.wikicfp.com
     '''
-    sourceConfig = EventDataSourceConfig(lookupId="wikicfp", name="WikiCFP", url='http://www.wikicfp.com', title='WikiCFP', tableSuffix="wikicfp")
+    sourceConfig = EventDataSourceConfig(lookupId="wikicfp", name="WikiCFP", url='http://www.wikicfp.com', title='WikiCFP', tableSuffix="wikicfp", seriesForeignKey="seriesId", seriesKey="seriesId")
     
     def __init__(self,debug=False):
         '''
@@ -28,6 +29,15 @@ class WikiCfp(EventDataSource):
         jsonEventCache=WikiCfpEventManager(config=config)
         jsonEventSeriesCache=WikiCfpEventSeriesManager(config=config)
         self.wikiCfpScrape=corpus.datasources.wikicfpscrape.WikiCfpScrape(jsonEventCache,jsonEventSeriesCache)
+        
+    def getFingerprint(self)->str:
+        '''
+        get the fingerprint of the crawled wikicfp json files
+        '''
+        jsonFiles=[]
+        for crawlType in wikicfpscrape.CrawlType:
+            jsonFiles.extend(self.wikiCfpScrape.jsonFiles(crawlType))
+        return SourceMeta.fileFingerprint(jsonFiles)
     
 class WikiCfpEvent(Event):
     '''
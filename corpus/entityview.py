@@ -0,0 +1,149 @@
+from lodstorage.sql import SQLDB
+
+class EntityView(object):
+    '''
+    a lazy read-only list like view of the entities of a cached table
+
+    the rows are fetched in pages on iteration and only the entities that are actually
+    touched are created - filters are pushed down to SQL
+    '''
+
+    def __init__(self,sqlDB:SQLDB,tableName:str,clazz=None,pageSize:int=1000,conditions:list=None,params:list=None):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database with the table
+            tableName(str): the name of the table
+            clazz: the entity class to create the entities with - if None the records are returned as dicts
+            pageSize(int): the number of rows to fetch per page
+            conditions(list): SQL conditions the rows need to fulfill
+            params(list): the parameters of the conditions
+        '''
+        self.sqlDB=sqlDB
+        self.tableName=tableName
+        self.clazz=clazz
+        self.pageSize=pageSize
+        self.conditions=conditions if conditions is not None else []
+        self.params=params if params is not None else []
+        self.count=None
+        self.columns=None
+
+    def getColumns(self)->list:
+        '''
+        get the columns of my table
+        '''
+        if self.columns is None:
+            self.columns=[columnInfo["name"] for columnInfo in self.sqlDB.query(f"pragma table_info('{self.tableName}')")]
+            if not self.columns:
+                raise Exception(f"can not create a view for {self.tableName} - the table does not exist")
+        return self.columns
+
+    def getWhere(self,conditions:list)->str:
+        '''
+        get the WHERE clause for the given conditions
+        '''
+        if not conditions:
+            return ""
+        return " WHERE "+" AND ".join([f"({condition})" for condition in conditions])
+
+    def toEntity(self,record:dict):
+        '''
+        convert the given record to an entity of my class
+        '''
+        if self.clazz is None:
+            return record
+        entity=self.clazz()
+        entity.fromDict(record)
+        return entity
+
+    def items(self):
+        '''
+        iterate over the rowids and entities of my rows page by page
+
+        Return:
+            generator: the (rowid,entity) tuples ordered by rowid
+        '''
+        self.getColumns()
+        lastRowId=None
+        while True:
+            conditions=list(self.conditions)
+            params=list(self.params)
+            if lastRowId is not None:
+                conditions.append("rowid>?")
+                params.append(lastRowId)
+            query=f"SELECT rowid AS __rowid__,* FROM {self.tableName}{self.getWhere(conditions)} ORDER BY rowid LIMIT ?"
+            page=self.sqlDB.query(query,tuple(params+[self.pageSize]))
+            for record in page:
+                lastRowId=record.pop("__rowid__")
+                yield lastRowId,self.toEntity(record)
+            if len(page)<self.pageSize:
+                break
+
+    def __iter__(self):
+        for _rowid,entity in self.items():
+            yield entity
+
+    def __len__(self)->int:
+        if self.count is None:
+            self.getColumns()
+            query=f"SELECT count(*) AS count FROM {self.tableName}{self.getWhere(self.conditions)}"
+            self.count=self.sqlDB.query(query,tuple(self.params))[0]["count"]
+        return self.count
+
+    def __getitem__(self,rowid:int):
+        '''
+        get the entity with the given rowid
+
+        Args:
+            rowid(int): the rowid of the entity
+
+        Return:
+            the entity
+        '''
+        self.getColumns()
+        conditions=self.conditions+["rowid=?"]
+        records=self.sqlDB.query(f"SELECT * FROM {self.tableName}{self.getWhere(conditions)}",tuple(self.params+[rowid]))
+        if not records:
+            raise IndexError(f"{self.tableName} has no row with rowid {rowid}")
+        return self.toEntity(records[0])
+
+    def filter(self,where:str=None,params:list=None,**kwArgs):
+        '''
+        get a view of my rows that have the given attribute values
+
+        Args:
+            where(str): an additional SQL condition
+            params(list): the parameters of the condition
+            kwArgs: the attribute values the rows need to have - None matches NULL
+
+        Return:
+            EntityView: the filtered view
+        '''
+        columns=self.getColumns()
+        conditions=list(self.conditions)
+        filterParams=list(self.params)
+        if where is not None:
+            conditions.append(where)
+            if params is not None:
+                filterParams.extend(params)
+        for column,value in kwArgs.items():
+            if not column in columns:
+                raise Exception(f"can not filter {self.tableName} by {column} - there is no such column")
+            if value is None:
+                conditions.append(f"{column} IS NULL")
+            else:
+                conditions.append(f"{column}=?")
+                filterParams.append(value)
+        view=EntityView(self.sqlDB,self.tableName,self.clazz,pageSize=self.pageSize,conditions=conditions,params=filterParams)
+        view.columns=columns
+        return view
+
+    def getLoD(self)->list:
+        '''
+        get the records of my rows as a list of dicts
+        '''
+        lod=[]
+        for _rowid,record in EntityView(self.sqlDB,self.tableName,pageSize=self.pageSize,conditions=self.conditions,params=self.params).items():
+            lod.append(record)
+        return lod
@@ -5,15 +5,28 @@ Created on 2021-07-26
 '''
 from typing import Callable
 from corpus.config import EventDataSourceConfig
-from lodstorage.csv import CSV
 from lodstorage.entity import EntityManager
 from lodstorage.jsonable import JSONAble
 from lodstorage.lod import LOD
 from lodstorage.sql import SQLDB
-from lodstorage.storageconfig import StorageConfig
+from lodstorage.storageconfig import StorageConfig, StoreMode
 from corpus.quality.rating import RatingManager,Rating
 from corpus.eventrating import EventRating,EventSeriesRating
 from lodstorage.sparql import SPARQL
+from corpus.cachemeta import MetaTable, TableMeta
+from corpus.sqlpool import ConnectionPool
+from corpus.serieslink import EventSeriesLink
+from corpus.seriesinduction import SeriesInduction
+from corpus.querystream import QueryStreamWriter
+from corpus.compactentity import CompactEntity
+from corpus.entityview import EntityView
+import csv
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
 
 class EventStorage:
     '''
@@ -21,6 +34,25 @@ class EventStorage:
     '''
     profile=True
     withShowProgress=False
+    # bookkeeping tables that do not hold entities of a data source
+    auxiliaryTables=["sourcemeta","viewmeta","materializedmeta","tablemeta","indexmeta","event_series_link","event_cluster","acronymindex","titleindex","locationcache","event","eventseries"]
+    # columns to show first in the common views - all other columns of the source tables follow
+    leadingColumns={
+        "event": ["eventId","title","url","city","country","region","countryIso","regionIso","acronym","source","year"],
+        "eventseries": ["source","acronym"]
+    }
+    # pooled connections by database file
+    connectionPools={}
+    poolLock=threading.Lock()
+    # schema hashes of the common views
+    viewMetaTable=MetaTable("viewmeta","viewName",{"viewName":"TEXT","schemaHash":"TEXT"})
+    # versions of the source tables in the materialized common views
+    materializedMetaTable=MetaTable("materializedmeta","sourceTable",{"sourceTable":"TEXT","viewName":"TEXT","version":"TEXT"})
+    # columns to index when the common views are materialized
+    materializedIndexColumns={
+        "event": ["acronym","year","source","country","eventId"],
+        "eventseries": ["acronym","source"]
+    }
     
     @staticmethod
     def getStorageConfig(debug:bool=False,mode='sql')->StorageConfig:
@@ -51,77 +83,335 @@ class EventStorage:
         return config
     
     @classmethod
-    def getSqlDB(cls):
+    def getSqlDB(cls,readOnly:bool=False,cacheFile:str=None,debug:bool=False,errorDebug:bool=False)->SQLDB:
         '''
         get the SQL Database
-        '''
-        config=EventStorage.getStorageConfig()
-        sqlDB=SQLDB(config.cacheFile)
+        
+        connections are pooled per database file: there is a single shared writer
+        and a read-only connection per thread
+        
+        Args:
+            readOnly(bool): if True get the read-only connection of the current thread
+            cacheFile(str): the database file - if None the EventCorpus.db is used
+            debug(bool): if True show debug information
+            errorDebug(bool): if True show record details on errors
+        
+        Return:
+            SQLDB: the SQL Database
+        '''
+        if cacheFile is None:
+            cacheFile=EventStorage.getStorageConfig().cacheFile
+        with EventStorage.poolLock:
+            if not cacheFile in EventStorage.connectionPools:
+                EventStorage.connectionPools[cacheFile]=ConnectionPool(cacheFile)
+            pool=EventStorage.connectionPools[cacheFile]
+        if readOnly:
+            sqlDB=pool.getReader(debug=debug,errorDebug=errorDebug)
+        else:
+            sqlDB=pool.getWriter(debug=debug,errorDebug=errorDebug)
         return sqlDB
     
     @classmethod
-    def getTableList(cls,withInstanceCount:bool=True)->list:
+    def closeConnections(cls):
+        '''
+        close all pooled connections e.g. before the database file is replaced
+        '''
+        with EventStorage.poolLock:
+            for pool in EventStorage.connectionPools.values():
+                pool.close()
+            EventStorage.connectionPools={}
+    
+    @classmethod
+    def getTableList(cls,withInstanceCount:bool=True,withAuxiliaryTables:bool=False,exactCount:bool=False,sqlDB:SQLDB=None)->list:
         '''
         get the list of SQL Tables involved
         
+        Args:
+            withInstanceCount(bool): if TRUE add the count of instances to the table Map 
+            withAuxiliaryTables(bool): if True also include the bookkeeping tables
+            exactCount(bool): if True count the instances instead of using the counts recorded by the write paths
+            sqlDB(SQLDB): the database to work on - if None the read-only connection to the EventCorpus.db is used
+        
         Return:
             list: the map of SQL tables used for caching
-            withInstanceCount(bool): if TRUE add the count of instances to the table Map 
         '''
-        sqlDB=EventStorage.getSqlDB()
+        if sqlDB is None:
+            sqlDB=EventStorage.getSqlDB(readOnly=True)
         tableList=sqlDB.getTableList()
-        for table in tableList:
-            tableName=table["name"]
-            if withInstanceCount:
-                countQuery="SELECT count(*) as count from %s" % tableName
-                countResult=sqlDB.query(countQuery)
-                table['instances']=countResult[0]['count']
+        if not withAuxiliaryTables:
+            tableList=[table for table in tableList if not table["name"] in EventStorage.auxiliaryTables]
+        if withInstanceCount:
+            counts={} if exactCount else TableMeta.getCounts(sqlDB)
+            for table in tableList:
+                tableName=table["name"]
+                if tableName in counts:
+                    table['instances']=counts[tableName]
+                else:
+                    # no valid recorded count
+                    table['instances']=sqlDB.query(f"SELECT count(*) AS count FROM {tableName}")[0]["count"]
         return tableList
     
     @classmethod
-    def getCommonViewDDLs(cls,exclude=None):
+    def getSourceTableSchemas(cls,viewName:str,sqlDB:SQLDB,exclude:list=None)->dict:
+        '''
+        get the CREATE TABLE statements of the source tables of the given common view
+        
+        Args:
+            viewName(str): the name of the common view e.g. event or eventseries
+            sqlDB(SQLDB): the database to work on
+            exclude(list): names of tables to exclude
+            
+        Return:
+            dict: map of table names to their CREATE TABLE statement
+        '''
+        schemas={}
+        for record in sqlDB.query("SELECT name,sql FROM sqlite_master WHERE type='table' ORDER BY name"):
+            tableName=record["name"]
+            if tableName.startswith(f"{viewName}_") and not tableName in EventStorage.auxiliaryTables:
+                if exclude is None or not tableName in exclude:
+                    schemas[tableName]=record["sql"]
+        return schemas
+    
+    @classmethod
+    def getSchemaHash(cls,schemas:dict)->str:
+        '''
+        get a hash for the given source table schemas
+        
+        Args:
+            schemas(dict): map of table names to CREATE TABLE statements
+            
+        Return:
+            str: the hash
+        '''
+        sha=hashlib.sha1()
+        for tableName,ddl in schemas.items():
+            sha.update(f"{tableName}:{ddl}\n".encode())
+        return sha.hexdigest()
+    
+    @classmethod
+    def getCommonColumns(cls,viewName:str,sqlDB:SQLDB,sourceTables:list)->tuple:
+        '''
+        get the union of the columns of the given source tables of a common view
+        
+        Args:
+            viewName(str): the name of the common view e.g. event or eventseries
+            sqlDB(SQLDB): the database to work on
+            sourceTables(list): the names of the source tables
+            
+        Return:
+            tuple: map of column names to SQL types and map of table names to their column names
+        '''
+        columnTypes={}
+        tableColumns={}
+        for tableName in sourceTables:
+            tableInfo=sqlDB.query(f"pragma table_info('{tableName}')")
+            tableColumns[tableName]=[columnInfo["name"] for columnInfo in tableInfo]
+            for columnInfo in tableInfo:
+                if not columnInfo["name"] in columnTypes:
+                    columnTypes[columnInfo["name"]]=columnInfo["type"]
+        # leading columns first then the others in order of appearance
+        columns={column:columnTypes[column] for column in EventStorage.leadingColumns[viewName] if column in columnTypes}
+        for column,sqlType in columnTypes.items():
+            if not column in columns:
+                columns[column]=sqlType
+        return columns,tableColumns
+    
+    @classmethod
+    def getSelectList(cls,columns:dict,tableColumns:list)->str:
+        '''
+        get the select list for a source table filling the columns it does not have with NULL
+        
+        Args:
+            columns(dict): the columns of the common view
+            tableColumns(list): the columns of the source table
+        
+        Return:
+            str: the select list
+        '''
+        selectList=",".join([column if column in tableColumns else f"NULL AS {column}" for column in columns])
+        return selectList
+    
+    @classmethod
+    def getCommonViewDDLs(cls,exclude=None,sqlDB:SQLDB=None):
         '''
         get the SQL DDL for a common view 
         
+        Args:
+            exclude(list): names of source tables to exclude
+            sqlDB(SQLDB): the database to work on - if None the EventCorpus.db is used
+        
         Return:
-            str: the SQL DDL CREATE VIEW command
+            list: the SQL DDL CREATE VIEW commands
         '''
-        # TODO use generalize instead of fixed list
-        commonMap={
-            "event": "eventId,title,url,city,country,region,countryIso,regionIso,acronym,source,year",
-            "eventseries": "source"
-        }
-        viewDDLs=[]
-        for viewName in commonMap.keys():
-            createViewDDL=f"""CREATE VIEW IF NOT EXISTS {viewName} AS\n"""
-            delim=""
-            common=commonMap[viewName]
+        if sqlDB is None:
             sqlDB=EventStorage.getSqlDB()
-            tableList=sqlDB.getTableList()
-            for table in tableList:
-                tableName=table["name"]
-                if tableName.startswith(f"{viewName}_"):
-                    include=True
-                    if exclude is not None:
-                        include=tableName not in exclude
-                    if include:
-                        createViewDDL=f"{createViewDDL}{delim}  SELECT {common} FROM {tableName}"
-                        delim="\nUNION\n" 
-            viewDDLs.append(createViewDDL)
+        viewDDLs=[]
+        for viewName in EventStorage.leadingColumns.keys():
+            viewDDLs.append(EventStorage.getCommonViewDDL(viewName, sqlDB, exclude))
         return viewDDLs
+    
+    @classmethod
+    def getCommonViewDDL(cls,viewName:str,sqlDB:SQLDB,exclude:list=None)->str:
+        '''
+        get the SQL DDL for the common view with the given name
+        
+        Args:
+            viewName(str): the name of the common view e.g. event or eventseries
+            sqlDB(SQLDB): the database to work on
+            exclude(list): names of source tables to exclude
+            
+        Return:
+            str: the SQL DDL CREATE VIEW command
+        '''
+        sourceTables=list(EventStorage.getSourceTableSchemas(viewName, sqlDB, exclude).keys())
+        columns,tableColumns=EventStorage.getCommonColumns(viewName, sqlDB, sourceTables)
+        createViewDDL=f"""CREATE VIEW IF NOT EXISTS {viewName} AS\n"""
+        delim=""
+        for tableName in sourceTables:
+            selectList=EventStorage.getSelectList(columns, tableColumns[tableName])
+            createViewDDL=f"{createViewDDL}{delim}  SELECT {selectList} FROM {tableName}"
+            delim="\nUNION ALL\n" 
+        return createViewDDL
         
     @classmethod
-    def createViews(cls):
+    def createViews(cls,sqlDB:SQLDB=None):
         ''' 
-          create the general Event view
+        create the common event and eventseries views
+        
+        the views are only recreated if the schema of one of their source tables changed
           
         Args:
-            cacheFileName(string): the path to the database
+            sqlDB(SQLDB): the database to work on - if None the EventCorpus.db is used
+        '''
+        if sqlDB is None:
+            sqlDB=EventStorage.getSqlDB()
+        with ConnectionPool.getWriteLock(sqlDB):
+            viewMeta=EventStorage.viewMetaTable.getLookup(sqlDB)
+            for viewName in EventStorage.leadingColumns.keys():
+                schemas=EventStorage.getSourceTableSchemas(viewName, sqlDB)
+                if len(schemas)==0:
+                    continue
+                schemaHash=EventStorage.getSchemaHash(schemas)
+                kind=sqlDB.query("SELECT type FROM sqlite_master WHERE name=?",(viewName,))
+                if len(kind)>0:
+                    if kind[0]["type"]!="view":
+                        # materialized views are refreshed by materializeViews
+                        continue
+                    if viewName in viewMeta and viewMeta[viewName]["schemaHash"]==schemaHash:
+                        continue
+                    sqlDB.execute(f"DROP VIEW {viewName}")
+                viewDDL=EventStorage.getCommonViewDDL(viewName, sqlDB)
+                sqlDB.execute(viewDDL)
+                EventStorage.viewMetaTable.upsert(sqlDB,{"viewName":viewName,"schemaHash":schemaHash})
+            
+    @classmethod
+    def getSourceVersions(cls,sourceTables:list,sqlDB:SQLDB)->dict:
+        '''
+        get the versions of the given source tables
+        
+        Args:
+            sourceTables(list): the names of the source tables
+            sqlDB(SQLDB): the database to work on
+            
+        Return:
+            dict: map of table names to the time of their last recorded change or their row statistics if no change has been recorded
         '''
-        sqlDB=EventStorage.getSqlDB()
-        viewDDLs=EventStorage.getCommonViewDDLs()
-        for viewDDL in viewDDLs:
-            sqlDB.c.execute(viewDDL)
+        changes=TableMeta.table.getLookup(sqlDB)
+        versions={}
+        for tableName in sourceTables:
+            if tableName in changes and changes[tableName]["updated"] is not None:
+                versions[tableName]=f"updated:{changes[tableName]['updated']}"
+            else:
+                stats=sqlDB.query(f"SELECT count(*) AS count,max(rowid) AS maxRowId FROM {tableName}")[0]
+                versions[tableName]=f"rows:{stats['count']}:{stats['maxRowId']}"
+        return versions
+    
+    @classmethod
+    def isMaterialized(cls,sqlDB:SQLDB=None)->bool:
+        '''
+        check whether one of the common views has been materialized as a table
+        
+        Args:
+            sqlDB(SQLDB): the database to work on - if None the EventCorpus.db is used
+            
+        Return:
+            bool: True if the event or eventseries view is a table
+        '''
+        if sqlDB is None:
+            sqlDB=EventStorage.getSqlDB(readOnly=True)
+        viewNames=list(EventStorage.leadingColumns.keys())
+        placeholders=",".join(["?" for _viewName in viewNames])
+        tables=sqlDB.query(f"SELECT name FROM sqlite_master WHERE type='table' AND name IN ({placeholders})",tuple(viewNames))
+        return len(tables)>0
+    
+    @classmethod
+    def materializeViews(cls,refreshTables:list=None,sqlDB:SQLDB=None,profile:bool=False):
+        '''
+        materialize the common views as indexed tables with the same name
+        
+        the rows of each source table are tagged with the column sourceTable so
+        that the materialized tables can be refreshed per source - source tables
+        whose version differs from the materialized version are refreshed
+        
+        Args:
+            refreshTables(list): names of the source tables to refresh in any case
+            sqlDB(SQLDB): the database to work on - if None the EventCorpus.db is used
+            profile(bool): if True show timing information
+        '''
+        if sqlDB is None:
+            sqlDB=EventStorage.getSqlDB()
+        if refreshTables is None:
+            refreshTables=[]
+        metaTable=EventStorage.materializedMetaTable
+        with ConnectionPool.getWriteLock(sqlDB):
+            metaTable.ensureTable(sqlDB)
+            for viewName in EventStorage.leadingColumns.keys():
+                startTime=time.time()
+                sourceTables=list(EventStorage.getSourceTableSchemas(viewName, sqlDB).keys())
+                if len(sourceTables)==0:
+                    continue
+                columns,tableColumns=EventStorage.getCommonColumns(viewName, sqlDB, sourceTables)
+                kind=sqlDB.query("SELECT type FROM sqlite_master WHERE name=?",(viewName,))
+                if len(kind)>0:
+                    if kind[0]["type"]=="view":
+                        sqlDB.execute(f"DROP VIEW {viewName}")
+                        kind=[]
+                    else:
+                        materializedColumns=[columnInfo["name"] for columnInfo in sqlDB.query(f"pragma table_info('{viewName}')")]
+                        if materializedColumns!=list(columns.keys())+["sourceTable"]:
+                            # a source table schema changed - rebuild completely
+                            sqlDB.execute(f"DROP TABLE {viewName}")
+                            kind=[]
+                if len(kind)==0:
+                    # keep the column types of the source tables to keep date conversions working
+                    columnDDL=",".join([f"{column} {sqlType}".strip() for column,sqlType in columns.items()])
+                    sqlDB.execute(f"CREATE TABLE {viewName} ({columnDDL},sourceTable TEXT)")
+                    materialized=[]
+                else:
+                    materialized=[record["sourceTable"] for record in sqlDB.query(f"SELECT DISTINCT sourceTable FROM {viewName}")]
+                for column in EventStorage.materializedIndexColumns[viewName]+["sourceTable"]:
+                    if column in columns or column=="sourceTable":
+                        sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{viewName}_{column} ON {viewName}({column})")
+                removed=[tableName for tableName in materialized if not tableName in sourceTables]
+                for tableName in removed:
+                    sqlDB.c.execute(f"DELETE FROM {viewName} WHERE sourceTable=?",(tableName,))
+                    sqlDB.c.execute(f"DELETE FROM {metaTable.tableName} WHERE sourceTable=?",(tableName,))
+                versions=EventStorage.getSourceVersions(sourceTables, sqlDB)
+                materializedVersions=metaTable.getLookup(sqlDB)
+                refreshed=[]
+                for tableName in sourceTables:
+                    materializedVersion=materializedVersions.get(tableName,{}).get("version",None)
+                    if tableName in refreshTables or not tableName in materialized or materializedVersion!=versions[tableName]:
+                        selectList=EventStorage.getSelectList(columns, tableColumns[tableName])
+                        sqlDB.c.execute(f"DELETE FROM {viewName} WHERE sourceTable=?",(tableName,))
+                        sqlDB.c.execute(f"INSERT INTO {viewName} SELECT {selectList},? FROM {tableName}",(tableName,))
+                        refreshed.append({"sourceTable":tableName,"viewName":viewName,"version":versions[tableName]})
+                sqlDB.c.commit()
+                if refreshed or removed:
+                    metaTable.upsertMany(sqlDB,refreshed)
+                    TableMeta.recordChange(sqlDB,viewName)
+                if profile:
+                    print(f"materializing {viewName} from {len(sourceTables)} tables took {time.time()-startTime:5.1f} s")
     
 
 class Event(JSONAble):
@@ -149,11 +439,9 @@ class Event(JSONAble):
         return text
 
     def getRecord(self):
-        fields = None
-        if hasattr(self, 'getSamples') and callable(getattr(self, 'getSamples')):
-            fields = LOD.getFields(self.getSamples())
+        fields = EventBaseManager.getSampleFields(type(self))
         record = {}
-        recordDict= self.__dict__
+        recordDict=CompactEntity.getDict(self)
         for field in fields:
             if field in recordDict:
                 record[field] = recordDict[field]
@@ -231,6 +519,8 @@ class EventBaseManager(EntityManager):
     '''
     common entity Manager for ConferenceCorpus
     '''
+    # entity class -> fields of its samples
+    sampleFieldsCache={}
     
     def __init__(self,name,entityName,entityPluralName:str,listName:str=None,clazz=None,sourceConfig:EventDataSourceConfig=None,primaryKey:str=None,config=None,handleInvalidListTypes=False,filterInvalidListTypes=False,debug=False,profile=True):
         '''
@@ -247,6 +537,8 @@ class EventBaseManager(EntityManager):
             profile(boolean): True if profiling/timing information should be shown for long-running operations
         '''
         self.profile=profile
+        self.compact=False
+        self.lazy=False
         if config is None:
             config=EventStorage.getStorageConfig(debug=debug)
             self.profile=config.profile
@@ -256,6 +548,74 @@ class EventBaseManager(EntityManager):
             tableName=entityName
         super().__init__(name, entityName, entityPluralName, listName, clazz, tableName, primaryKey, config, handleInvalidListTypes, filterInvalidListTypes, debug)
         
+    def getSQLDB(self,cacheFile):
+        '''
+        get the SQL database for the given cacheFile using the pooled writer connection
+        
+        Args:
+            cacheFile(string): the file to get the SQL db from
+        '''
+        config=self.config
+        sqldb=self.sqldb=EventStorage.getSqlDB(cacheFile=cacheFile,debug=config.debug,errorDebug=config.errorDebug)
+        return sqldb
+    
+    def isCached(self)->bool:
+        '''
+        check whether there is cached data for me using the instance count recorded by the write paths if available
+        
+        Return:
+            bool: True if my table has more than 100 instances
+        '''
+        if self.config.mode is StoreMode.SQL:
+            cacheFile=self.getCacheFile(config=self.config,mode=StoreMode.SQL)
+            if os.path.isfile(cacheFile):
+                if not self.hasCachedTable():
+                    return False
+                counts=TableMeta.getCounts(self.getSQLDB(cacheFile))
+                if self.tableName in counts:
+                    return counts[self.tableName]>100
+        return super().isCached()
+    
+    def hasCachedTable(self)->bool:
+        '''
+        check whether my table exists in the SQL cache - no matter how many instances it has
+        
+        Return:
+            bool: True if my table exists
+        '''
+        cacheFile=self.getCacheFile(config=self.config,mode=StoreMode.SQL)
+        if not os.path.isfile(cacheFile):
+            return False
+        sqlDB=self.getSQLDB(cacheFile)
+        exists=sqlDB.query("SELECT name FROM sqlite_master WHERE type='table' AND name=?",(self.tableName,))
+        return len(exists)>0
+    
+    def storeLoD(self,listOfDicts,limit=10000000,batchSize=250,cacheFile=None,fixNone=True,sampleRecordCount=1)->str:
+        '''
+        store my entities and record the instance count of my table
+        
+        Args:
+            listOfDicts(list): the list of dicts to store
+            limit(int): maximum number of records to store
+            batchSize(int): size of batch for storing
+            cacheFile(string): the name of the storage e.g path to JSON or sqlite3 file
+            fixNone(bool): if True make sure the dicts are filled with None references for each record
+            sampleRecordCount(int): the number of records to analyze for type information
+            
+        Return:
+            str: The cachefile being used
+        '''
+        if self.config.mode is not StoreMode.SQL:
+            return super().storeLoD(listOfDicts,limit=limit,batchSize=batchSize,cacheFile=cacheFile,fixNone=fixNone,sampleRecordCount=sampleRecordCount)
+        if cacheFile is None:
+            cacheFile=self.getCacheFile(config=self.config,mode=self.config.mode)
+        sqlDB=self.getSQLDB(cacheFile)
+        # the table is dropped, recreated and filled in one go
+        with ConnectionPool.getWriteLock(sqlDB):
+            cacheFile=super().storeLoD(listOfDicts,limit=limit,batchSize=batchSize,cacheFile=cacheFile,fixNone=fixNone,sampleRecordCount=sampleRecordCount)
+            TableMeta.recordCount(sqlDB,self.tableName,len(listOfDicts))
+        return cacheFile
+        
     def configure(self):
         '''
         configure me - abstract method that needs to be overridden
@@ -269,6 +629,109 @@ class EventBaseManager(EntityManager):
         for record in listOfDicts:
             record[attr]=value
             
+    def setCompact(self,compact:bool=True):
+        '''
+        switch the compact entity mode on or off - in compact mode my list is set with instances of
+        the slotted variant of my entity class to save memory for large event lists
+        
+        Args:
+            compact(bool): True if compact entities should be used
+        '''
+        self.compact=compact
+        
+    def setListFromLoD(self,lod:list)->list:
+        '''
+        set my list from the given list of dicts - with compact entities if the compact mode is on
+        
+        Args:
+            lod(list): the list of dicts
+            
+        Return:
+            list: the list of entities
+        '''
+        if isinstance(self.getList(),EntityView):
+            # views are read-only
+            self.__dict__[self.listName]=[]
+        if self.clazz is not None and self.compact:
+            # my entity class is kept - only the entities of this list are compact
+            entityClass=self.clazz
+            self.clazz=CompactEntity.getCompactClass(entityClass,CompactEntity.getFields(entityClass,lod))
+            try:
+                return super().setListFromLoD(lod)
+            finally:
+                self.clazz=entityClass
+        return super().setListFromLoD(lod)
+    
+    def getLoD(self)->list:
+        '''
+        get the list of dicts of my entities - compact entities are converted with their asDict method
+        
+        Return:
+            list: a list of dicts
+        '''
+        lod=[]
+        for entity in self.getList():
+            lod.append(CompactEntity.getDict(entity))
+        return lod
+    
+    def toJsonAbleValue(self,v):
+        '''
+        get the JSON able value of the given value - compact entities are converted with their asDict method
+        '''
+        if hasattr(v,"compactFields"):
+            return CompactEntity.asDict(v)
+        return super().toJsonAbleValue(v)
+        
+    def setLazy(self,lazy:bool=True):
+        '''
+        switch the lazy mode on or off - in lazy mode restoring me from the SQL store sets my list
+        to a read-only EntityView of my table instead of loading all entities
+        
+        Args:
+            lazy(bool): True if the lazy mode should be used
+        '''
+        self.lazy=lazy
+        
+    def getView(self,cacheFile:str=None,pageSize:int=1000)->EntityView:
+        '''
+        get a lazy view of the entities of my cached table
+        
+        Args:
+            cacheFile(str): the SQL cache file - default: my configured cache file
+            pageSize(int): the number of rows to fetch per page
+            
+        Return:
+            EntityView: the view using the read-only connection of the current thread
+        '''
+        if cacheFile is None:
+            cacheFile=self.getCacheFile(config=self.config,mode=StoreMode.SQL)
+        sqlDB=EventStorage.getSqlDB(readOnly=True,cacheFile=cacheFile)
+        view=EntityView(sqlDB,self.tableName,self.clazz,pageSize=pageSize)
+        if self.clazz is not None and self.compact:
+            entityClass=self.clazz
+            view.clazz=CompactEntity.getCompactClass(entityClass,CompactEntity.getFields(entityClass,[dict.fromkeys(view.getColumns())]))
+        return view
+    
+    def fromStore(self,cacheFile=None,setList:bool=True)->list:
+        '''
+        restore me from the store - in lazy mode my list is set to a view of my SQL table
+        
+        Args:
+            cacheFile(str): the cacheFile to use if None use the pre configured cachefile
+            setList(bool): if True set my list with the data from the cache file
+            
+        Return:
+            list: the list of dicts or the EntityView in lazy mode
+        '''
+        if self.lazy and setList and self.config.mode is StoreMode.SQL:
+            if cacheFile is None:
+                cacheFile=self.getCacheFile(config=self.config,mode=StoreMode.SQL)
+            self.cacheFile=cacheFile
+            view=self.getView(cacheFile)
+            self.__dict__[self.listName]=view
+            return view
+        return super().fromStore(cacheFile=cacheFile,setList=setList)
+        
     def rateAll(self,ratingManager:RatingManager):
         '''
         rate all events and series based on the given rating Manager
@@ -284,40 +747,80 @@ class EventBaseManager(EntityManager):
                 entity.rate(rating)
                 ratingManager.ratings.append(rating)
             
-    def fromCsv(self, csvString, separator:str= ',', overwriteEvents:bool = True, updateEntitiesCallback:Callable =None):
+    def fromCsv(self, csvString:str=None, separator:str= ',', overwriteEvents:bool = True, updateEntitiesCallback:Callable =None, csvFile=None, withStore:bool=False)->dict:
         """
+        update and extend my entities from the given csv content which is streamed once
 
-        Args:
-            csvString: csvString having all the csv content
-            separator: the separator of the csv
-            append: to append to the self object.
-            updateEntitiesCallback:
+        if the csv has my primary key column the rows with the primary key of one of my entities
+        update the fields that entity has and all other rows are ignored - 
+        otherwise all rows are inserted as new entities in one batch
 
-        Returns: Nothing. The self object is upadated
+        Args:
+            csvString(str): csvString having all the csv content
+            separator(str): the separator of the csv
+            overwriteEvents(bool): passed on to the updateEntitiesCallback
+            updateEntitiesCallback(Callable): callback for each updated entity
+            csvFile: file object to read the csv content from instead of the csvString
+            withStore(bool): if True store my entities to my cache after the import
 
+        Returns:
+            dict: the number of updated, inserted and ignored rows
         """
-        fields= None
-        # limit csv fields to the fields defined in the samples
-        if hasattr(self.clazz, 'getSamples') and callable(getattr(self.clazz, 'getSamples')):
-            fields = LOD.getFields(self.clazz.getSamples())
-        eventRecords= CSV.fromCSV(csvString=csvString,fields=None,delimiter=separator)
-        originalEventsLookup = self.getLookup(attrName=self.primaryKey)[0]
-        for eventRecord in eventRecords:
-            if self.primaryKey in eventRecord:
-                eventRecordPrimaryKey= eventRecord.get(self.primaryKey)
-                if eventRecordPrimaryKey in originalEventsLookup:
-                    originalEvent= originalEventsLookup[eventRecordPrimaryKey]
-                    if hasattr(originalEvent, self.primaryKey):
-                        for key, value in eventRecord.items():
-                            if hasattr(originalEvent, key):
-                                setattr(originalEvent, key, value)
-                        if updateEntitiesCallback is not None and callable(updateEntitiesCallback):
-                            updateEntitiesCallback(originalEvent,overwrite=overwriteEvents)
-            else:
-                self.fromLoD(lod=eventRecords, append=True, debug=self.debug)
-        return None
+        if csvFile is None:
+            csvFile=io.StringIO(csvString)
+        reader=csv.DictReader(csvFile,delimiter=separator,quoting=csv.QUOTE_NONNUMERIC)
+        fieldnames=reader.fieldnames or []
+        withPrimaryKey=self.primaryKey is not None and self.primaryKey in fieldnames
+        entityLookup={}
+        if withPrimaryKey:
+            entityLookup=self.getLookup(attrName=self.primaryKey)[0]
+        updated=0
+        ignored=0
+        inserts=[]
+        for eventRecord in reader:
+            # fix empty csv values as CSV.fromCSV does
+            for key,value in eventRecord.items():
+                if value == '':
+                    eventRecord[key]=None
+            if not withPrimaryKey:
+                inserts.append(eventRecord)
+                continue
+            originalEvent=entityLookup.get(eventRecord[self.primaryKey],None)
+            if originalEvent is None:
+                ignored+=1
+                continue
+            # only the fields the entity has are updated
+            for field in fieldnames:
+                if hasattr(originalEvent,field):
+                    setattr(originalEvent,field,eventRecord[field])
+            updated+=1
+            if updateEntitiesCallback is not None and callable(updateEntitiesCallback):
+                updateEntitiesCallback(originalEvent,overwrite=overwriteEvents)
+        if inserts:
+            self.fromLoD(lod=inserts, append=True, debug=self.debug)
+        if withStore:
+            self.store()
+        return {"updated":updated,"inserted":len(inserts),"ignored":ignored}
 
 
+    @staticmethod
+    def getSampleFields(clazz)->list:
+        '''
+        get the fields of the samples of the given entity class - computed only once per class
+        
+        Args:
+            clazz: the entity class
+            
+        Return:
+            list: the fields or None if the class has no samples
+        '''
+        if not clazz in EventBaseManager.sampleFieldsCache:
+            fields=None
+            if hasattr(clazz, 'getSamples') and callable(getattr(clazz, 'getSamples')):
+                fields=LOD.getFields(clazz.getSamples())
+            EventBaseManager.sampleFieldsCache[clazz]=fields
+        return EventBaseManager.sampleFieldsCache[clazz]
+
     def asCsv(self, separator:str=',', selectorCallback:Callable=None):
         """
         Converts the events to csv format
@@ -328,16 +831,46 @@ class EventBaseManager(EntityManager):
         Returns:
             csv string of events
         """
-        events=self.getList()
-        if selectorCallback is not None and callable(selectorCallback):
-            events=selectorCallback()
-        fields=None
-        # limit csv fields to the fields defined in the samples
-        if hasattr(self.clazz, 'getSamples') and callable(getattr(self.clazz, 'getSamples')):
-            fields=LOD.getFields(self.clazz.getSamples())
-        csvString=CSV.toCSV(events, includeFields=fields, delimiter=separator)
+        csvStream=io.StringIO()
+        self.writeCsv(fileObj=csvStream, separator=separator, selectorCallback=selectorCallback)
+        csvString=csvStream.getvalue()
         return csvString
     
+    def writeCsv(self, fileObj=None, filePath:str=None, separator:str=',', selectorCallback:Callable=None, entities=None, chunkSize:int=1000)->int:
+        """
+        write my events as csv in chunks without building the csv document in memory
+        
+        Args:
+            fileObj: the text file to write to
+            filePath(str): the path of the file to write to if no fileObj is given - gzip compressed if it ends with .gz
+            separator(str): character separating the row values
+            selectorCallback: callback functions returning events to be converted to csv. If None all events are converted.
+            entities: iterable of entities or dicts e.g. SQL rows of a QueryStream to write instead of my events
+            chunkSize(int): the number of rows to write at once
+            
+        Returns:
+            int: the number of rows written
+        """
+        if entities is None:
+            entities=self.getList()
+            if selectorCallback is not None and callable(selectorCallback):
+                entities=selectorCallback()
+            # nothing selected - nothing to write not even a header
+            if entities is None:
+                return 0
+        # limit csv fields to the fields defined in the samples
+        fields=EventBaseManager.getSampleFields(self.clazz)
+        if fields is None and isinstance(entities,list):
+            fields=LOD.getFields([CompactEntity.getDict(entity) if not isinstance(entity,dict) else entity for entity in entities])
+        if fileObj is None:
+            if filePath.endswith(".gz"):
+                openFile=gzip.open(filePath,"wt",newline="")
+            else:
+                openFile=open(filePath,"w",newline="")
+            with openFile as fileObj:
+                return QueryStreamWriter.writeCsvRecords(entities,fileObj,fields=fields,delimiter=separator,chunkSize=chunkSize)
+        return QueryStreamWriter.writeCsvRecords(entities,fileObj,fields=fields,delimiter=separator,chunkSize=chunkSize)
+    
     def postProcessLodRecords(self,listOfDicts:list,**kwArgs):
         '''
         post process the given list of Dicts with raw Events
@@ -372,6 +905,22 @@ class EventSeriesManager(EventBaseManager):
         '''
         super().__init__(name=name,entityName="EventSeries",entityPluralName="EventSeries",primaryKey=primaryKey,listName="series",clazz=clazz,sourceConfig=sourceConfig,handleInvalidListTypes=True,config=config,debug=debug)
         
+    def getInducedLoD(self,seriesKey:str=None,acronym:str="seriesAcronym(acronym)",title:str="titleTemplate(title)")->list:
+        '''
+        get my series by inducing them from the already stored events of my data source
+        
+        Args:
+            seriesKey(str): the SQL expression for the key of the series an event belongs to - default: the normalized acronym stem
+            acronym(str): the SQL expression for the series acronym of an event
+            title(str): the SQL expression for the series title of an event
+            
+        Return:
+            list: the list of dicts of the induced series
+        '''
+        sqlDB=self.getSQLDB(self.getCacheFile())
+        listOfDicts=SeriesInduction.induce(sqlDB,self.dataSource.eventManager.tableName,self.dataSource.sourceConfig.lookupId,seriesKey=seriesKey,acronym=acronym,title=title)
+        return listOfDicts
+        
             
 class EventManager(EventBaseManager):
     '''
@@ -413,8 +962,32 @@ class EventManager(EventBaseManager):
     def getEventsInSeries(self,seriesAcronym):
         """
         Return all the events in a given series.
+        
+        uses the indexed event_series_link table for the linked events of a data source in the SQL cache
+        and the lookups of linkSeriesAndEvent otherwise - the lookups are built on first use
         """
-        if seriesAcronym in self.seriesAcronymLookup:
+        dataSource=getattr(self,"dataSource",None)
+        if dataSource is not None and dataSource.sourceConfig.seriesForeignKey is not None and self.config.mode is StoreMode.SQL and dataSource.isLinked():
+            sqlDB=dataSource.getSqlDB()
+            records=EventSeriesLink.getEventRecords(sqlDB,dataSource.sourceConfig.lookupId,self.tableName,"eventId",seriesAcronym)
+            if len(records)==0:
+                if self.debug:
+                    print(f"Event Series Acronym {seriesAcronym} lookup failed")
+                return None
+            if self.clazz is None:
+                return records
+            seriesEvents=[]
+            for record in records:
+                event=self.clazz()
+                event.fromDict(record)
+                seriesEvents.append(event)
+            return seriesEvents
+        if getattr(self,"seriesLookup",None) is None:
+            if dataSource is None:
+                raise Exception(f"{self.name}: linkSeriesAndEvent needs to be called first for a manager without a data source")
+            seriesKey=dataSource.sourceConfig.seriesForeignKey
+            self.linkSeriesAndEvent(dataSource.eventSeriesManager,seriesKey if seriesKey is not None else "inEventSeries")
+        if seriesAcronym in self.seriesAcronymLookup and seriesAcronym in self.seriesLookup:
             seriesEvents = self.seriesLookup[seriesAcronym]
             if self.debug:
                 print(f"{seriesAcronym}:{len(seriesEvents):4d}")
@@ -423,4 +996,3 @@ class EventManager(EventBaseManager):
                 print(f"Event Series Acronym {seriesAcronym} lookup failed")
             return None
         return seriesEvents
-
@@ -7,6 +7,11 @@ from corpus.event import EventManager, EventSeriesManager, EventStorage
 from corpus.config import EventDataSourceConfig            
 from corpus.quality.rating import RatingManager
 from corpus.datasources.download import Download
+from corpus.cachemeta import SourceMeta, RefreshPlanner
+from corpus.serieslink import EventSeriesLink
+from corpus.entityview import EntityView
+from lodstorage.storageconfig import StoreMode
+import time
 
 class EventDataSource(object):
     '''
@@ -30,20 +35,110 @@ class EventDataSource(object):
         
         self.eventSeriesManager=eventSeriesManager
         self.eventSeriesManager.dataSource=self
+        # fetched, cached or missing after loading
+        self.status=None
+        # the time it took to get ready in seconds
+        self.startupTime=None
         pass
         
-    def load(self,forceUpdate=False):
+    def load(self,forceUpdate=False,cacheOnly:bool=False)->bool:
         '''
         load this data source
+        
+        Args:
+            forceUpdate(bool): True if the data should be fetched from the source instead of the cache
+            cacheOnly(bool): True if the data should only be read from the EventCorpus.db without configuring access to the source and without writing to it
+        
+        Return:
+            bool: True if the data has been fetched from the source instead of the cache
         '''
+        startTime=time.time()
+        lookupId=self.sourceConfig.lookupId
+        if cacheOnly:
+            if forceUpdate:
+                raise Exception(f"{lookupId}: forceUpdate is not possible in cache only mode")
+            missing=[manager.tableName for manager in [self.eventManager,self.eventSeriesManager] if not manager.hasCachedTable()]
+            if missing:
+                self.status=f"missing {','.join(missing)}"
+                self.startupTime=time.time()-startTime
+                return False
+            self.eventManager.fromStore()
+            self.eventSeriesManager.fromStore()
+            # nothing is written in cache only mode - not even the startup status or missing links
+            self.status="cached"
+            self.startupTime=time.time()-startTime
+            return False
         self.eventSeriesManager.configure()
         self.eventManager.configure()
+        fetched=forceUpdate or not self.eventManager.isCached() or not self.eventSeriesManager.isCached()
         # first events
-        self.eventManager.fromCache(force=forceUpdate)
+        eventLod=self.eventManager.fromCache(force=forceUpdate)
         # then series
-        self.eventSeriesManager.fromCache(force=forceUpdate)
-        # TODO use same foreign key in all dataSources
-        self.eventManager.linkSeriesAndEvent(self.eventSeriesManager,"inEventSeries")
+        seriesLod=self.eventSeriesManager.fromCache(force=forceUpdate)
+        self.linkSeriesAndEvents(rebuild=fetched)
+        duration=time.time()-startTime
+        if fetched:
+            fingerprint=self.getFingerprint()
+            if fingerprint is None:
+                # in lazy mode cached tables are restored as views
+                lods=[lod.getLoD() if isinstance(lod,EntityView) else lod for lod in (eventLod,seriesLod)]
+                fingerprint=SourceMeta.lodFingerprint(lods[0]+lods[1])
+            SourceMeta.recordLoad(self.getSqlDB(),lookupId,len(eventLod),len(seriesLod),fingerprint,duration)
+        self.status="fetched" if fetched else "cached"
+        self.startupTime=duration
+        SourceMeta.recordStartup(self.getSqlDB(),lookupId,self.status,duration)
+        return fetched
+            
+    def linkSeriesAndEvents(self,rebuild:bool=False)->int:
+        '''
+        link my events to my event series via the event_series_link table using my configured foreign key
+        
+        Args:
+            rebuild(bool): if True rebuild the links even if there are links already
+            
+        Return:
+            int: the number of links built or -1 if the existing links have been kept
+        '''
+        sourceConfig=self.sourceConfig
+        if sourceConfig.seriesForeignKey is None or self.eventManager.config.mode is not StoreMode.SQL:
+            return 0
+        sqlDB=self.getSqlDB()
+        if not rebuild and self.isLinked():
+            return -1
+        count=EventSeriesLink.build(sqlDB,sourceConfig.lookupId,
+            eventTable=self.eventManager.tableName,eventIdColumn="eventId",
+            seriesTable=self.eventSeriesManager.tableName,
+            foreignKey=sourceConfig.seriesForeignKey,seriesKey=sourceConfig.seriesKey,
+            debug=self.eventManager.debug)
+        SourceMeta.recordLinks(sqlDB,sourceConfig.lookupId,count)
+        return count
+    
+    def isLinked(self)->bool:
+        '''
+        check whether my events have been linked to my event series - also if no link could be found
+        '''
+        sqlDB=self.getSqlDB()
+        lookupId=self.sourceConfig.lookupId
+        if EventSeriesLink.hasLinks(sqlDB,lookupId):
+            return True
+        meta=SourceMeta.getMetaData(sqlDB).get(lookupId,{})
+        return meta.get("linkCount",None)==0
+            
+    def getSqlDB(self):
+        '''
+        get the pooled writer of the database my managers store to
+        '''
+        cacheFile=self.eventManager.getCacheFile(config=self.eventManager.config,mode=StoreMode.SQL)
+        return EventStorage.getSqlDB(cacheFile=cacheFile)
+            
+    def getFingerprint(self)->str:
+        '''
+        get a cheap fingerprint of the original source e.g. based on the modification time of a dump file
+        
+        Return:
+            str: the fingerprint or None if the source can not be fingerprinted without fetching it
+        '''
+        return None
         
     def rateAll(self,ratingManager:RatingManager):
         '''
@@ -80,15 +175,55 @@ class EventCorpus(object):
         self.eventDataSources[eventDataSource.sourceConfig.lookupId]=eventDataSource
         pass
     
-    def loadAll(self,forceUpdate:bool=False):
+    def loadAll(self,forceUpdate:bool=False,refreshIds:list=None,cacheOnly:bool=False)->list:
         '''
         load all eventDataSources
         
         Args:
             forceUpdate(bool): True if the data should be fetched from the source instead of the cache
+            refreshIds(list): lookupIds of the data sources to be fetched from the source if they are stale - "all" for all data sources
+            cacheOnly(bool): True if the data should only be read from the EventCorpus.db - data sources without cached tables are skipped
+            
+        Return:
+            list: the lookupIds of the data sources that have been fetched from the source
+        '''
+        staleIds=[]
+        if refreshIds is not None:
+            if cacheOnly:
+                raise Exception("refreshing data sources is not possible in cache only mode")
+            planner=RefreshPlanner(self,EventStorage.getSqlDB(),debug=self.debug)
+            staleIds=planner.plan(refreshIds)
+        fetchedIds=[]
+        for lookupId,eventDataSource in self.eventDataSources.items():
+            if eventDataSource.load(forceUpdate=forceUpdate or lookupId in staleIds,cacheOnly=cacheOnly):
+                fetchedIds.append(lookupId)
+            if self.debug:
+                print(f"{lookupId}: {eventDataSource.status}")
+        if cacheOnly:
+            missing=[f"{lookupId}: {eventDataSource.status}" for lookupId,eventDataSource in self.eventDataSources.items() if eventDataSource.status!="cached"]
+            if missing and len(missing)==len(self.eventDataSources):
+                missingText="\n".join(missing)
+                raise Exception(f"no data source is cached:\n{missingText}")
+        return fetchedIds
+        
+    def getStartupReport(self)->list:
+        '''
+        get the status and startup time of my data sources
+        
+        Return:
+            list: the list of dicts with the lookupId, status, startupTime and loadTime per data source - the recorded status of data sources not loaded yet
         '''
-        for eventDataSource in self.eventDataSources.values():
-            eventDataSource.load(forceUpdate=forceUpdate)
+        report=[]
+        for lookupId,eventDataSource in self.eventDataSources.items():
+            meta=SourceMeta.getMetaData(eventDataSource.getSqlDB()).get(lookupId,{})
+            loaded=eventDataSource.status is not None
+            report.append({
+                "lookupId":lookupId,
+                "status":eventDataSource.status if loaded else meta.get("status",None),
+                "startupTime":eventDataSource.startupTime if loaded else meta.get("startupTime",None),
+                "loadTime":meta.get("loadTime",None)
+            })
+        return report
            
     @staticmethod        
     def download():
@@ -98,5 +233,7 @@ class EventCorpus(object):
         fileName="EventCorpus.db"
         url = f"https://github.com/WolfgangFahl/ConferenceCorpus/wiki/data/{fileName}.gz"
         targetDirectory=EventStorage.getStorageConfig().getCachePath()
+        # the database file might be replaced
+        EventStorage.closeConnections()
         Download.downloadBackupFile(url, fileName, targetDirectory)
      
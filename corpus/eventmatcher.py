@@ -0,0 +1,231 @@
+from corpus.cachemeta import TableMeta
+from corpus.event import EventStorage
+from corpus.normalizer import EventNormalizer
+from corpus.sqlpool import ConnectionPool
+from lodstorage.sql import SQLDB
+import time
+
+class UnionFind(object):
+    '''
+    disjoint sets of the integers 0..n-1 with path compression
+    '''
+
+    def __init__(self,n:int):
+        '''
+        constructor
+
+        Args:
+            n(int): the number of elements
+        '''
+        self.parent=list(range(n))
+
+    def find(self,i:int)->int:
+        '''
+        get the representative of the set of the given element
+        '''
+        root=i
+        while self.parent[root]!=root:
+            root=self.parent[root]
+        while self.parent[i]!=root:
+            self.parent[i],i=root,self.parent[i]
+        return root
+
+    def union(self,i:int,j:int):
+        '''
+        merge the sets of the given elements
+        '''
+        rootI,rootJ=self.find(i),self.find(j)
+        if rootI!=rootJ:
+            self.parent[max(rootI,rootJ)]=min(rootI,rootJ)
+
+class EventMatcher(object):
+    '''
+    match the events of the different data sources and assign a canonical event id to each cluster of matching events
+
+    candidates are only compared within blocks of events sharing the (normalized acronym, year) or an external id
+    '''
+    clusterTableName="event_cluster"
+    # external id columns and the data source namespace of their values
+    externalIdColumns={
+        "dblpConferenceId":"dblp",
+        "wikiCfpId":"wikicfp",
+        "wikiCFPId":"wikicfp",
+        "wikidataId":"wikidata"
+    }
+    # data sources whose eventId is an external id for other data sources - in order of preference for the canonical id
+    sourceNamespaces={
+        "event_wikidata":"wikidata",
+        "event_dblp":"dblp",
+        "event_wikicfp":"wikicfp"
+    }
+    columns=["eventId","acronym","title","year","startDate","city","country"]
+    weights={"title":0.5,"date":0.3,"location":0.2}
+
+    def __init__(self,sqlDB:SQLDB,sourceTables:list=None,threshold:float=0.5,maxBlockSize:int=100,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database with the event tables of the data sources
+            sourceTables(list): the event tables to match - default: all event tables
+            threshold(float): the minimum score of a matching pair
+            maxBlockSize(int): blocks with more events are considered too unspecific and are skipped
+            debug(bool): if True show progress information
+        '''
+        self.sqlDB=sqlDB
+        if sourceTables is None:
+            sourceTables=list(EventStorage.getSourceTableSchemas("event",sqlDB).keys())
+        self.sourceTables=sourceTables
+        self.threshold=threshold
+        self.maxBlockSize=maxBlockSize
+        self.debug=debug
+
+    def getRecords(self)->list:
+        '''
+        get the records to match from my source tables
+
+        Return:
+            list: a list of dicts with the matching relevant columns plus sourceTable and external ids
+        '''
+        records=[]
+        for tableName in self.sourceTables:
+            tableColumns=[columnInfo["name"] for columnInfo in self.sqlDB.query(f"pragma table_info('{tableName}')")]
+            if not "eventId" in tableColumns:
+                continue
+            idColumns=[column for column in EventMatcher.externalIdColumns.keys() if column in tableColumns]
+            selectList=",".join([column if column in tableColumns else f"NULL AS {column}" for column in EventMatcher.columns+idColumns])
+            for record in self.sqlDB.query(f"SELECT {selectList} FROM {tableName} WHERE eventId IS NOT NULL"):
+                record["sourceTable"]=tableName
+                record["externalIds"]=[(EventMatcher.externalIdColumns[column],str(record[column])) for column in idColumns if record[column] is not None]
+                if tableName in EventMatcher.sourceNamespaces:
+                    record["externalIds"].append((EventMatcher.sourceNamespaces[tableName],str(record["eventId"])))
+                record["stem"]=EventNormalizer.getAcronymStem(record["acronym"])
+                record["titleTokens"]=EventNormalizer.getTitleTokens(record["title"])
+                startDate=record["startDate"]
+                record["date"]=str(startDate)[:10] if startDate is not None else None
+                year=record["year"]
+                if year is None and record["date"] is not None:
+                    year=record["date"][:4]
+                if year is None:
+                    year=EventNormalizer.extractYear(record["acronym"])
+                record["year"]=int(year) if year is not None and str(year).isdigit() else None
+                records.append(record)
+        return records
+
+    def getBlocks(self,records:list)->dict:
+        '''
+        get the blocks of candidate events
+
+        Args:
+            records(list): the records to block
+
+        Return:
+            dict: map of blocking keys to lists of record indices
+        '''
+        blocks={}
+        for index,record in enumerate(records):
+            keys=[("id",namespace,value) for namespace,value in record["externalIds"]]
+            if record["stem"] is not None and record["year"] is not None:
+                keys.append(("acronym",record["stem"],record["year"]))
+            for key in keys:
+                blocks.setdefault(key,[]).append(index)
+        return blocks
+
+    def score(self,record1:dict,record2:dict)->float:
+        '''
+        score the similarity of the given records based on title, date and location
+
+        Return:
+            float: the score between 0 and 1 - 0.5 if there is no evidence besides the blocking key
+        '''
+        total=0.0
+        weightSum=0.0
+        tokens1,tokens2=record1["titleTokens"],record2["titleTokens"]
+        if tokens1 and tokens2:
+            total+=EventMatcher.weights["title"]*len(tokens1 & tokens2)/len(tokens1 | tokens2)
+            weightSum+=EventMatcher.weights["title"]
+        if record1["date"] is not None and record2["date"] is not None:
+            total+=EventMatcher.weights["date"]*(1.0 if record1["date"]==record2["date"] else 0.0)
+            weightSum+=EventMatcher.weights["date"]
+        city1,city2=record1["city"],record2["city"]
+        if city1 and city2:
+            total+=EventMatcher.weights["location"]*(1.0 if str(city1).casefold()==str(city2).casefold() else 0.0)
+            weightSum+=EventMatcher.weights["location"]
+        if weightSum==0:
+            return 0.5
+        return total/weightSum
+
+    def match(self,records:list)->list:
+        '''
+        get the matching pairs of records of different source tables
+
+        Return:
+            list: a list of (index1,index2,score) tuples
+        '''
+        matches={}
+        for key,indices in self.getBlocks(records).items():
+            if len(indices)<2 or len(indices)>self.maxBlockSize:
+                continue
+            for pos,i in enumerate(indices):
+                for j in indices[pos+1:]:
+                    if records[i]["sourceTable"]==records[j]["sourceTable"] or (i,j) in matches:
+                        continue
+                    # shared external ids are conclusive
+                    score=1.0 if key[0]=="id" else self.score(records[i],records[j])
+                    if score>=self.threshold:
+                        matches[(i,j)]=score
+        return [(i,j,score) for (i,j),score in matches.items()]
+
+    def getCanonicalOrder(self,record:dict)->tuple:
+        '''
+        get the sort key for choosing the canonical event of a cluster
+        '''
+        preferred=list(EventMatcher.sourceNamespaces.keys())
+        rank=preferred.index(record["sourceTable"]) if record["sourceTable"] in preferred else len(preferred)
+        return (rank,record["sourceTable"],str(record["eventId"]))
+
+    def run(self)->dict:
+        '''
+        match all events and (re)write the cluster table
+
+        Return:
+            dict: statistics of the run
+        '''
+        startTime=time.time()
+        records=self.getRecords()
+        matches=self.match(records)
+        unionFind=UnionFind(len(records))
+        bestScores={}
+        for i,j,score in matches:
+            unionFind.union(i,j)
+            for index in i,j:
+                bestScores[index]=max(score,bestScores.get(index,0.0))
+        clusters={}
+        for index in range(len(records)):
+            clusters.setdefault(unionFind.find(index),[]).append(index)
+        rows=[]
+        for indices in clusters.values():
+            canonical=min([records[index] for index in indices],key=self.getCanonicalOrder)
+            canonicalId=f"{canonical['sourceTable']}:{canonical['eventId']}"
+            for index in indices:
+                record=records[index]
+                rows.append((record["sourceTable"],str(record["eventId"]),canonicalId,len(indices),bestScores.get(index,None)))
+        tableName=EventMatcher.clusterTableName
+        with ConnectionPool.getWriteLock(self.sqlDB):
+            self.sqlDB.execute(f"DROP TABLE IF EXISTS {tableName}")
+            self.sqlDB.execute(f"CREATE TABLE {tableName} (sourceTable TEXT,eventId TEXT,canonicalId TEXT,clusterSize INTEGER,score REAL)")
+            self.sqlDB.c.executemany(f"INSERT INTO {tableName} VALUES (?,?,?,?,?)",rows)
+            self.sqlDB.execute(f"CREATE INDEX idx_{tableName}_canonicalId ON {tableName}(canonicalId)")
+            self.sqlDB.execute(f"CREATE INDEX idx_{tableName}_event ON {tableName}(sourceTable,eventId)")
+            self.sqlDB.c.commit()
+            TableMeta.recordChange(self.sqlDB,tableName,len(rows))
+        stats={
+            "events":len(records),
+            "matches":len(matches),
+            "clusters":len(clusters),
+            "multiSourceClusters":len([indices for indices in clusters.values() if len(indices)>1]),
+            "duration":time.time()-startTime
+        }
+        if self.debug:
+            print(stats)
+        return stats
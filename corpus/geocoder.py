@@ -0,0 +1,65 @@
+from corpus.locationindex import LocationAliasIndex
+
+class Geocoder(object):
+    '''
+    a geocoder backend that resolves location texts to wikidata ids
+    '''
+
+    def geocode(self,locationText:str)->str:
+        '''
+        geocode the given location text - needs to be overridden
+
+        Args:
+            locationText(str): the text to geocode e.g. "Beijing, China"
+
+        Return:
+            str: the wikidata id of the location or None if the text could not be resolved
+        '''
+        raise Exception(f"geocode for {type(self).__name__} needs to be implemented")
+
+    def geocodeMany(self,locationTexts:list)->dict:
+        '''
+        geocode the given location texts
+
+        Args:
+            locationTexts(list): the distinct texts to geocode
+
+        Return:
+            dict: map of location text to wikidata id or None
+        '''
+        return {locationText:self.geocode(locationText) for locationText in locationTexts}
+
+class AliasIndexGeocoder(Geocoder):
+    '''
+    offline geocoder backed by a LocationAliasIndex of the city aliases e.g. "Berlin, Germany" or "Santa Barbara, CA"
+    derived from the geograpy3 location data - city names shared by several cities e.g. "Paris" are not resolved
+    '''
+
+    def __init__(self,aliasIndex:LocationAliasIndex=None):
+        '''
+        constructor
+
+        Args:
+            aliasIndex(LocationAliasIndex): the alias index to query - see build if None
+        '''
+        self.aliasIndex=aliasIndex
+
+    def build(self,cityRecords:list,curated:dict=None)->int:
+        '''
+        (re)build my alias index from the given city records
+
+        Args:
+            cityRecords(list): the city records see LocationAliasIndex.getCityRecords
+            curated(dict): map of location texts to wikidata ids
+
+        Return:
+            int: the number of aliases
+        '''
+        self.aliasIndex=LocationAliasIndex()
+        return self.aliasIndex.build(cityRecords,curated)
+
+    def geocode(self,locationText:str)->str:
+        if self.aliasIndex is None:
+            raise Exception("the alias index of the offline geocoder has not been built")
+        _isAlias,wikidataId=self.aliasIndex.lookup(locationText)
+        return wikidataId
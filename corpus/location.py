@@ -6,13 +6,110 @@ Created on 2021-08-11
 #from lodstorage.entity import EntityManager
 from geograpy.locator import LocationContext
 from OSMPythonTools.nominatim import Nominatim 
+from lodstorage.sql import SQLDB
+from corpus.event import EventStorage
+from corpus.cachemeta import MetaTable, TableMeta
+from corpus.geocoder import Geocoder, AliasIndexGeocoder
+from corpus.config import GeocoderConfig
+from corpus.locationindex import LocationAliasIndex
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import os
 import logging
+import threading
+
+class NominatimGeocoder(Geocoder):
+    '''
+    geocoder using the wikidata extratag of the first result of a Nominatim search
+
+    the public Nominatim service is rate limited - a self hosted Nominatim endpoint
+    can be queried with a bounded number of concurrent queries
+    '''
+    publicEndpoint="https://nominatim.openstreetmap.org/"
+
+    def __init__(self,endpoint:str=None,cacheDir:str=None,maxWorkers:int=None,waitBetweenQueries:float=None):
+        '''
+        constructor
+
+        Args:
+            endpoint(str): the Nominatim endpoint - default: the public Nominatim service
+            cacheDir(str): the directory for the OSMPythonTools query cache
+            maxWorkers(int): the maximum number of concurrent queries - default: 1 for the public service and 8 otherwise
+            waitBetweenQueries(float): the seconds to wait between the queries of a worker - default: 1 for the public service
+        '''
+        self.endpoint=endpoint if endpoint is not None else NominatimGeocoder.publicEndpoint
+        isPublic=self.endpoint==NominatimGeocoder.publicEndpoint
+        self.cacheDir=cacheDir
+        if self.cacheDir is not None and not os.path.exists(self.cacheDir):
+            os.makedirs(self.cacheDir)
+        self.maxWorkers=maxWorkers if maxWorkers is not None else (1 if isPublic else 8)
+        self.waitBetweenQueries=waitBetweenQueries if waitBetweenQueries is not None else (1 if isPublic else None)
+        # a Nominatim client per thread
+        self.threadLocal=threading.local()
+        logging.getLogger('OSMPythonTools').setLevel(logging.ERROR)
+
+    def getNominatim(self):
+        '''
+        get the Nominatim client of the current thread
+        '''
+        nominatim=getattr(self.threadLocal,"nominatim",None)
+        if nominatim is None:
+            kwArgs={"endpoint":self.endpoint,"waitBetweenQueries":self.waitBetweenQueries}
+            if self.cacheDir is not None:
+                kwArgs["cacheDir"]=self.cacheDir
+            nominatim=Nominatim(**kwArgs)
+            self.threadLocal.nominatim=nominatim
+        return nominatim
+
+    def geocode(self,locationText:str)->str:
+        wikidataID=None
+        nresult=self.getNominatim().query(locationText,params={"extratags":"1"})
+        nlod=nresult._json
+        if len(nlod)>0:
+            nrecord=nlod[0]
+            if "extratags" in nrecord and nrecord["extratags"]:
+                extratags=nrecord["extratags"]
+                if "wikidata" in extratags:
+                    wikidataID=extratags["wikidata"]
+        return wikidataID
+
+    def tryGeocode(self,locationText:str)->tuple:
+        '''
+        geocode the given location text without raising an exception
+
+        Return:
+            tuple: the wikidata id or None and True if the query succeeded
+        '''
+        try:
+            return self.geocode(locationText),True
+        except Exception as ex:
+            print(f"❌geocoding {locationText} failed: {ex}")
+            return None,False
+
+    def geocodeMany(self,locationTexts:list)->dict:
+        '''
+        geocode the given location texts with at most maxWorkers concurrent queries
+        - the texts for which the query failed are left out of the result
+        '''
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            results=list(executor.map(self.tryGeocode,locationTexts))
+        return {locationText:wikidataId for locationText,(wikidataId,ok) in zip(locationTexts,results) if ok}
 
 class LocationLookup:
     '''
     lookup locations
     '''
+    # persistent cache of resolved location texts - unresolved texts are cached with a None wikidataid
+    resolutionTable=MetaTable("locationcache","locationText",{
+        "locationText":"TEXT",
+        "wikidataid":"TEXT",
+        "method":"TEXT",
+        "timestamp":"TIMESTAMP"
+    })
+    # maximum number of parameters per cache query and number of misses to resolve before the cache is updated
+    chunkSize=500
+    # methods of cached resolutions that are resolved again when they are older than the retry age
+    retryMethods=["unresolved","conflict","unchecked"]
     preDefinedLocations={
         "Not Known": None,
         "Online": None,
@@ -126,19 +223,73 @@ class LocationLookup:
         "Kyoto Japan": "Q34600"
     }
 
-    def __init__(self):
+    def __init__(self,sqlDB:SQLDB=None,geocoder:Geocoder=None,aliasIndex:LocationAliasIndex=None,retryAge:float=7*86400,geocoderConfig:GeocoderConfig=None):
         '''
         Constructor
+        
+        Args:
+            sqlDB(SQLDB): the database for the resolution cache - default: the EventCorpus.db
+            geocoder(Geocoder): the geocoder backend to cross check the geograpy results with - default: the geocoder of the geocoderConfig
+            aliasIndex(LocationAliasIndex): the index of known location aliases - default: the cached index see getAliasIndex
+            retryAge(float): the age in seconds after which unresolved, conflicting and unchecked cached resolutions are resolved again - None for never
+            geocoderConfig(GeocoderConfig): the configuration of the geocoder backend if no geocoder is given - default: the public Nominatim service
         '''
+        self.sqlDB=sqlDB
+        self.retryAge=retryAge
+        # wikidataid -> location
+        self.locationCache={}
+        self.cacheStats={}
         self.locationContext=LocationContext.fromCache()
-        cacheRootDir=LocationContext.getDefaultConfig().cacheRootDir
-        cacheDir=f"{cacheRootDir}/.nominatim"
-        if not os.path.exists(cacheDir):
-            os.makedirs(cacheDir)
+        self.aliasIndex=aliasIndex if aliasIndex is not None else self.getAliasIndex()
+        self.geocoder=geocoder if geocoder is not None else self.getGeocoder(geocoderConfig)
+        
+    def getGeocoder(self,geocoderConfig:GeocoderConfig=None)->Geocoder:
+        '''
+        get the geocoder for the given configuration
+        
+        Args:
+            geocoderConfig(GeocoderConfig): the configuration of the geocoder backend - default: the public Nominatim service
             
-        self.nominatim = Nominatim(cacheDir=cacheDir)
-        logging.getLogger('OSMPythonTools').setLevel(logging.ERROR)
+        Return:
+            Geocoder: the geocoder
+        '''
+        if geocoderConfig is None:
+            geocoderConfig=GeocoderConfig()
+        if geocoderConfig.backend=="offline":
+            # my alias index has been loaded or built if it was missing
+            return AliasIndexGeocoder(self.aliasIndex)
+        cacheRootDir=LocationContext.getDefaultConfig().cacheRootDir
+        return NominatimGeocoder(endpoint=geocoderConfig.endpoint,cacheDir=f"{cacheRootDir}/.nominatim",maxWorkers=geocoderConfig.maxWorkers)
+        
+    @classmethod
+    def getAliasIndexFile(cls)->str:
+        '''
+        get the file of the cached LocationAliasIndex
+        '''
+        cachePath=EventStorage.getStorageConfig().getCachePath()
+        return f"{cachePath}/locationaliases.pickle"
+    
+    def getAliasIndex(self,forceUpdate:bool=False)->LocationAliasIndex:
+        '''
+        get the alias index from the cache or build it from the cities of my location context
+        and the curated locations - the cached index is rebuilt if the geograpy3 database or the curated locations changed
         
+        Args:
+            forceUpdate(bool): if True rebuild the index
+            
+        Return:
+            LocationAliasIndex: the alias index
+        '''
+        indexFile=LocationLookup.getAliasIndexFile()
+        curated={**LocationLookup.other,**LocationLookup.preDefinedLocations}
+        # the cities are only read if the index needs to be rebuilt
+        fingerprint=LocationAliasIndex.getFingerprint(LocationContext.getDefaultConfig().cacheFile,curated)
+        aliasIndex=None if forceUpdate else LocationAliasIndex.load(indexFile,fingerprint)
+        if aliasIndex is None:
+            aliasIndex=LocationAliasIndex()
+            aliasIndex.build(LocationAliasIndex.getCityRecords(self.locationContext),curated,fingerprint)
+            aliasIndex.store(indexFile)
+        return aliasIndex
         
     def getCityByWikiDataId(self,wikidataID:str):
         '''
@@ -152,35 +303,168 @@ class LocationLookup:
         else:
             return None
         
-    def lookupNominatim(self,locationText:str):
+    def lookupNominatim(self,locationText:str,geocoded:dict=None):
+        '''
+        lookup the city for the given locationText with my geocoder backend
+        
+        Args:
+            locationText(str): the text to lookup
+            geocoded(dict): map of location texts to wikidata ids geocoded in advance - texts not in the map are geocoded
+        '''
         location=None
-        nresult=self.nominatim.query(locationText,params={"extratags":"1"})
-        nlod=nresult._json
-        if len(nlod)>0:
-            nrecord=nlod[0]
-            if "extratags" in nrecord:
-                extratags=nrecord["extratags"]
-                if "wikidata" in extratags:
-                    wikidataID=extratags["wikidata"]
-                    location=self.getCityByWikiDataId(wikidataID)
+        if geocoded is not None and locationText in geocoded:
+            wikidataID=geocoded[locationText]
+        else:
+            wikidataID=self.geocoder.geocode(locationText)
+        if wikidataID is not None:
+            location=self.getCityByWikiDataId(wikidataID)
         return location
         
-    def lookup(self,locationText:str):
-        if locationText in LocationLookup.preDefinedLocations:
-            locationId=LocationLookup.preDefinedLocations[locationText]
+    def getLocationByWikiDataId(self,wikidataID:str):
+        '''
+        get the city, region or country for the given wikidataID - remembering the locations found
+        '''
+        if wikidataID in self.locationCache:
+            return self.locationCache[wikidataID]
+        location=None
+        for manager in [self.locationContext.cityManager,self.locationContext.regionManager,self.locationContext.countryManager]:
+            locationsGen=manager.getLocationsByWikidataId(wikidataID)
+            if locationsGen is not None:
+                locations=list(locationsGen)
+                if len(locations)>0:
+                    location=locations[0]
+                    break
+        self.locationCache[wikidataID]=location
+        return location
+        
+    def resolve(self,locationText:str,geocoded:dict=None)->tuple:
+        '''
+        resolve the given location text
+        
+        Args:
+            locationText(str): the text to resolve e.g. "Beijing, China"
+            geocoded(dict): map of location texts to wikidata ids geocoded in advance see Geocoder.geocodeMany
+            
+        Return:
+            tuple: the location or None and the method used: alias,geograpy,conflict,unresolved or 
+            unchecked if the geograpy result could not be cross checked since the geocoding failed
+        '''
+        isAlias,locationId=self.aliasIndex.lookup(locationText)
+        if isAlias:
             if locationId is None:
-                return None
+                return None,"alias"
             else:
-                location=self.getCityByWikiDataId(locationId)
+                location=self.getLocationByWikiDataId(locationId)
                 if location is None:
-                    print(f"❌❌-predefinedLocation {locationText}→{locationId} wikidataId not resolved")
-                return location
+                    print(f"❌❌-alias {locationText}→{locationId} wikidataId not resolved")
+                return location,"alias"
         lg=self.lookupGeograpy(locationText)
-        ln=self.lookupNominatim(locationText)
+        try:
+            ln=self.lookupNominatim(locationText,geocoded)
+        except Exception as ex:
+            print(f"❌geocoding {locationText} failed: {ex}")
+            return lg,"unchecked"
         if ln is not None and lg is not None and not ln.wikidataid==lg.wikidataid:
             print(f"❌❌{locationText}→{lg}!={ln}")
-            return None
-        return lg
+            return None,"conflict"
+        return lg,"geograpy" if lg is not None else "unresolved"
+        
+    def lookup(self,locationText:str):
+        location,_method=self.resolve(locationText)
+        return location
+    
+    def getSqlDB(self)->SQLDB:
+        '''
+        get the database of my resolution cache
+        '''
+        if self.sqlDB is None:
+            self.sqlDB=EventStorage.getSqlDB()
+        return self.sqlDB
+    
+    def getCachedResolutions(self,locationTexts:list)->dict:
+        '''
+        get the cached resolutions of the given location texts
+        
+        Args:
+            locationTexts(list): the distinct location texts
+            
+        Return:
+            dict: map of location text to the cache record
+        '''
+        sqlDB=self.getSqlDB()
+        table=LocationLookup.resolutionTable
+        cached={}
+        if not table.exists(sqlDB):
+            return cached
+        for offset in range(0,len(locationTexts),LocationLookup.chunkSize):
+            chunk=locationTexts[offset:offset+LocationLookup.chunkSize]
+            placeholders=",".join(["?" for _text in chunk])
+            for record in sqlDB.query(f"SELECT * FROM {table.tableName} WHERE locationText IN ({placeholders})",tuple(chunk)):
+                cached[record["locationText"]]=record
+        return cached
+    
+    def needsRetry(self,record:dict,now:datetime)->bool:
+        '''
+        check whether the given cached resolution should be resolved again
+        
+        Args:
+            record(dict): the cache record
+            now(datetime): the point in time to check the retry age against
+            
+        Return:
+            bool: True if the resolution failed and is older than my retry age
+        '''
+        if self.retryAge is None or not record["method"] in LocationLookup.retryMethods:
+            return False
+        timestamp=record["timestamp"]
+        if timestamp is None:
+            return True
+        if isinstance(timestamp,str):
+            timestamp=datetime.fromisoformat(timestamp)
+        return (now-timestamp).total_seconds()>self.retryAge
+        
+    def lookupMany(self,locationTexts:list,withCache:bool=True)->dict:
+        '''
+        lookup the given location texts - each distinct text is only resolved once and
+        the resolutions are kept in the persistent resolution cache which is updated per chunk of misses - 
+        unresolved, conflicting and unchecked texts are resolved again once they are older than my retry age
+        
+        Args:
+            locationTexts(list): the location texts to lookup - may contain duplicates and None values
+            withCache(bool): if False ignore the cached resolutions and resolve all texts again
+            
+        Return:
+            dict: map of the distinct location texts to the location or None if the text could not be resolved
+        '''
+        distinct=list(dict.fromkeys([text for text in locationTexts if text is not None]))
+        cached=self.getCachedResolutions(distinct) if withCache else {}
+        now=datetime.now()
+        misses=[text for text in distinct if not text in cached or self.needsRetry(cached[text],now)]
+        for offset in range(0,len(misses),LocationLookup.chunkSize):
+            chunk=misses[offset:offset+LocationLookup.chunkSize]
+            # geocode the misses of the chunk in one go e.g. with concurrent queries
+            geocoded=self.geocoder.geocodeMany([text for text in chunk if not self.aliasIndex.lookup(text)[0]])
+            timestamp=datetime.now()
+            records=[]
+            for text in chunk:
+                location,method=self.resolve(text,geocoded)
+                wikidataid=None
+                if location is not None:
+                    wikidataid=location.wikidataid
+                    self.locationCache[wikidataid]=location
+                record={"locationText":text,"wikidataid":wikidataid,"method":method,"timestamp":timestamp}
+                cached[text]=record
+                records.append(record)
+            # the resolutions of long runs are kept even if a later chunk fails
+            sqlDB=self.getSqlDB()
+            LocationLookup.resolutionTable.upsertMany(sqlDB,records)
+            TableMeta.recordChange(sqlDB,LocationLookup.resolutionTable.tableName)
+        resolved={}
+        for text in distinct:
+            wikidataid=cached[text]["wikidataid"]
+            resolved[text]=self.getLocationByWikiDataId(wikidataid) if wikidataid is not None else None
+        self.cacheStats={"distinct":len(distinct),"hits":len(distinct)-len(misses),"misses":len(misses)}
+        return resolved
         
     def lookupGeograpy(self,locationText:str):
         '''
@@ -0,0 +1,324 @@
+from corpus.cachemeta import SourceMeta
+from array import array
+import bisect
+import hashlib
+import json
+import os
+import pickle
+import unicodedata
+
+class LocationAliasIndex(object):
+    '''
+    an index of location aliases e.g. "Phoenix, AZ, USA" built from the city labels and curated entries
+
+    the aliases are normalized - accents, punctuation, country and state names and token order do not matter -
+    so that exact hits resolve with a single dict lookup and aliases can be looked up by prefix -
+    plain city names are only aliases if no other city has the same name e.g. "Paris" is not
+    '''
+    version=2
+    # abbreviations that are not derived from the country and region names of the cities
+    commonAbbreviations={
+        "usa":"us",
+        "u s a":"us",
+        "united states":"us",
+        "uk":"gb",
+        "united kingdom":"gb",
+        "great britain":"gb",
+        "england":"gb",
+        "the netherlands":"nl",
+        "netherlands":"nl",
+        "holland":"nl",
+        "republic of korea":"kr",
+        "south korea":"kr",
+        "korea":"kr",
+        "czech republic":"cz",
+        "russia":"ru",
+        "st":"saint"
+    }
+    # the maximum number of tokens of an abbreviated phrase
+    maxPhraseLength=5
+
+    def __init__(self):
+        '''
+        constructor
+        '''
+        self.abbreviations=dict(LocationAliasIndex.commonAbbreviations)
+        # distinct wikidata ids - None for curated entries that are known not to be locations e.g. "Online"
+        self.ids=[]
+        # key -> index of the wikidata id
+        self.keys={}
+        # sorted normalized aliases and the index of their wikidata ids for the prefix lookup
+        self.prefixAliases=[]
+        self.prefixIds=array("i")
+        # the fingerprint of the city data and curated entries I have been built from
+        self.fingerprint=None
+
+    @staticmethod
+    def getFingerprint(cityDataFile:str,curated:dict=None)->str:
+        '''
+        get a fingerprint of the input of build that is cheap to compute
+
+        Args:
+            cityDataFile(str): the file the city records are read from e.g. the geograpy3 locations.db
+            curated(dict): the curated entries
+
+        Return:
+            str: the fingerprint of the modification time and size of the file and the content of the curated entries
+        '''
+        sha=hashlib.sha1()
+        sha.update(str(SourceMeta.fileFingerprint([cityDataFile])).encode())
+        sha.update(json.dumps(curated,sort_keys=True,default=str).encode())
+        return sha.hexdigest()
+
+    @staticmethod
+    def getCityRecords(locationContext)->list:
+        '''
+        get the city records to build an index from the given geograpy3 LocationContext
+
+        Args:
+            locationContext(LocationContext): the geograpy3 location context
+
+        Return:
+            list: the list of dicts with name, wikidataid, pop, regionName, regionIso, countryName and countryIso
+        '''
+        records=[]
+        for city in locationContext.cityManager.getList():
+            region=getattr(city,"region",None)
+            country=getattr(city,"country",None)
+            records.append({
+                "name":getattr(city,"name",None),
+                "wikidataid":getattr(city,"wikidataid",None),
+                "pop":getattr(city,"pop",None),
+                "regionName":getattr(region,"name",None),
+                "regionIso":getattr(region,"iso",None),
+                "countryName":getattr(country,"name",None),
+                "countryIso":getattr(country,"iso",None)
+            })
+        return records
+
+    @staticmethod
+    def getTokens(text:str)->list:
+        '''
+        get the tokens of the given text without accents and punctuation
+
+        Args:
+            text(str): the text e.g. "Montrèal, QC"
+
+        Return:
+            list: the lower case tokens e.g. ["montreal","qc"]
+        '''
+        if text is None:
+            return []
+        text=unicodedata.normalize("NFKD",text)
+        text="".join([c for c in text if not unicodedata.combining(c)]).lower().replace("'","")
+        text="".join([c if c.isalnum() else " " for c in text])
+        return text.split()
+
+    def normalize(self,text:str)->str:
+        '''
+        normalize the given text - country and region names and their abbreviations are replaced by codes
+
+        Args:
+            text(str): the text e.g. "Phoenix, Arizona, USA"
+
+        Return:
+            str: the normalized text e.g. "phoenix az us"
+        '''
+        tokens=LocationAliasIndex.getTokens(text)
+        normalized=[]
+        i=0
+        while i<len(tokens):
+            # longest phrase first
+            for length in range(min(LocationAliasIndex.maxPhraseLength,len(tokens)-i),0,-1):
+                phrase=" ".join(tokens[i:i+length])
+                if phrase in self.abbreviations:
+                    normalized.append(self.abbreviations[phrase])
+                    i+=length
+                    break
+            else:
+                normalized.append(tokens[i])
+                i+=1
+        return " ".join(normalized)
+
+    def getKey(self,text:str)->str:
+        '''
+        get the key of the given text - the sorted distinct tokens of the normalized text
+
+        Args:
+            text(str): the text e.g. "USA, Phoenix, AZ"
+
+        Return:
+            str: the key e.g. "az phoenix us"
+        '''
+        return " ".join(sorted(set(self.normalize(text).split())))
+
+    def addAbbreviations(self,cityRecords:list):
+        '''
+        add the country and region names of the given cities as abbreviations of their iso codes
+
+        names that are also city names e.g. "Saint Petersburg" are kept and their code is expanded instead
+        '''
+        cityNames=set([" ".join(LocationAliasIndex.getTokens(record.get("name"))) for record in cityRecords])
+        for record in cityRecords:
+            for nameField,isoField in [("countryName","countryIso"),("regionName","regionIso")]:
+                name=record.get(nameField)
+                iso=record.get(isoField)
+                if name and iso:
+                    # US-CA -> ca
+                    code=" ".join(LocationAliasIndex.getTokens(iso.split("-")[-1]))
+                    phrase=" ".join(LocationAliasIndex.getTokens(name))
+                    if not phrase or not code:
+                        continue
+                    if phrase in cityNames:
+                        if not code in self.abbreviations:
+                            self.abbreviations[code]=phrase
+                    elif not phrase in self.abbreviations:
+                        self.abbreviations[phrase]=code
+
+    def build(self,cityRecords:list,curated:dict=None,fingerprint:str=None)->int:
+        '''
+        build me from the given city records and curated entries
+
+        Args:
+            cityRecords(list): the city records with name, wikidataid, pop, regionName, regionIso, countryName and countryIso see getCityRecords
+            curated(dict): map of location texts to wikidata ids - these win over the city aliases
+            fingerprint(str): the fingerprint of the input to store with me see getFingerprint
+
+        Return:
+            int: the number of keys
+        '''
+        self.fingerprint=fingerprint
+        self.addAbbreviations(cityRecords)
+        # the keys of city names shared by several cities e.g. "paris" need a region or country
+        nameIds={}
+        for record in cityRecords:
+            name=record.get("name")
+            wikidataid=record.get("wikidataid")
+            if name and wikidataid is not None:
+                nameIds.setdefault(self.getKey(name),set()).add(wikidataid)
+        ambiguousKeys=set([key for key,wikidataids in nameIds.items() if len(wikidataids)>1])
+        # key -> (pop,wikidataid,normalized alias)
+        entries={}
+        def addEntry(text:str,wikidataid:str,pop:float,isCurated:bool=False):
+            key=self.getKey(text)
+            if not key or (key in ambiguousKeys and not isCurated):
+                return
+            if not key in entries or entries[key][0]<pop:
+                entries[key]=(pop,wikidataid,self.normalize(text))
+        for record in cityRecords:
+            name=record.get("name")
+            wikidataid=record.get("wikidataid")
+            if not name or wikidataid is None:
+                continue
+            try:
+                pop=float(record.get("pop") or 0)
+            except ValueError:
+                pop=0
+            region=record.get("regionName")
+            country=record.get("countryName")
+            for parts in [[name],[name,region],[name,country],[name,region,country]]:
+                if all(parts):
+                    addEntry(", ".join(parts),wikidataid,pop)
+        if curated is not None:
+            for text,wikidataid in curated.items():
+                addEntry(text,wikidataid,float("inf"),isCurated=True)
+        idIndex={}
+        self.ids=[]
+        self.keys={}
+        prefixEntries=[]
+        for key,(_pop,wikidataid,alias) in entries.items():
+            if not wikidataid in idIndex:
+                idIndex[wikidataid]=len(self.ids)
+                self.ids.append(wikidataid)
+            self.keys[key]=idIndex[wikidataid]
+            prefixEntries.append((alias,idIndex[wikidataid]))
+        prefixEntries.sort()
+        self.prefixAliases=[alias for alias,_index in prefixEntries]
+        self.prefixIds=array("i",[index for _alias,index in prefixEntries])
+        return len(self.keys)
+
+    def lookup(self,text:str)->tuple:
+        '''
+        lookup the given location text
+
+        Args:
+            text(str): the location text e.g. "Phoenix AZ USA"
+
+        Return:
+            tuple: True and the wikidata id (None for known non locations) if the text is an alias - False,None otherwise
+        '''
+        index=self.keys.get(self.getKey(text),None)
+        if index is None:
+            return False,None
+        return True,self.ids[index]
+
+    def lookupPrefix(self,prefix:str,limit:int=10)->list:
+        '''
+        lookup the aliases starting with the given prefix
+
+        Args:
+            prefix(str): the prefix e.g. "Santa Bar"
+            limit(int): the maximum number of results
+
+        Return:
+            list: the (alias,wikidataid) tuples in alphabetical order of the normalized aliases
+        '''
+        normalizedPrefix=" ".join(LocationAliasIndex.getTokens(prefix))
+        if not normalizedPrefix:
+            return []
+        # the last token might be incomplete so only the leading tokens are normalized
+        tokens=normalizedPrefix.split(" ")
+        if len(tokens)>1:
+            normalizedPrefix=f"{self.normalize(' '.join(tokens[:-1]))} {tokens[-1]}"
+        result=[]
+        start=bisect.bisect_left(self.prefixAliases,normalizedPrefix)
+        for i in range(start,len(self.prefixAliases)):
+            alias=self.prefixAliases[i]
+            if not alias.startswith(normalizedPrefix) or len(result)>=limit:
+                break
+            result.append((alias,self.ids[self.prefixIds[i]]))
+        return result
+
+    def store(self,filePath:str):
+        '''
+        store me to the given file
+        '''
+        directory=os.path.dirname(filePath)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        data={
+            "version":LocationAliasIndex.version,
+            "fingerprint":self.fingerprint,
+            "abbreviations":self.abbreviations,
+            "ids":self.ids,
+            "keys":self.keys,
+            "prefixAliases":self.prefixAliases,
+            "prefixIds":self.prefixIds
+        }
+        with open(filePath,"wb") as indexFile:
+            pickle.dump(data,indexFile,protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(filePath:str,fingerprint:str=None):
+        '''
+        load an index from the given file
+
+        Args:
+            filePath(str): the file to load from
+            fingerprint(str): the fingerprint of the current input see getFingerprint - if given an index built from another input is not loaded
+
+        Return:
+            LocationAliasIndex: the index or None if there is no index of my version and the given input in the file
+        '''
+        if not os.path.isfile(filePath):
+            return None
+        with open(filePath,"rb") as indexFile:
+            data=pickle.load(indexFile)
+        if data.get("version")!=LocationAliasIndex.version:
+            return None
+        if fingerprint is not None and data.get("fingerprint")!=fingerprint:
+            return None
+        index=LocationAliasIndex()
+        for attr in ["fingerprint","abbreviations","ids","keys","prefixAliases","prefixIds"]:
+            setattr(index,attr,data[attr])
+        return index
@@ -0,0 +1,254 @@
+from geograpy.locator import City, Region, Country
+from lodstorage.sql import SQLDB
+from corpus.cachemeta import TableMeta
+from corpus.config import GeocoderConfig
+from corpus.event import EventStorage
+from corpus.location import LocationLookup
+from corpus.sqlpool import ConnectionPool
+import sqlite3
+
+class LocationNormalizer(object):
+    '''
+    normalize the raw location texts of the event tables of the data sources to the city, region and country
+    names, iso codes and wikidata ids of the common event view
+
+    the raw location text of each event is kept in the locationText column and the wikidata id it resolved to
+    in the locationWikidataid column so that a run only resolves the events that have not been normalized yet -
+    location columns of the data source such as the city of event_confref are only filled where they are null
+    '''
+    # the columns with the raw location text per event table - each part is the first non null of the given columns
+    # and the parts are joined with ", " e.g. "Beijing, China"
+    sourceColumns={
+        "event_wikicfp":[["locality"]],
+        "event_crossref":[["location"]],
+        "event_wikidata":[["city","location"],["country"]],
+        "event_confref":[["city"],["country"]]
+    }
+    # the columns filled by the normalization - the source columns among them keep their values
+    locationColumns=["city","cityWikidataid","region","regionIso","regionWikidataid","country","countryIso","countryWikidataid"]
+    # the temporary table with the resolved locations of an event table
+    resolutionTableName="locationresolution"
+
+    def __init__(self,sqlDB:SQLDB=None,locationLookup:LocationLookup=None,debug:bool=False,geocoderConfig:GeocoderConfig=None):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database with the event tables - default: the EventCorpus.db
+            locationLookup(LocationLookup): the lookup to resolve the location texts with - default: a LocationLookup with its resolution cache in my database
+            debug(bool): if True show debug information
+            geocoderConfig(GeocoderConfig): the configuration of the geocoder backend of the default LocationLookup
+        '''
+        self.sqlDB=sqlDB
+        self.locationLookup=locationLookup
+        self.debug=debug
+        self.geocoderConfig=geocoderConfig
+
+    def getSqlDB(self)->SQLDB:
+        '''
+        get the database with the event tables
+        '''
+        if self.sqlDB is None:
+            self.sqlDB=EventStorage.getSqlDB()
+        return self.sqlDB
+
+    def getLocationLookup(self)->LocationLookup:
+        '''
+        get the location lookup
+        '''
+        if self.locationLookup is None:
+            self.locationLookup=LocationLookup(sqlDB=self.getSqlDB(),geocoderConfig=self.geocoderConfig)
+        return self.locationLookup
+
+    @staticmethod
+    def getLocationExpression(tableColumns:list,parts:list)->str:
+        '''
+        get the SQL expression for the raw location text of an event table
+
+        Args:
+            tableColumns(list): the columns of the event table
+            parts(list): the lists of alternative columns of the parts of the location text
+
+        Return:
+            str: the SQL expression or None if the table has none of the columns
+        '''
+        partExpressions=[]
+        for columns in parts:
+            columns=[column for column in columns if column in tableColumns]
+            if len(columns)==1:
+                partExpressions.append(columns[0])
+            elif len(columns)>1:
+                partExpressions.append(f"COALESCE({','.join(columns)})")
+        if not partExpressions:
+            return None
+        concat="||".join([f"COALESCE({partExpressions[0]},'')"]+[f"COALESCE(', '||{part},'')" for part in partExpressions[1:]])
+        return f"NULLIF(TRIM({concat},', '),'')"
+
+    @staticmethod
+    def getSourceLocationColumns(tableName:str)->list:
+        '''
+        get the location columns that the given event table has from its data source
+
+        Args:
+            tableName(str): the name of the event table e.g. event_confref
+
+        Return:
+            list: the source columns that are also location columns e.g. ["city","country"]
+        '''
+        sourceColumns=[column for columns in LocationNormalizer.sourceColumns.get(tableName,[]) for column in columns]
+        return [column for column in LocationNormalizer.locationColumns if column in sourceColumns]
+
+    @staticmethod
+    def getLocationRecord(location)->dict:
+        '''
+        get the city, region and country names, iso codes and wikidata ids of the given location
+
+        Args:
+            location(Location): the geograpy3 city, region or country
+
+        Return:
+            dict: the values of the location columns
+        '''
+        record={column:None for column in LocationNormalizer.locationColumns}
+        city,region,country=None,None,None
+        if isinstance(location,City):
+            city=location
+            region=getattr(location,"region",None)
+            country=getattr(location,"country",None)
+        elif isinstance(location,Region):
+            region=location
+            country=getattr(location,"country",None)
+        elif isinstance(location,Country):
+            country=location
+        for prefix,part in [("city",city),("region",region),("country",country)]:
+            if part is not None:
+                record[prefix]=getattr(part,"name",None)
+                record[f"{prefix}Wikidataid"]=getattr(part,"wikidataid",None)
+                if prefix!="city":
+                    record[f"{prefix}Iso"]=getattr(part,"iso",None)
+        return record
+
+    def prepareTable(self,tableName:str)->bool:
+        '''
+        add the location columns to the given event table and keep the raw location texts
+        of the events that do not have one yet
+
+        Args:
+            tableName(str): the name of the event table e.g. event_wikicfp
+
+        Return:
+            bool: False if the table does not exist or has no location columns
+        '''
+        sqlDB=self.getSqlDB()
+        tableColumns=[record["name"] for record in sqlDB.query(f"PRAGMA table_info({tableName})")]
+        if not tableColumns:
+            return False
+        # the location text needs to be computed before the location columns are added
+        expression=LocationNormalizer.getLocationExpression(tableColumns,LocationNormalizer.sourceColumns[tableName])
+        if expression is None:
+            if self.debug:
+                print(f"{tableName} has no location columns")
+            return False
+        with ConnectionPool.getWriteLock(sqlDB):
+            for column in ["locationText","locationWikidataid"]+LocationNormalizer.locationColumns:
+                if not column in tableColumns:
+                    sqlDB.execute(f"ALTER TABLE {tableName} ADD COLUMN {column} TEXT")
+            sqlDB.execute(f"UPDATE {tableName} SET locationText={expression} WHERE locationText IS NULL")
+            sqlDB.c.commit()
+            TableMeta.recordChange(sqlDB,tableName)
+        return True
+
+    @staticmethod
+    def getUpdateStatement(tableName:str,columns:list,pending:str="",withJoin:bool=None)->str:
+        '''
+        get the statement that copies the resolved locations to the given event table
+
+        Args:
+            tableName(str): the name of the event table e.g. event_wikicfp
+            columns(list): the columns to copy from the resolution table
+            pending(str): the additional condition for the events to update
+            withJoin(bool): if True join the resolution table with UPDATE … FROM otherwise use a correlated subquery per column - default: True if SQLite supports UPDATE … FROM (3.33.0)
+
+        Return:
+            str: the UPDATE statement
+        '''
+        if withJoin is None:
+            withJoin=sqlite3.sqlite_version_info>=(3,33,0)
+        resolutionTable=LocationNormalizer.resolutionTableName
+        # the source columns are only filled if they are null so that e.g. a region does not replace the raw city
+        sourceLocationColumns=LocationNormalizer.getSourceLocationColumns(tableName)
+        setExpressions=[]
+        for column in columns:
+            if withJoin:
+                value=f"r.{column}"
+            else:
+                value=f"(SELECT r.{column} FROM {resolutionTable} AS r WHERE r.locationText={tableName}.locationText)"
+            if column in sourceLocationColumns:
+                value=f"COALESCE({tableName}.{column},{value})"
+            setExpressions.append(f"{column}={value}")
+        if withJoin:
+            condition=f"FROM {resolutionTable} AS r WHERE r.locationText={tableName}.locationText"
+        else:
+            condition=f"WHERE locationText IN (SELECT locationText FROM {resolutionTable})"
+        return f"UPDATE {tableName} SET {','.join(setExpressions)} {condition}{pending}"
+
+    def normalizeTable(self,tableName:str,forceUpdate:bool=False)->dict:
+        '''
+        normalize the locations of the given event table
+
+        Args:
+            tableName(str): the name of the event table e.g. event_wikicfp
+            forceUpdate(bool): if True resolve the locations of all events again without the resolution cache
+
+        Return:
+            dict: the number of distinct location texts, cache hits and misses and updated events
+        '''
+        if not self.prepareTable(tableName):
+            return None
+        sqlDB=self.getSqlDB()
+        pending="" if forceUpdate else f" AND {tableName}.locationWikidataid IS NULL"
+        texts=[record["locationText"] for record in sqlDB.query(f"SELECT DISTINCT locationText FROM {tableName} WHERE locationText IS NOT NULL{pending}")]
+        locationLookup=self.getLocationLookup()
+        resolved=locationLookup.lookupMany(texts,withCache=not forceUpdate)
+        stats=dict(locationLookup.cacheStats)
+        records=[]
+        for text,location in resolved.items():
+            if location is not None:
+                record={"locationText":text,"locationWikidataid":location.wikidataid}
+                record.update(LocationNormalizer.getLocationRecord(location))
+                records.append(record)
+        columns=["locationText","locationWikidataid"]+LocationNormalizer.locationColumns
+        resolutionTable=LocationNormalizer.resolutionTableName
+        with ConnectionPool.getWriteLock(sqlDB):
+            sqlDB.execute(f"CREATE TEMP TABLE IF NOT EXISTS {resolutionTable} (locationText TEXT PRIMARY KEY,{','.join([f'{column} TEXT' for column in columns[1:]])})")
+            sqlDB.execute(f"DELETE FROM {resolutionTable}")
+            placeholders=",".join(["?" for _column in columns])
+            sqlDB.c.executemany(f"INSERT INTO {resolutionTable} ({','.join(columns)}) VALUES ({placeholders})",[tuple([record[column] for column in columns]) for record in records])
+            cursor=sqlDB.c.execute(LocationNormalizer.getUpdateStatement(tableName,columns[1:],pending))
+            stats["updated"]=cursor.rowcount
+            sqlDB.c.commit()
+            TableMeta.recordChange(sqlDB,tableName)
+        if self.debug:
+            print(f"{tableName}: {stats}")
+        return stats
+
+    def normalize(self,sourceTables:list=None,forceUpdate:bool=False)->dict:
+        '''
+        normalize the locations of the given event tables
+
+        Args:
+            sourceTables(list): the names of the event tables - default: all event tables with known location columns
+            forceUpdate(bool): if True resolve the locations of all events again without the resolution cache
+
+        Return:
+            dict: the stats per normalized event table see normalizeTable
+        '''
+        if sourceTables is None:
+            sourceTables=list(LocationNormalizer.sourceColumns.keys())
+        result={}
+        for tableName in sourceTables:
+            if tableName in LocationNormalizer.sourceColumns:
+                stats=self.normalizeTable(tableName,forceUpdate=forceUpdate)
+                if stats is not None:
+                    result[tableName]=stats
+        return result
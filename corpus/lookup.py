@@ -3,8 +3,16 @@ Created on 2021-07-30
 
 @author: wf
 '''
+from corpus.config import GeocoderConfig
 from corpus.event import EventStorage
 from corpus.eventcorpus import EventCorpus, EventDataSource
+from corpus.queryservice import QueryService
+from corpus.queryadvisor import QueryAdvisor
+from corpus.querystream import QueryStreamWriter
+from corpus.eventmatcher import EventMatcher
+from corpus.acronymindex import AcronymIndex
+from corpus.titleindex import TitleIndex
+from corpus.quality.ratingengine import RatingEngine
 
 from corpus.datasources.confref import Confref
 from corpus.datasources.crossref import Crossref
@@ -19,6 +27,7 @@ from wikibot.wikiuser import WikiUser
 from wikifile.wikiFileManager import WikiFileManager
 
 from datetime import datetime
+from tabulate import tabulate
 
 import os
 from os import path
@@ -63,16 +72,21 @@ class CorpusLookup(object):
     
 
     def __init__(self,lookupIds:list=None,
-                 configure:callable=None,debug=False):
+                 configure:callable=None,debug=False,compact:bool=False,lazy:bool=False):
         '''
         Constructor
         
         Args:
             lookupIds(list): the list of lookupIds to addDataSources for
             configure(callable): Callback to configure the corpus lookup
+            compact(bool): if True use compact entities with slots to save memory for large event lists
+            lazy(bool): if True restore the entities of cached tables as lazy views instead of loading them
         '''
         self.debug=debug
         self.configure=configure
+        self.queryService=None
+        self.acronymIndex=None
+        self.titleIndex=None
         self.eventCorpus=EventCorpus()
         if lookupIds is None:
             lookupIds=CorpusLookup.lookupIds
@@ -96,6 +110,10 @@ class CorpusLookup(object):
             self.eventCorpus.addDataSource(OR(wikiId="orclone",via="api"))
         if "orclone-backup" in lookupIds:    
             self.eventCorpus.addDataSource(OR(wikiId="orclone",via="backup"))
+        for eventDataSource in self.eventCorpus.eventDataSources.values():
+            for manager in eventDataSource.eventManager,eventDataSource.eventSeriesManager:
+                manager.setCompact(compact)
+                manager.setLazy(lazy)
         
     def getDataSource(self,lookupId:str)->EventDataSource:
         '''
@@ -132,16 +150,53 @@ class CorpusLookup(object):
         return None
 
 
-    def load(self,forceUpdate:bool=False):
+    def load(self,forceUpdate:bool=False,refreshIds:list=None,materialize:bool=False,cacheOnly:bool=False,normalizeLocations:bool=False,buildIndexes:bool=False,geocoderConfig:GeocoderConfig=None):
         '''
         load the event corpora
         Args:
             forceUpdate(bool): True if the data should be fetched from the source instead of the cache
+            refreshIds(list): lookupIds of the data sources to be fetched from the source if they are stale - "all" for all data sources
+            materialize(bool): if True materialize the common views as indexed tables - views that have been materialized before are always refreshed
+            cacheOnly(bool): if True never touch the remote sources and never write - only use the EventCorpus.db which is downloaded if it is missing
+            normalizeLocations(bool): if True fill the city, region and country columns of the events that have not been normalized yet
+            buildIndexes(bool): if True build the acronym and title indexes if they have not been built yet - existing indexes are always updated for the fetched data sources
+            geocoderConfig(GeocoderConfig): the configuration of the geocoder backend for normalizeLocations
         '''
-        if self.configure:
+        if cacheOnly:
+            for option,value in [("materialize",materialize),("normalizeLocations",normalizeLocations),("buildIndexes",buildIndexes)]:
+                if value:
+                    raise Exception(f"{option} is not possible in cache only mode")
+            if not os.path.isfile(EventStorage.getStorageConfig().cacheFile):
+                EventCorpus.download()
+        elif self.configure:
             self.configure(self)
-        self.eventCorpus.loadAll(forceUpdate=forceUpdate)
+        fetchedIds=self.eventCorpus.loadAll(forceUpdate=forceUpdate,refreshIds=refreshIds,cacheOnly=cacheOnly)
+        if self.debug:
+            print(tabulate(self.eventCorpus.getStartupReport(),headers="keys"))
+        if cacheOnly:
+            return
+        normalizedTables=[]
+        if normalizeLocations:
+            locationStats=self.normalizeLocations(geocoderConfig=geocoderConfig)
+            normalizedTables=[tableName for tableName,stats in locationStats.items() if stats["updated"]>0]
         EventStorage.createViews()
+        QueryAdvisor.restoreIndexes(EventStorage.getSqlDB())
+        refreshTables=[]
+        for lookupId in fetchedIds:
+            eventDataSource=self.getDataSource(lookupId)
+            refreshTables.append(eventDataSource.eventManager.tableName)
+            refreshTables.append(eventDataSource.eventSeriesManager.tableName)
+        refreshTables.extend([tableName for tableName in normalizedTables if not tableName in refreshTables])
+        refreshEventTables=[tableName for tableName in refreshTables if tableName.startswith("event_")]
+        for index in self.getAcronymIndex(),self.getTitleIndex():
+            if not index.isIndexed():
+                if buildIndexes:
+                    index.update()
+            elif fetchedIds:
+                index.update(refreshEventTables)
+        # materialized views are not recreated by createViews and would keep the data of the previous load
+        if materialize or EventStorage.isMaterialized():
+            EventStorage.materializeViews(refreshTables=refreshTables,profile=self.debug)
 
     def getQueryManager(self):
         '''
@@ -155,23 +210,190 @@ class CorpusLookup(object):
                 return qm
         return None
 
-    def getLod4Query(self,query:str):
+    def getAcronymIndex(self)->AcronymIndex:
+        '''
+        get the index of normalized acronym tokens of the events of all data sources
+        '''
+        if self.acronymIndex is None:
+            self.acronymIndex=AcronymIndex(EventStorage.getSqlDB(),debug=self.debug)
+        return self.acronymIndex
+
+    def lookupEvent(self,text:str,year:int=None)->list:
+        '''
+        lookup events by acronym e.g. "ISWC 2019" across all data sources
+        
+        Args:
+            text(str): the acronym to look for
+            year(int): the year of the event - default: the year in the text if any
+            
+        Return:
+            list: a list of dicts with the sourceTable,eventId,stem and year of the matching events
+        '''
+        acronymIndex=self.getAcronymIndex()
+        if not acronymIndex.isIndexed():
+            raise Exception("the acronym index has not been built yet - load with buildIndexes=True")
+        return acronymIndex.lookupEvent(text,year=year)
+
+    def getTitleIndex(self)->TitleIndex:
+        '''
+        get the trigram index of the titles of the events of all data sources
+        '''
+        if self.titleIndex is None:
+            self.titleIndex=TitleIndex(EventStorage.getSqlDB(),debug=self.debug)
+        return self.titleIndex
+
+    def searchTitle(self,title:str,limit:int=10,year:int=None,sources:list=None)->list:
+        '''
+        search events by approximate title e.g. a full proceedings title across all data sources
+        
+        Args:
+            title(str): the title to search for
+            limit(int): the maximum number of results
+            year(int): only return events of the given year
+            sources(list): only return events of the given event tables e.g. ["event_dblp"]
+            
+        Return:
+            list: a list of dicts with sourceTable,eventId,title,year and score ordered by descending score
+        '''
+        titleIndex=self.getTitleIndex()
+        if not titleIndex.isIndexed():
+            raise Exception("the title index has not been built yet - load with buildIndexes=True")
+        return titleIndex.search(title,limit=limit,year=year,sources=sources)
+
+    def getQueryService(self)->QueryService:
+        '''
+        get the read-only query service with result caching for the EventCorpus.db
+        '''
+        if self.queryService is None:
+            self.queryService=QueryService(lookup=self,debug=self.debug)
+        return self.queryService
+
+    def adviseIndexes(self,createIndexes:bool=False,covering:bool=False,tablefmt:str="mediawiki")->str:
+        '''
+        run the queries of the query catalog with EXPLAIN QUERY PLAN and propose indexes for full table scans
+
+        Args:
+            createIndexes(bool): if True create the proposed indexes and benchmark the queries again
+            covering(bool): if True propose covering indexes for single table queries
+            tablefmt(str): the table format of the report
+
+        Return:
+            str: the before/after benchmark report
+        '''
+        qm=self.getQueryManager()
+        queries=list(qm.queriesByName.values()) if qm is not None else []
+        advisor=QueryAdvisor(EventStorage.getSqlDB(),queries,covering=covering,debug=self.debug)
+        report=advisor.advise(createIndexes=createIndexes)
+        return QueryAdvisor.asReport(report,tablefmt=tablefmt)
+
+    def rateEvents(self,lookupIds:list=None,maxWorkers:int=4)->dict:
+        '''
+        (re)rate the events of the given data sources with the rules of the RatingEngine
+
+        Args:
+            lookupIds(list): the lookupIds of the data sources to rate - default: all data sources
+            maxWorkers(int): the number of event tables to rate in parallel
+
+        Return:
+            dict: the number of ratings per event table
+        '''
+        if lookupIds is None:
+            lookupIds=list(self.eventCorpus.eventDataSources.keys())
+        dataSources=[self.getDataSource(lookupId) for lookupId in lookupIds]
+        sourceTables=[dataSource.eventManager.tableName for dataSource in dataSources if dataSource is not None]
+        engine=RatingEngine(maxWorkers=maxWorkers,debug=self.debug)
+        return engine.run(sourceTables)
+
+    def normalizeLocations(self,lookupIds:list=None,forceUpdate:bool=False,geocoderConfig:GeocoderConfig=None)->dict:
+        '''
+        normalize the locations of the events of the given data sources with the LocationNormalizer
+
+        Args:
+            lookupIds(list): the lookupIds of the data sources to normalize - default: all data sources
+            forceUpdate(bool): if True resolve the locations of all events again
+            geocoderConfig(GeocoderConfig): the configuration of the geocoder backend - default: the public Nominatim service
+
+        Return:
+            dict: the location stats per event table
+        '''
+        if lookupIds is None:
+            lookupIds=list(self.eventCorpus.eventDataSources.keys())
+        dataSources=[self.getDataSource(lookupId) for lookupId in lookupIds]
+        sourceTables=[dataSource.eventManager.tableName for dataSource in dataSources if dataSource is not None]
+        # imported here since the location data of geograpy is only needed for the normalization
+        from corpus.locationnormalizer import LocationNormalizer
+        normalizer=LocationNormalizer(debug=self.debug,geocoderConfig=geocoderConfig)
+        return normalizer.normalize(sourceTables,forceUpdate=forceUpdate)
+
+    def getLod4Query(self,query:str,offset:int=0,limit:int=None):
         '''
         Args:
             query: the query to run
+            offset(int): the number of rows to skip
+            limit(int): the maximum number of rows to return - None for all
         Return:
             list: the list of dicts for the query
         '''
-        sqlDB=EventStorage.getSqlDB()
-        listOfDicts=sqlDB.query(query)
+        listOfDicts=self.getQueryService().query(query,offset=offset,limit=limit)
         return listOfDicts
 
-    def performQuery(self,query:str):
+    def getQueryStream(self,query:str,batchSize:int=1000,rowFormat:str="dict"):
         '''
+        get a stream of the result of the given query for constant memory processing
+
         Args:
             query: the query to run
+            batchSize(int): the number of rows to fetch at once
+            rowFormat(str): dict, tuple or namedtuple
+        Return:
+            QueryStream: the query stream
         '''
+        return self.getQueryService().stream(query,batchSize=batchSize,rowFormat=rowFormat)
 
+    def isCachePopulated(self)->bool:
+        '''
+        check whether the EventCorpus.db already has the common event view
+        
+        Return:
+            bool: True if queries can be run without loading
+        '''
+        cacheFile=EventStorage.getStorageConfig().cacheFile
+        if not os.path.isfile(cacheFile):
+            return False
+        sqlDB=EventStorage.getSqlDB(readOnly=True)
+        records=sqlDB.query("SELECT name FROM sqlite_master WHERE name='event'")
+        return len(records)>0
+
+    def performQuery(self,query:str,outputFormat:str="tabulate",fileObj=None,batchSize:int=1000)->int:
+        '''
+        run the given query and stream the result to the given file
+        
+        Args:
+            query: the name of a query from queries.yaml or the SQL query to run
+            outputFormat(str): csv, json (lines), tabulate or mediawiki
+            fileObj: the text file to write to - default: stdout
+            batchSize(int): the number of rows to fetch at once
+            
+        Return:
+            int: the number of rows written
+        '''
+        if fileObj is None:
+            fileObj=sys.stdout
+        qm=self.getQueryManager()
+        if qm is not None and query in qm.queriesByName:
+            query=qm.queriesByName[query].query
+        queryStream=self.getQueryStream(query,batchSize=batchSize)
+        if outputFormat=="csv":
+            count=QueryStreamWriter.writeCsv(queryStream,fileObj)
+        elif outputFormat=="json":
+            count=QueryStreamWriter.writeJsonLines(queryStream,fileObj)
+        elif outputFormat=="tabulate":
+            count=QueryStreamWriter.writeTable(queryStream,fileObj,tablefmt="simple")
+        elif outputFormat=="mediawiki":
+            count=QueryStreamWriter.writeTable(queryStream,fileObj,tablefmt="mediawiki")
+        else:
+            raise Exception(f"invalid output format {outputFormat}")
+        return count
 
     def asPlantUml(self,baseEntity='Event'):
         '''
@@ -247,25 +469,56 @@ USAGE
         datasourcesDefault=",".join(CorpusLookup.lookupIds)
         parser = ArgumentParser(description=program_license, formatter_class=RawDescriptionHelpFormatter)
         parser.add_argument("-d", "--debug", dest="debug", action="store_true", help="show debug info")
-        parser.add_argument("-q", "--query",help="run the given query")
+        parser.add_argument("-q", "--query",help="run the given query - the name of a query from queries.yaml or SQL")
+        parser.add_argument("--format",dest="outputFormat",choices=["csv","json","tabulate","mediawiki"],default="tabulate",help="the output format of query results")
+        parser.add_argument("--skipLoad",action="store_true",help="do not load the event corpora if the cache is already populated")
         parser.add_argument('-e', '--endpoint', default=Wikidata.endpoint, help="SPARQL endpoint to use for wikidata queries")
         parser.add_argument('-v', '--version', action='version', version=program_version_message)
         parser.add_argument("-u", "--uml", dest="uml", action="store_true", help="output plantuml diagram markup")
         parser.add_argument("-f", "--force",dest="forceUpdate",action="store_true",help="force Update - may take quite a time")
         parser.add_argument("--datasources",help=", delimited list of datasource lookup ids",default=datasourcesDefault)
+        parser.add_argument("--materialize",action="store_true",help="materialize the event and eventseries views as indexed tables")
+        parser.add_argument("--cacheOnly",action="store_true",help="only use the EventCorpus.db - never access the remote sources")
+        parser.add_argument("--refresh",help=", delimited list of datasource lookup ids to be refreshed if stale - use 'all' to check all datasources")
+        parser.add_argument("--advise",action="store_true",help="propose indexes for the queries of the query catalog")
+        parser.add_argument("--createIndexes",action="store_true",help="create the proposed indexes and show a before/after benchmark")
+        parser.add_argument("--coveringIndexes",action="store_true",help="propose covering indexes that include the selected columns of single table queries")
+        parser.add_argument("--match",action="store_true",help="match the events of the different datasources and assign canonical event ids")
+        parser.add_argument("--compact",action="store_true",help="use compact entities to reduce the memory needed for the event lists")
+        parser.add_argument("--lazy",action="store_true",help="do not load the cached event lists but use lazy views of the cached tables")
+        parser.add_argument("--locations",action="store_true",help="normalize the locations of the events to city, region and country ids after loading")
+        parser.add_argument("--geocoder",choices=GeocoderConfig.backends,default="nominatim",help="the geocoder backend for --locations - offline only uses the aliases of the geograpy3 location data and does not cross check the geograpy results")
+        parser.add_argument("--nominatimEndpoint",help="the endpoint of a self hosted Nominatim service - default: the public Nominatim service")
+        parser.add_argument("--geocoderWorkers",type=int,help="the maximum number of concurrent Nominatim queries - default: 1 for the public service and 8 otherwise")
+        parser.add_argument("--buildIndexes",action="store_true",help="build the acronym and title indexes after loading if they have not been built yet")
+        parser.add_argument("--rate",action="store_true",help="rate the events of the datasources and store the ratings in the ratings table")
+        parser.add_argument("--serve",action="store_true",help="serve read-only queries via http")
+        parser.add_argument("--port",type=int,default=8765,help="the port to serve queries on")
         
         # Process arguments
         args = parser.parse_args()   
         Wikidata.endpoint=args.endpoint
         lookupIds=args.datasources.split(",")
-        lookup=CorpusLookup(debug=args.debug,lookupIds=lookupIds,configure=CorpusLookupConfigure.configureCorpusLookup)
-        lookup.load(forceUpdate=args.forceUpdate)
+        lookup=CorpusLookup(debug=args.debug,lookupIds=lookupIds,configure=CorpusLookupConfigure.configureCorpusLookup,compact=args.compact,lazy=args.lazy)
+        refreshIds=args.refresh.split(",") if args.refresh else None
+        if not (args.skipLoad and not args.forceUpdate and lookup.isCachePopulated()):
+            geocoderConfig=GeocoderConfig(backend=args.geocoder,endpoint=args.nominatimEndpoint,maxWorkers=args.geocoderWorkers)
+            lookup.load(forceUpdate=args.forceUpdate,refreshIds=refreshIds,materialize=args.materialize,cacheOnly=args.cacheOnly,normalizeLocations=args.locations,buildIndexes=args.buildIndexes,geocoderConfig=geocoderConfig)
         if args.uml:
             for baseEntity in ["Event","EventSeries"]:
                 plantUml=lookup.asPlantUml(baseEntity)
                 print(plantUml)
         if args.query:
-            lookup.query(args.query)
+            lookup.performQuery(args.query,outputFormat=args.outputFormat)
+        if args.match:
+            stats=EventMatcher(EventStorage.getSqlDB(),debug=args.debug).run()
+            print(stats)
+        if args.rate:
+            print(lookup.rateEvents(lookupIds))
+        if args.advise or args.createIndexes:
+            print(lookup.adviseIndexes(createIndexes=args.createIndexes,covering=args.coveringIndexes))
+        if args.serve:
+            lookup.getQueryService().serve(port=args.port)
 
         
     except KeyboardInterrupt:
@@ -0,0 +1,92 @@
+import re
+
+class EventNormalizer(object):
+    '''
+    normalization of event acronyms and titles across the different data sources
+
+    e.g. dblp uses "{booktitle} {year}", wikicfp "ISWC 2019" and crossref "SIGMIS CPR '06"
+    '''
+    yearPattern=re.compile(r"\b((?:19|20)\d\d)\b|'(\d\d)\b")
+    ordinalPattern=re.compile(r"\b\d+(?:st|nd|rd|th)\b|\b(?:first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|eleventh|twelfth|thirteenth|fourteenth|fifteenth|sixteenth|seventeenth|eighteenth|nineteenth|twentieth)\b",re.IGNORECASE)
+    tokenPattern=re.compile(r"[a-z0-9]+")
+    stopWords={"of","the","on","and","in","for","international","conference","proceedings","workshop","symposium","annual"}
+
+    @staticmethod
+    def extractYear(text:str)->int:
+        '''
+        extract the year from the given text e.g. 2019 from "ISWC 2019" or 2006 from "SIGMIS CPR '06"
+
+        Return:
+            int: the year or None if there is none
+        '''
+        if text is None:
+            return None
+        match=EventNormalizer.yearPattern.search(str(text))
+        if match is None:
+            return None
+        if match.group(1):
+            return int(match.group(1))
+        shortYear=int(match.group(2))
+        return 1900+shortYear if shortYear>50 else 2000+shortYear
+
+    @staticmethod
+    def normalize(text:str)->str:
+        '''
+        normalize the given text by case folding and removing years, ordinals and punctuation
+
+        Return:
+            str: the normalized text or None if nothing is left
+        '''
+        if text is None:
+            return None
+        normalized=str(text).casefold()
+        normalized=EventNormalizer.yearPattern.sub(" ",normalized)
+        normalized=EventNormalizer.ordinalPattern.sub(" ",normalized)
+        normalized=" ".join(EventNormalizer.tokenPattern.findall(normalized))
+        return normalized if normalized else None
+
+    @staticmethod
+    def getAcronymStem(acronym:str)->str:
+        '''
+        get the normalized acronym without year, ordinals, punctuation and case e.g. "ISWC 2019" -> "iswc"
+        '''
+        return EventNormalizer.normalize(acronym)
+
+    @staticmethod
+    def getSeriesAcronym(acronym:str)->str:
+        '''
+        get the acronym of the series of the given event acronym by removing years and ordinals but keeping the case e.g. "SIGMIS CPR '06" -> "SIGMIS CPR"
+        '''
+        if acronym is None:
+            return None
+        seriesAcronym=EventNormalizer.yearPattern.sub(" ",str(acronym))
+        seriesAcronym=EventNormalizer.ordinalPattern.sub(" ",seriesAcronym)
+        seriesAcronym=" ".join(seriesAcronym.split()).strip(" -–,:")
+        return seriesAcronym if seriesAcronym else None
+
+    @staticmethod
+    def getTitleTemplate(title:str)->str:
+        '''
+        get the template of the given event title with placeholders for the year and ordinal
+        e.g. "Proceedings of the 18th ISWC 2019" -> "Proceedings of the {ordinal} ISWC {year}"
+        '''
+        if title is None:
+            return None
+        template=EventNormalizer.yearPattern.sub("{year}",str(title))
+        template=EventNormalizer.ordinalPattern.sub("{ordinal}",template)
+        return " ".join(template.split())
+
+    @staticmethod
+    def getTokens(text:str)->list:
+        '''
+        get the normalized tokens of the given text
+        '''
+        normalized=EventNormalizer.normalize(text)
+        return normalized.split(" ") if normalized else []
+
+    @staticmethod
+    def getTitleTokens(title:str)->set:
+        '''
+        get the set of significant normalized tokens of the given title
+        '''
+        return {token for token in EventNormalizer.getTokens(title) if not token in EventNormalizer.stopWords and not token.isdigit()}
@@ -0,0 +1,163 @@
+from concurrent.futures import ThreadPoolExecutor
+from corpus.cachemeta import TableMeta
+from corpus.event import EventStorage
+from corpus.quality.rating import RatingType
+from corpus.sqlpool import ConnectionPool
+import time
+
+class RatingRule(object):
+    '''
+    a rating rule declared as an SQL condition on the columns of an event table
+    '''
+
+    def __init__(self,name:str,reason:RatingType,pain:int,condition:str,hint:str,columns:list=None,anyColumns:list=None):
+        '''
+        constructor
+
+        Args:
+            name(str): the name of the rule
+            reason(RatingType): the reason of the ratings of the matching events
+            pain(int): the pain level of the ratings of the matching events
+            condition(str): the SQL condition for the events to rate - {table} is replaced by the table name
+                and {allNull} by the condition that all of the anyColumns the table has are NULL
+            hint(str): the SQL expression for the hint of the rating
+            columns(list): the columns the table needs to have for the rule to apply
+            anyColumns(list): the rule applies if the table has any of these columns
+        '''
+        self.name=name
+        self.reason=reason
+        self.pain=pain
+        self.condition=condition
+        self.hint=hint
+        self.columns=columns if columns is not None else []
+        self.anyColumns=anyColumns
+
+    def getCondition(self,tableName:str,tableColumns:list)->str:
+        '''
+        get my SQL condition for the given table
+
+        Args:
+            tableName(str): the name of the table
+            tableColumns(list): the columns of the table
+
+        Return:
+            str: the condition or None if I do not apply to the table
+        '''
+        for column in self.columns:
+            if not column in tableColumns:
+                return None
+        allNull=None
+        if self.anyColumns is not None:
+            presentColumns=[column for column in self.anyColumns if column in tableColumns]
+            if not presentColumns:
+                return None
+            allNull=" AND ".join([f"{column} IS NULL" for column in presentColumns])
+        return self.condition.format(table=tableName,allNull=allNull)
+
+class RatingEngine(object):
+    '''
+    rate the events of the event tables of all data sources with declared rules
+
+    each rule is a single SQL query per table - the tables are rated in a pool of worker threads with
+    a reader connection each and the ratings are written in bulk to the ratings table
+    '''
+    tableName="ratings"
+    defaultRules=[
+        RatingRule("missing dates",RatingType.missing,5,"startDate IS NULL","'startDate missing'",columns=["startDate"]),
+        RatingRule("invalid date range",RatingType.invalid,7,"startDate IS NOT NULL AND endDate IS NOT NULL AND endDate<startDate",
+            "'endDate '||endDate||' before startDate '||startDate",columns=["startDate","endDate"]),
+        RatingRule("missing location",RatingType.missing,3,"{allNull}","'location missing'",
+            anyColumns=["location","locality","city","country","countryId","locationId"]),
+        RatingRule("duplicate acronym",RatingType.invalid,4,
+            "acronym IN (SELECT acronym FROM {table} WHERE acronym IS NOT NULL GROUP BY acronym HAVING count(*)>1)",
+            "'duplicate acronym '||acronym",columns=["acronym"])
+    ]
+
+    def __init__(self,cacheFile:str=None,rules:list=None,maxWorkers:int=4,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            cacheFile(str): the database file with the event tables - default: the EventCorpus.db
+            rules(list): the RatingRules to apply - default: my defaultRules
+            maxWorkers(int): the number of tables to rate in parallel
+            debug(bool): if True show progress information
+        '''
+        self.cacheFile=cacheFile
+        self.rules=rules if rules is not None else RatingEngine.defaultRules
+        self.maxWorkers=maxWorkers
+        self.debug=debug
+
+    def getSqlDB(self,readOnly:bool=False):
+        '''
+        get the pooled writer or the read-only connection of the current thread
+        '''
+        return EventStorage.getSqlDB(readOnly=readOnly,cacheFile=self.cacheFile)
+
+    def ensureTable(self):
+        '''
+        make sure the ratings table exists
+        '''
+        sqlDB=self.getSqlDB()
+        tableName=RatingEngine.tableName
+        sqlDB.execute(f"CREATE TABLE IF NOT EXISTS {tableName} (pain INTEGER,reason TEXT,hint TEXT,entityType TEXT,source TEXT,entityId TEXT)")
+        sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_source ON {tableName}(source,entityType)")
+
+    @staticmethod
+    def getSource(tableName:str)->str:
+        '''
+        get the source of the given event table e.g. wikicfp for event_wikicfp
+        '''
+        return tableName.replace("event_","",1)
+
+    def rateTable(self,tableName:str)->list:
+        '''
+        rate the events of the given table with all my rules that apply to it
+
+        Args:
+            tableName(str): the name of the event table
+
+        Return:
+            list: the rating tuples (pain,reason,hint,entityType,source,entityId)
+        '''
+        sqlDB=self.getSqlDB(readOnly=True)
+        tableColumns=[columnInfo["name"] for columnInfo in sqlDB.query(f"pragma table_info('{tableName}')")]
+        ratings=[]
+        if not "eventId" in tableColumns:
+            return ratings
+        source=RatingEngine.getSource(tableName)
+        for rule in self.rules:
+            condition=rule.getCondition(tableName,tableColumns)
+            if condition is None:
+                continue
+            query=f"SELECT ?,?,{rule.hint},'Event',?,eventId FROM {tableName} WHERE {condition}"
+            ratings.extend(sqlDB.c.execute(query,(rule.pain,rule.reason.value,source)).fetchall())
+        return ratings
+
+    def run(self,sourceTables:list=None)->dict:
+        '''
+        (re)rate the events of the given event tables
+
+        Args:
+            sourceTables(list): the event tables to rate - default: all event tables
+
+        Return:
+            dict: the number of ratings per table
+        '''
+        startTime=time.time()
+        self.ensureTable()
+        sqlDB=self.getSqlDB()
+        if sourceTables is None:
+            sourceTables=list(EventStorage.getSourceTableSchemas("event",sqlDB).keys())
+        counts={}
+        with ThreadPoolExecutor(max_workers=self.maxWorkers) as executor:
+            for tableName,ratings in zip(sourceTables,executor.map(self.rateTable,sourceTables)):
+                with ConnectionPool.getWriteLock(sqlDB):
+                    sqlDB.c.execute(f"DELETE FROM {RatingEngine.tableName} WHERE source=? AND entityType='Event'",(RatingEngine.getSource(tableName),))
+                    sqlDB.c.executemany(f"INSERT INTO {RatingEngine.tableName} VALUES (?,?,?,?,?,?)",ratings)
+                    sqlDB.c.commit()
+                    TableMeta.recordChange(sqlDB,RatingEngine.tableName)
+                counts[tableName]=len(ratings)
+        if self.debug:
+            print(f"rating {len(sourceTables)} event tables with {sum(counts.values())} ratings took {time.time()-startTime:5.1f} s")
+        return counts
@@ -0,0 +1,281 @@
+from corpus.cachemeta import MetaTable
+from lodstorage.query import Query
+from lodstorage.sql import SQLDB
+from datetime import datetime
+from tabulate import tabulate
+import re
+import sqlite3
+import time
+
+class QueryAdvisor(object):
+    '''
+    run the queries of a query catalog with EXPLAIN QUERY PLAN and propose indexes
+    for the full table scans
+    '''
+    # words that may follow a table name in the from clause and are no table alias
+    clauseKeywords=["where","join","on","using","group","order","having","limit","union","left","right","inner","outer","cross","natural","as"]
+    # indexes created on advice - source tables are recreated on reload so the indexes need to be restored
+    indexMetaTable=MetaTable("indexmeta","indexName",{
+        "indexName":"TEXT",
+        "tableName":"TEXT",
+        "columns":"TEXT",
+        "created":"TIMESTAMP"
+    })
+
+    def __init__(self,sqlDB:SQLDB,queries:list,repeat:int=3,covering:bool=False,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database to run the queries against
+            queries(list): the list of lodstorage Query instances of the catalog
+            repeat(int): the number of runs per query - the best time is reported
+            covering(bool): if True propose covering indexes with the selected columns for single table queries
+            debug(bool): if True show progress
+        '''
+        self.sqlDB=sqlDB
+        self.queries=queries
+        self.repeat=repeat
+        self.covering=covering
+        self.debug=debug
+
+    def getColumns(self,tableName:str)->list:
+        '''
+        get the column names of the given table
+        '''
+        return [columnInfo["name"] for columnInfo in self.sqlDB.query(f"pragma table_info('{tableName}')")]
+
+    @staticmethod
+    def isExplainable(sql:str)->bool:
+        '''
+        check whether the given sql is a query that has a query plan
+        '''
+        return re.match(r"\s*(select|with)\b",sql,re.IGNORECASE) is not None
+
+    def explain(self,sql:str)->list:
+        '''
+        get the query plan details of the given sql
+
+        Return:
+            list: the detail strings of the query plan
+        '''
+        plan=self.sqlDB.query(f"EXPLAIN QUERY PLAN {sql}")
+        return [step["detail"] for step in plan]
+
+    def timeQuery(self,sql:str)->float:
+        '''
+        get the best time of my repeated runs of the given sql
+
+        Return:
+            float: the time in seconds
+        '''
+        best=None
+        for _i in range(self.repeat):
+            startTime=time.time()
+            self.sqlDB.c.execute(sql).fetchall()
+            elapsed=time.time()-startTime
+            best=elapsed if best is None else min(best,elapsed)
+        return best
+
+    def analyze(self,query:Query)->dict:
+        '''
+        analyze the given query
+
+        Args:
+            query(Query): the query to analyze
+
+        Return:
+            dict: the name, time, full table scans and used indexes of the query
+        '''
+        record={"name":query.name,"time":None,"scans":[],"indexes":[],"error":None}
+        if not QueryAdvisor.isExplainable(query.query):
+            record["error"]="not a select statement"
+            return record
+        try:
+            for detail in self.explain(query.query):
+                scan=re.match(r"SCAN (?:TABLE )?(\w+)(.*)",detail)
+                if scan and not "INDEX" in scan.group(2):
+                    record["scans"].append(scan.group(1))
+                index=re.search(r"USING (?:COVERING )?INDEX (\w+)",detail)
+                if index:
+                    record["indexes"].append(index.group(1))
+            record["time"]=self.timeQuery(query.query)
+        except sqlite3.OperationalError as ex:
+            record["error"]=str(ex)
+        return record
+
+    @staticmethod
+    def getTableNames(lowerSql:str)->dict:
+        '''
+        get the tables of the from clause of the given query and the names they are referred to with
+
+        Args:
+            lowerSql(str): the lower case query without string literals
+
+        Return:
+            dict: map of table names to the set of the table name and its aliases
+        '''
+        tableNames={}
+        match=re.search(r"\bfrom\b(.*?)(\bwhere\b|\bgroup by\b|\border by\b|\bhaving\b|\blimit\b|\bunion\b|$)",lowerSql,re.DOTALL)
+        if match:
+            for item in re.split(r",|\bjoin\b",match.group(1)):
+                tokens=re.findall(r"\w+",re.split(r"\bon\b|\busing\b",item)[0])
+                tokens=[token for token in tokens if not token in QueryAdvisor.clauseKeywords]
+                if tokens:
+                    tableNames.setdefault(tokens[0],set([tokens[0]])).update(tokens[1:2])
+        return tableNames
+
+    @staticmethod
+    def getClause(lowerSql:str,keyword:str)->str:
+        '''
+        get the given clause of the given query
+
+        Args:
+            lowerSql(str): the lower case query without string literals
+            keyword(str): select, where, group by or order by
+
+        Return:
+            str: the clause without its keyword or None if the query has no such clause
+        '''
+        end="from" if keyword=="select" else "group by|order by|having|limit|union"
+        match=re.search(rf"\b{keyword}\b(.*?)(\b(?:{end})\b|$)",lowerSql,re.DOTALL)
+        return match.group(1) if match else None
+
+    def proposeIndexes(self,query:Query,scans:list)->list:
+        '''
+        propose indexes for the tables the given query scans
+
+        the columns of the where clause come first followed by the group by and
+        order by columns - for covering indexes of single table queries the selected
+        columns follow
+
+        Args:
+            query(Query): the query
+            scans(list): the names of the fully scanned tables
+
+        Return:
+            list: a list of (tableName,columns) tuples
+        '''
+        lowerSql=re.sub(r"'(?:[^']|'')*'","''",query.query.lower())
+        tableNames=QueryAdvisor.getTableNames(lowerSql)
+        selectList=QueryAdvisor.getClause(lowerSql,"select") or ""
+        # names of select list expressions e.g. "order by total"
+        selectAliases=set(re.findall(r"\bas\s+(\w+)",selectList))
+        parts=[QueryAdvisor.getClause(lowerSql,keyword) for keyword in ["where","group by","order by"]]
+        if self.covering and len(tableNames)==1:
+            parts.append(selectList)
+        proposals=[]
+        for tableName in sorted(set(scans)):
+            names=tableNames.get(tableName.lower(),set([tableName.lower()]))
+            columnsByLowerName={column.lower():column for column in self.getColumns(tableName)}
+            indexColumns=[]
+            for part in parts:
+                if part is None:
+                    continue
+                for qualifier,identifier in re.findall(r"(?:(\w+)\s*\.\s*)?(\w+)",part):
+                    if qualifier and not qualifier in names:
+                        continue
+                    if not qualifier and identifier in selectAliases:
+                        continue
+                    column=columnsByLowerName.get(identifier,None)
+                    if column is not None and not column in indexColumns:
+                        indexColumns.append(column)
+            if indexColumns:
+                proposals.append((tableName,indexColumns))
+        return proposals
+
+    @staticmethod
+    def getIndexName(tableName:str,columns:list)->str:
+        '''
+        get the name of the advised index on the given columns of the given table
+        '''
+        return f"idx_{tableName}_{'_'.join(columns)}"
+
+    def createIndex(self,tableName:str,columns:list)->str:
+        '''
+        create and record the given index
+
+        Return:
+            str: the name of the index
+        '''
+        indexName=QueryAdvisor.getIndexName(tableName,columns)
+        self.sqlDB.execute(f"CREATE INDEX IF NOT EXISTS {indexName} ON {tableName} ({','.join(columns)})")
+        QueryAdvisor.indexMetaTable.upsert(self.sqlDB,{"indexName":indexName,"tableName":tableName,"columns":",".join(columns),"created":datetime.now()})
+        return indexName
+
+    @staticmethod
+    def restoreIndexes(sqlDB:SQLDB)->list:
+        '''
+        recreate the recorded advised indexes e.g. after the source tables have been reloaded
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+
+        Return:
+            list: the names of the indexes that could be restored
+        '''
+        restored=[]
+        tableNames=[record["name"] for record in sqlDB.query("SELECT name FROM sqlite_master WHERE type='table'")]
+        for indexName,record in QueryAdvisor.indexMetaTable.getLookup(sqlDB).items():
+            if record["tableName"] in tableNames:
+                try:
+                    sqlDB.execute(f"CREATE INDEX IF NOT EXISTS {indexName} ON {record['tableName']} ({record['columns']})")
+                    restored.append(indexName)
+                except sqlite3.OperationalError:
+                    # the columns are gone after a schema change
+                    pass
+        return restored
+
+    def advise(self,createIndexes:bool=False)->list:
+        '''
+        analyze all queries of my catalog, propose indexes for the full table scans and
+        optionally create them and analyze the queries again
+
+        Args:
+            createIndexes(bool): if True create the proposed indexes
+
+        Return:
+            list: the benchmark report as a list of dicts
+        '''
+        report=[]
+        for query in self.queries:
+            before=self.analyze(query)
+            proposals=self.proposeIndexes(query,before["scans"]) if before["error"] is None else []
+            indexNames=[]
+            if createIndexes:
+                for tableName,columns in proposals:
+                    indexNames.append(self.createIndex(tableName,columns))
+            record={
+                "query":query.name,
+                "ms before":QueryAdvisor.asMillis(before["time"]),
+                "scans":",".join(before["scans"]),
+                "indexes used":",".join(before["indexes"]),
+                "proposed":"; ".join([f"{tableName}({','.join(columns)})" for tableName,columns in proposals]),
+                "error":before["error"]
+            }
+            report.append(record)
+            if self.debug:
+                print(record)
+        if createIndexes:
+            self.sqlDB.execute("ANALYZE")
+            for query,record in zip(self.queries,report):
+                if record["error"] is None:
+                    after=self.analyze(query)
+                    record["ms after"]=QueryAdvisor.asMillis(after["time"])
+                    record["scans after"]=",".join(after["scans"])
+                    record["indexes used after"]=",".join(after["indexes"])
+        return report
+
+    @staticmethod
+    def asMillis(seconds:float)->float:
+        '''
+        convert the given seconds to rounded milliseconds
+        '''
+        return None if seconds is None else round(seconds*1000,3)
+
+    @staticmethod
+    def asReport(report:list,tablefmt:str="mediawiki")->str:
+        '''
+        get the given benchmark report as a table in the given format
+        '''
+        return tabulate(report,headers="keys",tablefmt=tablefmt)
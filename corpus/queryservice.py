@@ -0,0 +1,231 @@
+from corpus.event import EventStorage
+from corpus.querystream import QueryStream
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import json
+import re
+import sqlite3
+import threading
+import time
+
+class QueryService(object):
+    '''
+    long running read-only query service for the EventCorpus.db with a result cache
+    '''
+
+    def __init__(self,lookup=None,cacheFile:str=None,cacheSize:int=256,mmapSize:int=256*1024*1024,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            lookup(CorpusLookup): the lookup to get named queries from
+            cacheFile(str): the database file - if None the EventCorpus.db is used
+            cacheSize(int): maximum number of query results to cache
+            mmapSize(int): the number of bytes of the database file to memory map
+            debug(bool): if True show debug information
+        '''
+        self.lookup=lookup
+        self.cacheFile=cacheFile
+        self.cacheSize=cacheSize
+        self.mmapSize=mmapSize
+        self.debug=debug
+        self.cache=OrderedDict()
+        self.cacheLock=threading.Lock()
+        # the connection of each thread that has memory mapping enabled
+        self.local=threading.local()
+        self.hits=0
+        self.misses=0
+
+    def getSqlDB(self):
+        '''
+        get the read-only database of the current thread with memory mapping enabled
+        '''
+        sqlDB=EventStorage.getSqlDB(readOnly=True,cacheFile=self.cacheFile)
+        # the read-only connections are closed when their thread ends
+        if getattr(self.local,"connection",None) is not sqlDB.c:
+            sqlDB.c.execute(f"PRAGMA mmap_size={self.mmapSize}")
+            self.local.connection=sqlDB.c
+        return sqlDB
+
+    # string literals and quoted identifiers or runs of comments and whitespace of SQL queries
+    sqlTokenPattern=re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|((?:\s+|--[^\n]*|/\*.*?\*/)+)",re.DOTALL)
+
+    @staticmethod
+    def normalizeQuery(query:str)->str:
+        '''
+        normalize the given SQL query for use as a cache key - the normalized query is not meant to be executed
+
+        Args:
+            query(str): the SQL query
+
+        Return:
+            str: the query without comments, with collapsed whitespace outside of quotes and without trailing semicolon
+        '''
+        def normalizeToken(match):
+            literal,_separator=match.groups()
+            return literal if literal is not None else " "
+        normalized=QueryService.sqlTokenPattern.sub(normalizeToken,query).strip()
+        normalized=normalized.rstrip(";").strip()
+        return normalized
+
+    @staticmethod
+    def getPageQuery(query:str)->str:
+        '''
+        get the given query wrapped for fetching a page of its result
+
+        Args:
+            query(str): the SQL query
+
+        Return:
+            str: the query selecting with LIMIT and OFFSET parameters
+        '''
+        # the line breaks keep a trailing comment from swallowing the LIMIT clause
+        sql=query.strip().rstrip(";")
+        return f"SELECT * FROM (\n{sql}\n) LIMIT ? OFFSET ?"
+
+    def getDataVersion(self)->str:
+        '''
+        get a stamp that changes whenever a data source is reloaded or a table is changed by one of the write paths
+
+        Return:
+            str: the data version stamp
+        '''
+        sqlDB=self.getSqlDB()
+        stamp=""
+        for query in ["SELECT max(loadTime) AS stamp FROM sourcemeta","SELECT max(updated) AS stamp FROM tablemeta"]:
+            try:
+                stamp+=f"{sqlDB.query(query)[0]['stamp']}|"
+            except sqlite3.OperationalError:
+                # no bookkeeping table (yet)
+                stamp+="|"
+        return stamp
+
+    def resolveQuery(self,query:str=None,name:str=None)->str:
+        '''
+        get the SQL for the given query or the named query of my lookup's query manager
+
+        Args:
+            query(str): the SQL query
+            name(str): the name of a query in queries.yaml
+
+        Return:
+            str: the SQL query
+        '''
+        if name is not None:
+            if self.lookup is None:
+                raise Exception(f"named query {name} needs a lookup")
+            qm=self.lookup.getQueryManager()
+            if qm is None or not name in qm.queriesByName:
+                raise Exception(f"unknown query {name}")
+            query=qm.queriesByName[name].query
+        if query is None:
+            raise Exception("query or name needed")
+        return query
+
+    def query(self,query:str,offset:int=0,limit:int=None)->list:
+        '''
+        run the given query using the result cache
+
+        Args:
+            query(str): the SQL query to run
+            offset(int): the number of rows to skip
+            limit(int): the maximum number of rows to return - None for all
+
+        Return:
+            list: the list of dicts for the requested page of the result - a copy that callers may modify
+        '''
+        key=(QueryService.normalizeQuery(query),offset,limit,self.getDataVersion())
+        with self.cacheLock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits+=1
+                return [dict(record) for record in self.cache[key]]
+            self.misses+=1
+        sqlDB=self.getSqlDB()
+        if limit is not None or offset>0:
+            pageLimit=limit if limit is not None else -1
+            lod=sqlDB.query(QueryService.getPageQuery(query),(pageLimit,offset))
+        else:
+            lod=sqlDB.query(query)
+        with self.cacheLock:
+            self.cache[key]=lod
+            while len(self.cache)>self.cacheSize:
+                self.cache.popitem(last=False)
+        return [dict(record) for record in lod]
+
+    def stream(self,query:str,batchSize:int=1000,rowFormat:str="dict")->QueryStream:
+        '''
+        stream the result of the given query in batches without caching
+
+        Args:
+            query(str): the SQL query to run
+            batchSize(int): the number of rows per batch
+            rowFormat(str): dict, tuple or namedtuple
+
+        Return:
+            QueryStream: the stream of the query result
+        '''
+        queryStream=QueryStream(self.getSqlDB(),query,batchSize=batchSize,rowFormat=rowFormat)
+        return queryStream
+
+    def clearCache(self):
+        '''
+        clear my result cache
+        '''
+        with self.cacheLock:
+            self.cache.clear()
+
+    def serve(self,host:str="localhost",port:int=8765):
+        '''
+        serve queries via http GET /query?sql=...|name=...&offset=...&limit=...
+
+        Args:
+            host(str): the host to bind to
+            port(int): the port to listen on
+        '''
+        service=self
+        class Handler(QueryServiceRequestHandler):
+            queryService=service
+        server=ThreadingHTTPServer((host,port),Handler)
+        print(f"serving EventCorpus queries on http://{host}:{port}/query")
+        server.serve_forever()
+
+class QueryServiceRequestHandler(BaseHTTPRequestHandler):
+    '''
+    http request handler for the QueryService
+    '''
+    queryService=None
+
+    def do_GET(self):
+        '''
+        handle a GET request
+        '''
+        url=urlparse(self.path)
+        params={key:values[0] for key,values in parse_qs(url.query).items()}
+        status=200
+        try:
+            if url.path!="/query":
+                raise Exception(f"invalid path {url.path}")
+            startTime=time.time()
+            query=self.queryService.resolveQuery(params.get("sql",None),params.get("name",None))
+            offset=int(params.get("offset",0))
+            limit=int(params["limit"]) if "limit" in params else None
+            lod=self.queryService.query(query,offset=offset,limit=limit)
+            result={"offset":offset,"limit":limit,"count":len(lod),"elapsed":time.time()-startTime,"rows":lod}
+        except Exception as ex:
+            status=400
+            result={"error":str(ex)}
+        content=json.dumps(result,default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type","application/json")
+        self.send_header("Content-Length",str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self,format,*args):
+        '''
+        only log requests in debug mode
+        '''
+        if self.queryService.debug:
+            super().log_message(format,*args)
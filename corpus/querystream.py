@@ -0,0 +1,228 @@
+from lodstorage.sql import SQLDB
+from lodstorage.query import Query
+from corpus.compactentity import CompactEntity
+from collections import namedtuple
+from tabulate import tabulate
+import csv
+import itertools
+import json
+
+class QueryStream(object):
+    '''
+    a query result that is fetched from the cursor in batches instead of as a whole list of dicts
+    '''
+    rowFormats=["dict","tuple","namedtuple"]
+
+    def __init__(self,sqlDB:SQLDB,query:str,params:tuple=None,batchSize:int=1000,rowFormat:str="dict"):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database to query
+            query(str): the SQL query to run
+            params(tuple): the parameters of the query
+            batchSize(int): the number of rows to fetch at once
+            rowFormat(str): dict, tuple or namedtuple
+        '''
+        if not rowFormat in QueryStream.rowFormats:
+            raise Exception(f"invalid rowFormat {rowFormat} - must be one of {QueryStream.rowFormats}")
+        self.sqlDB=sqlDB
+        self.query=query
+        self.params=params
+        self.batchSize=batchSize
+        self.rowFormat=rowFormat
+        self.columns=None
+
+    def getColumns(self)->list:
+        '''
+        get the column names of my query without fetching any row
+        '''
+        if self.columns is None:
+            cursor=self.sqlDB.c.cursor()
+            try:
+                cursor.execute(f"SELECT * FROM ({self.query}) LIMIT 0",self.params if self.params else ())
+                self.columns=[description[0] for description in cursor.description]
+            finally:
+                cursor.close()
+        return self.columns
+
+    def batches(self):
+        '''
+        run my query and yield the rows in batches of my batchSize
+
+        Return:
+            generator: a generator of lists of rows in my rowFormat
+        '''
+        cursor=self.sqlDB.c.cursor()
+        try:
+            cursor.execute(self.query,self.params if self.params else ())
+            self.columns=[description[0] for description in cursor.description]
+            if self.rowFormat=="namedtuple":
+                rowClass=namedtuple("Row",self.columns,rename=True)
+            while True:
+                rows=cursor.fetchmany(self.batchSize)
+                if not rows:
+                    break
+                if self.rowFormat=="dict":
+                    rows=[dict(zip(self.columns,row)) for row in rows]
+                elif self.rowFormat=="namedtuple":
+                    rows=[rowClass._make(row) for row in rows]
+                yield rows
+        finally:
+            cursor.close()
+
+    def __iter__(self):
+        '''
+        run my query and yield the rows one by one
+        '''
+        for batch in self.batches():
+            for row in batch:
+                yield row
+
+class QueryStreamWriter(object):
+    '''
+    incremental output of query streams with constant memory
+    '''
+    # number of header and footer lines of tabulate formats that wrap the rows
+    wrappedFormats={
+        "mediawiki":(4,1),
+        "latex":(4,2),
+        "latex_raw":(4,2),
+        "latex_booktabs":(4,2),
+        "html":(5,2),
+    }
+
+    @staticmethod
+    def writeCsv(queryStream:QueryStream,fileObj,delimiter:str=",",quoting=csv.QUOTE_NONNUMERIC)->int:
+        '''
+        write the given query stream as CSV in the dialect of lodstorage.csv.CSV
+
+        Args:
+            queryStream(QueryStream): the rows to write - the rowFormat must be dict
+            fileObj: the text file to write to
+            delimiter(str): the delimiter to use
+            quoting: the csv quoting mode
+
+        Return:
+            int: the number of rows written
+        '''
+        count=QueryStreamWriter.writeCsvRecords(queryStream,fileObj,fields=queryStream.getColumns(),delimiter=delimiter,quoting=quoting,chunkSize=queryStream.batchSize)
+        return count
+
+    @staticmethod
+    def writeCsvRecords(records,fileObj,fields:list=None,delimiter:str=",",quoting=csv.QUOTE_NONNUMERIC,chunkSize:int=1000)->int:
+        '''
+        write the given records as CSV in the dialect of lodstorage.csv.CSV in chunks
+
+        Args:
+            records: an iterable of dicts or JSONAble entities e.g. a QueryStream or an entity list
+            fileObj: the text file to write to
+            fields(list): the fields to write - default: the fields of the first record
+            delimiter(str): the delimiter to use
+            quoting: the csv quoting mode
+            chunkSize(int): the number of records to write at once
+
+        Return:
+            int: the number of records written
+        '''
+        recordIter=iter(records)
+        chunk=[QueryStreamWriter.asDict(record) for record in itertools.islice(recordIter,chunkSize)]
+        if fields is None:
+            fields=list(chunk[0].keys()) if chunk else []
+        writer=csv.DictWriter(fileObj,fieldnames=fields,delimiter=delimiter,quoting=quoting,extrasaction="ignore")
+        writer.writeheader()
+        count=0
+        while chunk:
+            writer.writerows(chunk)
+            count+=len(chunk)
+            chunk=[QueryStreamWriter.asDict(record) for record in itertools.islice(recordIter,chunkSize)]
+        return count
+
+    @staticmethod
+    def asDict(record)->dict:
+        '''
+        get the given record as a dict
+
+        Args:
+            record: a dict or a JSONAble entity
+        '''
+        if isinstance(record,dict):
+            return record
+        return CompactEntity.getDict(record)
+
+    @staticmethod
+    def writeJsonLines(queryStream:QueryStream,fileObj)->int:
+        '''
+        write the given query stream as JSON lines - one JSON object per row
+
+        Args:
+            queryStream(QueryStream): the rows to write - the rowFormat must be dict
+            fileObj: the text file to write to
+
+        Return:
+            int: the number of rows written
+        '''
+        count=0
+        for batch in queryStream.batches():
+            fileObj.write("".join([f"{json.dumps(row,default=str)}\n" for row in batch]))
+            count+=len(batch)
+        return count
+
+    @staticmethod
+    def writeTable(queryStream:QueryStream,fileObj,tablefmt:str="mediawiki",**kwArgs)->int:
+        '''
+        write the given query stream as a tabulate table batch by batch
+
+        the column widths of aligned formats are computed per batch
+
+        Args:
+            queryStream(QueryStream): the rows to write - the rowFormat must be dict
+            fileObj: the text file to write to
+            tablefmt(str): the tabulate table format to use
+
+        Return:
+            int: the number of rows written
+        '''
+        headers=queryStream.getColumns()
+        if tablefmt in QueryStreamWriter.wrappedFormats:
+            headerLines,footerLines=QueryStreamWriter.wrappedFormats[tablefmt]
+        else:
+            headerLines=len(tabulate([],headers=headers,tablefmt=tablefmt).splitlines())
+            footerLines=0
+        count=0
+        footer=None
+        for batch in queryStream.batches():
+            rows=[[row[column] for column in headers] for row in batch]
+            lines=tabulate(rows,headers=headers,tablefmt=tablefmt,**kwArgs).splitlines()
+            if footerLines>0:
+                footer=lines[-footerLines:]
+                lines=lines[:-footerLines]
+            if count>0:
+                lines=lines[headerLines:]
+            fileObj.write("\n".join(lines)+"\n")
+            count+=len(batch)
+        if count==0:
+            fileObj.write(tabulate([],headers=headers,tablefmt=tablefmt,**kwArgs)+"\n")
+        elif footer is not None:
+            fileObj.write("\n".join(footer)+"\n")
+        return count
+
+    @staticmethod
+    def documentQueryResult(query:Query,queryStream:QueryStream,fileObj,tablefmt:str="mediawiki",tryItUrl:str=None,**kwArgs)->int:
+        '''
+        write the documentation of the given query with its streamed result
+        in the layout of lodstorage.query.Query.documentQueryResult
+
+        Args:
+            query(Query): the query to document
+            queryStream(QueryStream): the result of the query
+            fileObj: the text file to write to
+            tablefmt(str): the table format to use
+            tryItUrl(str): the "try it!" url to show
+
+        Return:
+            int: the number of rows written
+        '''
+        doc=query.documentQueryResult([],tablefmt=tablefmt,tryItUrl=tryItUrl)
+        fileObj.write(f"{doc.title}\n{query.description}\n{doc.sourceCodeHeader}\n{doc.sourceCode}{doc.tryItMarkup}\n{doc.resultHeader}\n")
+        return QueryStreamWriter.writeTable(queryStream,fileObj,tablefmt=tablefmt,**kwArgs)
@@ -0,0 +1,116 @@
+from corpus.normalizer import EventNormalizer
+from lodstorage.sql import SQLDB
+import sqlite3
+import sys
+
+class SeriesInduction(object):
+    '''
+    derive the event series of a data source from its event table in a single SQL pass
+    e.g. for data sources that have no series data of their own
+    '''
+    # the default series key: the normalized acronym stem or the normalized title if there is no acronym
+    stemKey="coalesce(acronymStem(acronym),acronymStem(title))"
+
+    @staticmethod
+    def registerFunctions(sqlDB:SQLDB):
+        '''
+        register the normalization functions of the EventNormalizer as SQL functions of the given database
+
+        Args:
+            sqlDB(SQLDB): the database to register the functions for
+        '''
+        functions={
+            "acronymStem":EventNormalizer.getAcronymStem,
+            "seriesAcronym":EventNormalizer.getSeriesAcronym,
+            "titleTemplate":EventNormalizer.getTitleTemplate,
+            "extractYear":EventNormalizer.extractYear
+        }
+        # deterministic functions need python 3.8 and SQLite 3.8.3
+        options={}
+        if sys.version_info>=(3,8) and sqlite3.sqlite_version_info>=(3,8,3):
+            options["deterministic"]=True
+        for name,function in functions.items():
+            sqlDB.c.create_function(name,1,function,**options)
+
+    @staticmethod
+    def getSeriesQuery(eventTable:str,columns:list,seriesKey:str,acronym:str,title:str)->str:
+        '''
+        get the query to induce the series of the given event table
+
+        the acronym and title of a series are the most frequent ones of its events - they are
+        combined by a UNION ALL and GROUP BY since joins on the CTEs would not be indexed
+
+        Args:
+            eventTable(str): the name of the event table
+            columns(list): the columns of the event table
+            seriesKey(str): the SQL expression for the key of the series an event belongs to
+            acronym(str): the SQL expression for the series acronym of an event
+            title(str): the SQL expression for the series title of an event
+
+        Return:
+            str: the SQL query
+        '''
+        if "year" in columns:
+            year="year"
+        else:
+            yearSources=[column for column in ["date","startDate","title","acronym"] if column in columns]
+            year=f"extractYear(coalesce({','.join(yearSources)}))" if yearSources else "NULL"
+        # missing acronym or title columns are treated as NULL
+        missing="".join([f",NULL AS {column}" for column in ["acronym","title"] if not column in columns])
+        # SQLite 3.35 and later materialize the keyed CTE since it is used more than once
+        query=f"""WITH keyed AS (
+  SELECT {seriesKey} AS seriesKey,{acronym} AS acronym,{title} AS title,{year} AS year
+  FROM (SELECT *{missing} FROM {eventTable})
+),
+acronyms AS (
+  SELECT seriesKey,acronym FROM (
+    SELECT seriesKey,acronym,row_number() OVER (PARTITION BY seriesKey ORDER BY count(*) DESC,acronym) AS rank
+    FROM keyed WHERE seriesKey IS NOT NULL AND acronym IS NOT NULL
+    GROUP BY seriesKey,acronym
+  ) WHERE rank=1
+),
+titles AS (
+  SELECT seriesKey,title FROM (
+    SELECT seriesKey,title,row_number() OVER (PARTITION BY seriesKey ORDER BY count(*) DESC,title) AS rank
+    FROM keyed WHERE seriesKey IS NOT NULL AND title IS NOT NULL
+    GROUP BY seriesKey,title
+  ) WHERE rank=1
+)
+SELECT seriesKey AS eventSeriesId,max(acronym) AS acronym,max(title) AS title,sum(count) AS count,min(minYear) AS minYear,max(maxYear) AS maxYear
+FROM (
+  SELECT seriesKey,NULL AS acronym,NULL AS title,count(*) AS count,min(year) AS minYear,max(year) AS maxYear
+  FROM keyed WHERE seriesKey IS NOT NULL GROUP BY seriesKey
+  UNION ALL SELECT seriesKey,acronym,NULL,0,NULL,NULL FROM acronyms
+  UNION ALL SELECT seriesKey,NULL,title,0,NULL,NULL FROM titles
+)
+GROUP BY seriesKey
+ORDER BY seriesKey"""
+        return query
+
+    @staticmethod
+    def induce(sqlDB:SQLDB,eventTable:str,source:str,seriesKey:str=None,acronym:str="seriesAcronym(acronym)",title:str="titleTemplate(title)")->list:
+        '''
+        induce the event series of the given event table
+
+        Args:
+            sqlDB(SQLDB): the database with the event table
+            eventTable(str): the name of the event table
+            source(str): the lookupId of the data source
+            seriesKey(str): the SQL expression for the key of the series an event belongs to - default: the normalized acronym stem
+            acronym(str): the SQL expression for the series acronym of an event
+            title(str): the SQL expression for the series title of an event
+
+        Return:
+            list: the list of dicts with the eventSeriesId,acronym,title,count,minYear,maxYear and source of the series
+        '''
+        columns=[columnInfo["name"] for columnInfo in sqlDB.query(f"pragma table_info('{eventTable}')")]
+        if not columns:
+            raise Exception(f"{source}: can not induce event series - {eventTable} does not exist")
+        if seriesKey is None:
+            seriesKey=SeriesInduction.stemKey
+        SeriesInduction.registerFunctions(sqlDB)
+        query=SeriesInduction.getSeriesQuery(eventTable,columns,seriesKey,acronym,title)
+        listOfDicts=sqlDB.query(query)
+        for record in listOfDicts:
+            record["source"]=source
+        return listOfDicts
@@ -0,0 +1,102 @@
+from lodstorage.sql import SQLDB
+from corpus.cachemeta import TableMeta
+from corpus.sqlpool import ConnectionPool
+
+class EventSeriesLink(object):
+    '''
+    the links between the events and event series of the data sources
+    built once at store time by SQL joins on the configured foreign key of each data source
+    '''
+    tableName="event_series_link"
+
+    @staticmethod
+    def ensureTable(sqlDB:SQLDB):
+        '''
+        make sure the link table and its indexes exist
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+        '''
+        tableName=EventSeriesLink.tableName
+        sqlDB.execute(f"CREATE TABLE IF NOT EXISTS {tableName} (source TEXT,eventId TEXT,seriesId TEXT,seriesAcronym TEXT)")
+        for columns in ["source,seriesId","source,seriesAcronym","source,eventId"]:
+            sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_{columns.replace(',','_')} ON {tableName}({columns})")
+
+    @staticmethod
+    def getColumns(sqlDB:SQLDB,tableName:str)->list:
+        '''
+        get the column names of the given table
+        '''
+        return [columnInfo["name"] for columnInfo in sqlDB.query(f"pragma table_info('{tableName}')")]
+
+    @staticmethod
+    def build(sqlDB:SQLDB,source:str,eventTable:str,eventIdColumn:str,seriesTable:str,foreignKey:str,seriesKey:str,debug:bool=False)->int:
+        '''
+        (re)build the links of the given source
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            source(str): the lookupId of the data source
+            eventTable(str): the name of the event table of the data source
+            eventIdColumn(str): the column identifying the events
+            seriesTable(str): the name of the event series table of the data source
+            foreignKey(str): the column of the event table referencing the series
+            seriesKey(str): the column of the series table the foreign key refers to
+
+        Return:
+            int: the number of links
+        '''
+        with ConnectionPool.getWriteLock(sqlDB):
+            EventSeriesLink.ensureTable(sqlDB)
+            tableName=EventSeriesLink.tableName
+            sqlDB.c.execute(f"DELETE FROM {tableName} WHERE source=?",(source,))
+            eventColumns=EventSeriesLink.getColumns(sqlDB,eventTable)
+            seriesColumns=EventSeriesLink.getColumns(sqlDB,seriesTable)
+            count=0
+            if foreignKey in eventColumns and eventIdColumn in eventColumns and seriesKey in seriesColumns:
+                acronym="s.acronym" if "acronym" in seriesColumns else "NULL"
+                sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{seriesTable}_{seriesKey} ON {seriesTable}({seriesKey})")
+                sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{eventTable}_{eventIdColumn} ON {eventTable}({eventIdColumn})")
+                sqlDB.c.execute(f"""INSERT INTO {tableName} (source,eventId,seriesId,seriesAcronym)
+SELECT DISTINCT ?,e.{eventIdColumn},s.{seriesKey},{acronym}
+FROM {eventTable} e JOIN {seriesTable} s ON e.{foreignKey}=s.{seriesKey}
+WHERE e.{foreignKey} IS NOT NULL""",(source,))
+                count=sqlDB.query(f"SELECT count(*) AS count FROM {tableName} WHERE source=?",(source,))[0]["count"]
+            elif debug:
+                print(f"{source}: can not link {eventTable}.{foreignKey} to {seriesTable}.{seriesKey}")
+            sqlDB.c.commit()
+            TableMeta.recordChange(sqlDB,tableName)
+        if debug:
+            print(f"{source}: {count} events linked to their series")
+        return count
+
+    @staticmethod
+    def hasLinks(sqlDB:SQLDB,source:str)->bool:
+        '''
+        check whether links have been built for the given source
+        '''
+        exists=sqlDB.query("SELECT name FROM sqlite_master WHERE type='table' AND name=?",(EventSeriesLink.tableName,))
+        if len(exists)==0:
+            return False
+        links=sqlDB.query(f"SELECT 1 FROM {EventSeriesLink.tableName} WHERE source=? LIMIT 1",(source,))
+        return len(links)>0
+
+    @staticmethod
+    def getEventRecords(sqlDB:SQLDB,source:str,eventTable:str,eventIdColumn:str,series:str)->list:
+        '''
+        get the records of the events in the given series using the link table
+
+        Args:
+            sqlDB(SQLDB): the database to work on
+            source(str): the lookupId of the data source
+            eventTable(str): the name of the event table of the data source
+            eventIdColumn(str): the column identifying the events
+            series(str): the id or acronym of the series
+
+        Return:
+            list: the list of dicts of the events in the series
+        '''
+        query=f"""SELECT e.* FROM {EventSeriesLink.tableName} l
+JOIN {eventTable} e ON e.{eventIdColumn}=l.eventId
+WHERE l.source=? AND (l.seriesId=? OR l.seriesAcronym=?)"""
+        return sqlDB.query(query,(source,series,series))
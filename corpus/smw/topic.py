@@ -12,6 +12,7 @@ from wikibot.wikiclient import WikiClient
 from wikibot.wikipush import WikiPush
 from wikifile.wikiFileManager import WikiFileManager
 from wikifile.wikiFile import WikiFile
+from corpus.compactentity import CompactEntity
 from pathlib import Path
 
 import time
@@ -61,7 +62,7 @@ class SMWEntity(object):
         Args:
             overwrite(bool): If True existing files might be overwritten
         '''
-        wikiSonRecord=self.entity.__dict__
+        wikiSonRecord=CompactEntity.getDict(self.entity)
         lookup=self.entity.getTemplateParamLookup()
         if lookup:
             wikiSonRecord=self.updateDictKeys(wikiSonRecord, lookup, reverseLookup=True)
@@ -100,10 +101,10 @@ class SMWEntityList(object):
         Add/Update the given entity in the entityList
         '''
         if hasattr(entity, identifier):
-            attributes = [*entity.__dict__]
+            attributes = [*CompactEntity.getDict(entity)]
             for origEntity in self.entityManager.getList():
                 if origEntity.pageTitle == entity.pageTitle:
-                    origAttributes = [*origEntity.__dict__]
+                    origAttributes = [*CompactEntity.getDict(origEntity)]
                     difference = set(attributes) - set(origAttributes)
                     for attr in difference:
                         setattr(origEntity, attr, getattr(entity, attr))
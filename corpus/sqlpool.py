@@ -0,0 +1,237 @@
+from lodstorage.sql import SQLDB
+from contextlib import nullcontext
+from pathlib import Path
+import os
+import sqlite3
+import threading
+import weakref
+
+class PooledSQLDB(SQLDB):
+    '''
+    an SQLDB wrapper around a connection that is owned by a ConnectionPool
+    '''
+
+    def close(self):
+        '''
+        do not close the pooled connection - this is done by the pool
+        '''
+        pass
+
+class LockedCursor(object):
+    '''
+    a proxy for a cursor of the shared writer connection that serializes its statements and fetches
+    with the write lock of the pool
+    '''
+
+    def __init__(self,cursor:sqlite3.Cursor,lock):
+        '''
+        constructor
+
+        Args:
+            cursor(Cursor): the cursor of the writer connection
+            lock(RLock): the write lock
+        '''
+        self.cursor=cursor
+        self.lock=lock
+
+    def execute(self,*args):
+        with self.lock:
+            self.cursor.execute(*args)
+            return self
+
+    def executemany(self,*args):
+        with self.lock:
+            self.cursor.executemany(*args)
+            return self
+
+    def fetchone(self):
+        with self.lock:
+            return self.cursor.fetchone()
+
+    def fetchmany(self,*args):
+        with self.lock:
+            return self.cursor.fetchmany(*args)
+
+    def fetchall(self):
+        with self.lock:
+            return self.cursor.fetchall()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self.lock:
+            return next(self.cursor)
+
+    def __getattr__(self,name):
+        '''
+        delegate everything else e.g. description and close to the cursor
+        '''
+        return getattr(self.cursor,name)
+
+class LockedConnection(object):
+    '''
+    a proxy for the shared writer connection that serializes the statements of different threads
+    with the write lock of the pool
+    '''
+
+    def __init__(self,connection:sqlite3.Connection,lock):
+        '''
+        constructor
+
+        Args:
+            connection(Connection): the writer connection
+            lock(RLock): the write lock
+        '''
+        self.connection=connection
+        self.lock=lock
+
+    def execute(self,*args):
+        with self.lock:
+            return self.connection.execute(*args)
+
+    def executemany(self,*args):
+        with self.lock:
+            return self.connection.executemany(*args)
+
+    def executescript(self,*args):
+        with self.lock:
+            return self.connection.executescript(*args)
+
+    def commit(self):
+        with self.lock:
+            return self.connection.commit()
+
+    def rollback(self):
+        with self.lock:
+            return self.connection.rollback()
+
+    def create_function(self,*args,**kwArgs):
+        with self.lock:
+            return self.connection.create_function(*args,**kwArgs)
+
+    def cursor(self):
+        '''
+        get a cursor whose statements are serialized as well - SQLDB.query uses cursors
+        '''
+        with self.lock:
+            return LockedCursor(self.connection.cursor(),self.lock)
+
+    def __getattr__(self,name):
+        '''
+        delegate everything else to the connection
+        '''
+        return getattr(self.connection,name)
+
+class ReaderHolder(object):
+    '''
+    holds the read-only connection of a thread - the connection is closed when the thread ends
+    '''
+
+    def __init__(self,connection:sqlite3.Connection):
+        self.connection=connection
+
+class ConnectionPool(object):
+    '''
+    process wide connection reuse for a sqlite database file
+
+    there is a single writer connection that may be shared between threads and a read-only connection per thread
+
+    the statements of the writer are serialized with the writeLock - multi statement writes need to hold
+    the writeLock for the whole transaction see getWriteLock
+    '''
+
+    def __init__(self,dbFile:str):
+        '''
+        constructor
+
+        Args:
+            dbFile(str): the path of the sqlite database file
+        '''
+        self.dbFile=dbFile
+        self.writeLock=threading.RLock()
+        self.writer=None
+        self.local=threading.local()
+        # the finalizers of the read-only connections of the living threads
+        self.readers=[]
+        self.lock=threading.Lock()
+
+    @staticmethod
+    def getWriteLock(sqlDB:SQLDB):
+        '''
+        get the lock to hold for a multi statement write with the given database
+
+        Args:
+            sqlDB(SQLDB): the database to write to
+
+        Return:
+            the write lock of the pool if the database is a pooled writer - a no-op context otherwise
+        '''
+        if isinstance(sqlDB.c,LockedConnection):
+            return sqlDB.c.lock
+        return nullcontext()
+
+    def getWriter(self,debug:bool=False,errorDebug:bool=False)->SQLDB:
+        '''
+        get the single writer for my database
+
+        Return:
+            SQLDB: a database wrapper around the shared writer connection
+        '''
+        with self.lock:
+            if self.writer is None:
+                connection=sqlite3.connect(self.dbFile,detect_types=sqlite3.PARSE_DECLTYPES,check_same_thread=False)
+                self.writer=LockedConnection(connection,self.writeLock)
+        return PooledSQLDB(self.dbFile,connection=self.writer,debug=debug,errorDebug=errorDebug)
+
+    def getReader(self,debug:bool=False,errorDebug:bool=False)->SQLDB:
+        '''
+        get the read-only connection of the current thread - the connection is closed when the thread ends
+
+        Return:
+            SQLDB: a database wrapper around the read-only connection of the current thread - 
+            an empty read-only in memory database if my database file does not exist yet
+        '''
+        if not os.path.isfile(self.dbFile):
+            # read-only connections can not create the database and the writer must not be handed out instead
+            connection=sqlite3.connect(":memory:",detect_types=sqlite3.PARSE_DECLTYPES,check_same_thread=False)
+            connection.execute("PRAGMA query_only=ON")
+            return SQLDB(":memory:",connection=connection,debug=debug,errorDebug=errorDebug)
+        holder=getattr(self.local,"holder",None)
+        if holder is None:
+            uri=f"{Path(self.dbFile).absolute().as_uri()}?mode=ro"
+            # only used by this thread but closable by the pool
+            connection=sqlite3.connect(uri,uri=True,detect_types=sqlite3.PARSE_DECLTYPES,check_same_thread=False)
+            holder=ReaderHolder(connection)
+            self.local.holder=holder
+            # the thread local holder is released when the thread ends
+            finalizer=weakref.finalize(holder,connection.close)
+            with self.lock:
+                self.readers=[reader for reader in self.readers if reader.alive]
+                self.readers.append(finalizer)
+        connection=holder.connection
+        return PooledSQLDB(self.dbFile,connection=connection,debug=debug,errorDebug=errorDebug)
+
+    def close(self):
+        '''
+        close all my connections
+        '''
+        with self.lock:
+            if self.writer is not None:
+                with self.writeLock:
+                    self.writer.close()
+                self.writer=None
+            for reader in self.readers:
+                reader()
+            self.readers=[]
+            self.local=threading.local()
+
+    def getReaderCount(self)->int:
+        '''
+        get the number of open read-only connections
+
+        Return:
+            int: the number of threads with an open read-only connection
+        '''
+        with self.lock:
+            return len([reader for reader in self.readers if reader.alive])
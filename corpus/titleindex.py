@@ -0,0 +1,169 @@
+from corpus.cachemeta import TableMeta
+from corpus.event import EventStorage
+from corpus.normalizer import EventNormalizer
+from corpus.sqlpool import ConnectionPool
+from collections import Counter
+from lodstorage.sql import SQLDB
+import time
+
+class TitleIndex(object):
+    '''
+    trigram index of the titles of the events of all data sources for approximate title search
+
+    the trigrams of each title are persisted in the EventCorpus.db and the postings are kept in memory
+    '''
+    tableName="titleindex"
+    # number of candidates per requested result that are scored exactly
+    candidateFactor=20
+    # posting lists up to this length are always considered selective
+    minPostings=100
+
+    def __init__(self,sqlDB:SQLDB,maxPostingRatio:float=0.05,debug:bool=False):
+        '''
+        constructor
+
+        Args:
+            sqlDB(SQLDB): the database with the event tables
+            maxPostingRatio(float): trigrams occurring in more than this ratio of the titles are ignored when searching
+            debug(bool): if True show progress information
+        '''
+        self.sqlDB=sqlDB
+        self.maxPostingRatio=maxPostingRatio
+        self.debug=debug
+        # trigram -> list of docIds - loaded lazily
+        self.postings=None
+        # docId -> (sourceTable,eventId,title,year)
+        self.docs=None
+
+    @staticmethod
+    def getTrigrams(title:str)->set:
+        '''
+        get the trigrams of the significant normalized tokens of the given title
+
+        Args:
+            title(str): the title
+
+        Return:
+            set: the set of trigrams
+        '''
+        trigrams=set()
+        for token in EventNormalizer.getTitleTokens(title):
+            padded=f" {token} "
+            for pos in range(len(padded)-2):
+                trigrams.add(padded[pos:pos+3])
+        return trigrams
+
+    def ensureTable(self):
+        '''
+        make sure my table exists
+        '''
+        tableName=TitleIndex.tableName
+        self.sqlDB.execute(f"CREATE TABLE IF NOT EXISTS {tableName} (docId INTEGER PRIMARY KEY,sourceTable TEXT,eventId TEXT,title TEXT,year INTEGER,trigrams TEXT)")
+        self.sqlDB.execute(f"CREATE INDEX IF NOT EXISTS idx_{tableName}_sourceTable ON {tableName}(sourceTable)")
+
+    def isIndexed(self)->bool:
+        '''
+        check whether the index has been built
+        '''
+        exists=self.sqlDB.query("SELECT name FROM sqlite_master WHERE type='table' AND name=?",(TitleIndex.tableName,))
+        return len(exists)>0
+
+    def update(self,sourceTables:list=None)->int:
+        '''
+        (re)index the titles of the events of the given source tables
+
+        Args:
+            sourceTables(list): the event tables to index - default: all event tables
+
+        Return:
+            int: the number of titles indexed
+        '''
+        startTime=time.time()
+        self.ensureTable()
+        if sourceTables is None:
+            sourceTables=list(EventStorage.getSourceTableSchemas("event",self.sqlDB).keys())
+        tableName=TitleIndex.tableName
+        rows=[]
+        with ConnectionPool.getWriteLock(self.sqlDB):
+            for sourceTable in sourceTables:
+                self.sqlDB.c.execute(f"DELETE FROM {tableName} WHERE sourceTable=?",(sourceTable,))
+                columns=[columnInfo["name"] for columnInfo in self.sqlDB.query(f"pragma table_info('{sourceTable}')")]
+                if not "eventId" in columns or not "title" in columns:
+                    continue
+                yearColumn="year" if "year" in columns else "NULL"
+                for record in self.sqlDB.query(f"SELECT eventId,title,{yearColumn} AS year FROM {sourceTable} WHERE title IS NOT NULL"):
+                    trigrams=TitleIndex.getTrigrams(record["title"])
+                    if not trigrams:
+                        continue
+                    year=record["year"]
+                    if year is None or not str(year).isdigit():
+                        year=EventNormalizer.extractYear(record["title"])
+                    rows.append((sourceTable,str(record["eventId"]),record["title"],int(year) if year is not None else None,"|".join(sorted(trigrams))))
+            self.sqlDB.c.executemany(f"INSERT INTO {tableName} (sourceTable,eventId,title,year,trigrams) VALUES (?,?,?,?,?)",rows)
+            self.sqlDB.c.commit()
+            TableMeta.recordChange(self.sqlDB,tableName)
+        self.postings=None
+        if self.debug:
+            print(f"indexing {len(rows)} titles of {len(sourceTables)} event tables took {time.time()-startTime:5.1f} s")
+        return len(rows)
+
+    def warmUp(self):
+        '''
+        load the persisted trigrams into the in memory postings
+        '''
+        postings={}
+        docs={}
+        for docId,sourceTable,eventId,title,year,trigrams in self.sqlDB.c.execute(f"SELECT docId,sourceTable,eventId,title,year,trigrams FROM {TitleIndex.tableName}"):
+            trigramList=trigrams.split("|")
+            docs[docId]=(sourceTable,eventId,title,year)
+            for trigram in trigramList:
+                postings.setdefault(trigram,[]).append(docId)
+        self.postings=postings
+        self.docs=docs
+
+    def search(self,title:str,limit:int=10,year:int=None,sources:list=None,minScore:float=0.0)->list:
+        '''
+        get the events with the titles most similar to the given title
+
+        Args:
+            title(str): the title to search for e.g. a full proceedings title
+            limit(int): the maximum number of results
+            year(int): only return events of the given year
+            sources(list): only return events of the given event tables e.g. ["event_dblp"]
+            minScore(float): the minimum trigram Jaccard similarity
+
+        Return:
+            list: a list of dicts with sourceTable,eventId,title,year and score ordered by descending score
+        '''
+        if self.postings is None:
+            self.warmUp()
+        trigrams=TitleIndex.getTrigrams(title)
+        if not trigrams:
+            return []
+        maxPostings=max(self.minPostings,int(len(self.docs)*self.maxPostingRatio))
+        postingLists=[self.postings[trigram] for trigram in trigrams if trigram in self.postings]
+        selective=[postingList for postingList in postingLists if len(postingList)<=maxPostings]
+        # fall back to all trigrams if they are all frequent
+        candidateLists=selective if selective else postingLists
+        # count the selective trigram hits and only score the best candidates exactly
+        hits=Counter()
+        for postingList in candidateLists:
+            hits.update(postingList)
+        candidates=[]
+        for docId,count in hits.items():
+            sourceTable,_eventId,_docTitle,docYear=self.docs[docId]
+            if year is not None and docYear!=year:
+                continue
+            if sources is not None and not sourceTable in sources:
+                continue
+            candidates.append((count,docId))
+        candidates.sort(reverse=True)
+        results=[]
+        for _count,docId in candidates[:limit*self.candidateFactor]:
+            sourceTable,eventId,docTitle,docYear=self.docs[docId]
+            docTrigrams=TitleIndex.getTrigrams(docTitle)
+            score=len(trigrams & docTrigrams)/len(trigrams | docTrigrams)
+            if score>=minScore:
+                results.append({"sourceTable":sourceTable,"eventId":eventId,"title":docTitle,"year":docYear,"score":score})
+        results.sort(key=lambda record:(-record["score"],record["sourceTable"],record["eventId"]))
+        return results[:limit]
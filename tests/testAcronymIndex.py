@@ -0,0 +1,84 @@
+import unittest
+import time
+from lodstorage.sql import SQLDB
+from corpus.acronymindex import AcronymIndex
+from corpus.normalizer import EventNormalizer
+
+class TestAcronymIndex(unittest.TestCase):
+    '''
+    test the normalization and the acronym index
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=SQLDB()
+        self.sqlDB.execute("CREATE TABLE event_dblp (eventId TEXT,acronym TEXT,year INTEGER)")
+        self.sqlDB.execute("CREATE TABLE event_crossref (eventId TEXT,acronym TEXT)")
+        self.sqlDB.execute("CREATE TABLE event_wikicfp (eventId TEXT,acronym TEXT,year INTEGER)")
+        self.sqlDB.c.executemany("INSERT INTO event_dblp VALUES (?,?,?)",[
+            ("conf/semweb/2019-1","The Semantic Web - ISWC 2019",2019),
+            ("conf/sigmis/2006","SIGMIS-CPR 2006",2006)
+        ])
+        self.sqlDB.c.executemany("INSERT INTO event_crossref VALUES (?,?)",[("10.1145/1125170","SIGMIS CPR '06")])
+        self.sqlDB.c.executemany("INSERT INTO event_wikicfp VALUES (?,?,?)",[("1","ISWC 2019",2019),("2","ISWC 2020",2020)])
+        self.sqlDB.c.commit()
+
+    def testNormalizer(self):
+        '''
+        test year extraction and normalization
+        '''
+        for text,expected in [("ISWC 2019",2019),("SIGMIS CPR '06",2006),("VLDB '99",1999),("AAAI",None),(None,None)]:
+            self.assertEqual(expected,EventNormalizer.extractYear(text),text)
+        for text,expected in [
+            ("ISWC 2019","iswc"),
+            ("SIGMIS CPR '06","sigmis cpr"),
+            ("18th ISWC","iswc"),
+            ("Twelfth AAAI-2020","aaai"),
+            ("The Semantic Web - ISWC 2019","the semantic web iswc")
+        ]:
+            self.assertEqual(expected,EventNormalizer.normalize(text),text)
+
+    def testLookupEvent(self):
+        '''
+        test looking up events by acronym
+        '''
+        acronymIndex=AcronymIndex(self.sqlDB,debug=self.debug)
+        self.assertFalse(acronymIndex.isIndexed())
+        acronymIndex.update()
+        self.assertTrue(acronymIndex.isIndexed())
+        result=acronymIndex.lookupEvent("ISWC 2019")
+        self.assertEqual([("event_wikicfp","1"),("event_dblp","conf/semweb/2019-1")],[(record["sourceTable"],record["eventId"]) for record in result])
+        result=acronymIndex.lookupEvent("sigmis-cpr '06")
+        self.assertEqual(["event_crossref","event_dblp"],[record["sourceTable"] for record in result])
+        self.assertEqual(3,len(acronymIndex.lookupEvent("ISWC")))
+        self.assertEqual([],acronymIndex.lookupEvent("ESWC 2019"))
+        # incremental update of a single source
+        self.sqlDB.execute("INSERT INTO event_wikicfp VALUES ('3','ISWC 2021',2021)")
+        acronymIndex.update(["event_wikicfp"])
+        self.assertEqual(4,len(acronymIndex.lookupEvent("ISWC")))
+        self.assertEqual(1,len(acronymIndex.lookupEvent("ISWC 2021")))
+        # the persisted index can be reused
+        self.assertEqual(4,len(AcronymIndex(self.sqlDB).lookupEvent("ISWC")))
+
+    def testPerformance(self):
+        '''
+        test the lookup time once the index is warm
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_test (eventId TEXT,acronym TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?,?)",[(f"e{i}",f"IEEE C{i%10000} {1990+i%30}",1990+i%30) for i in range(100000)])
+        acronymIndex=AcronymIndex(sqlDB)
+        acronymIndex.update()
+        acronymIndex.lookupEvent("IEEE C1 2001")
+        startTime=time.time()
+        for i in range(1000):
+            result=acronymIndex.lookupEvent(f"IEEE C{i} {1990+i%30}")
+            self.assertTrue(len(result)>0)
+        elapsed=(time.time()-startTime)/1000
+        if self.debug:
+            print(f"lookupEvent took {elapsed*1000:.3f} ms")
+        self.assertTrue(elapsed<0.001)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
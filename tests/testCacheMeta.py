@@ -0,0 +1,114 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime, timedelta
+from lodstorage.sql import SQLDB
+from corpus.cachemeta import MetaTable, SourceMeta, RefreshPlanner
+from corpus.config import EventDataSourceConfig
+from corpus.event import Event, EventSeries, EventManager, EventSeriesManager, EventStorage
+from corpus.eventcorpus import EventCorpus, EventDataSource
+
+class TestCacheMeta(unittest.TestCase):
+    '''
+    test the freshness metadata and the refresh planner
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=SQLDB()
+        self.eventCorpus=EventCorpus()
+        for lookupId,ttl in [("static",None),("daily",86400),("fresh",86400)]:
+            sourceConfig=EventDataSourceConfig(lookupId=lookupId,name=lookupId,title=lookupId,url="http://example.org",tableSuffix=lookupId,ttl=ttl)
+            eventManager=EventManager(name=f"{lookupId}Events",sourceConfig=sourceConfig,clazz=Event)
+            eventSeriesManager=EventSeriesManager(name=f"{lookupId}EventSeries",sourceConfig=sourceConfig,clazz=EventSeries)
+            self.eventCorpus.addDataSource(EventDataSource(eventManager,eventSeriesManager,sourceConfig))
+
+    def testRecordLoad(self):
+        '''
+        test recording the freshness metadata
+        '''
+        SourceMeta.recordLoad(self.sqlDB,"static",10,2,"abc",1.5)
+        SourceMeta.recordLoad(self.sqlDB,"static",12,2,"abd",1.2)
+        metaData=SourceMeta.getMetaData(self.sqlDB)
+        self.assertEqual(1,len(metaData))
+        meta=metaData["static"]
+        self.assertEqual(12,meta["eventCount"])
+        self.assertEqual("abd",meta["fingerprint"])
+        self.assertTrue(isinstance(meta["loadTime"],datetime))
+
+    def testUpsertMany(self):
+        '''
+        test storing several records of a meta table at once
+        '''
+        table=MetaTable("testmeta","key",{"key":"TEXT","value":"INTEGER"})
+        table.upsertMany(self.sqlDB,[{"key":"a","value":1},{"key":"b"}])
+        table.upsertMany(self.sqlDB,[{"key":"b","value":2}])
+        self.assertEqual({"a":1,"b":2},{key:record["value"] for key,record in table.getLookup(self.sqlDB).items()})
+
+    def testRefreshPlanner(self):
+        '''
+        test planning the refresh of stale data sources
+        '''
+        now=datetime.now()
+        SourceMeta.recordLoad(self.sqlDB,"static",10,2,"abc",1.5,loadTime=now-timedelta(days=30))
+        SourceMeta.recordLoad(self.sqlDB,"daily",10,2,"abc",1.5,loadTime=now-timedelta(days=2))
+        SourceMeta.recordLoad(self.sqlDB,"fresh",10,2,"abc",1.5,loadTime=now-timedelta(hours=2))
+        planner=RefreshPlanner(self.eventCorpus,self.sqlDB,now=now,debug=self.debug)
+        self.assertEqual(["daily"],planner.plan(["all"]))
+        self.assertEqual([],planner.plan(["static","fresh"]))
+        # a changed fingerprint makes the source stale regardless of the time to live
+        self.eventCorpus.eventDataSources["static"].getFingerprint=lambda:"changed"
+        self.assertEqual(["static","daily"],planner.plan())
+        with self.assertRaises(Exception):
+            planner.plan(["unknown"])
+
+    def testFingerprints(self):
+        '''
+        test the fingerprint helpers
+        '''
+        self.assertIsNone(SourceMeta.fileFingerprint(["/nonexisting/file.json"]))
+        self.assertIsNotNone(SourceMeta.fileFingerprint([__file__]))
+        lod=[{"a":1,"b":datetime(2021,8,24)}]
+        self.assertEqual(SourceMeta.lodFingerprint(lod),SourceMeta.lodFingerprint([{"b":datetime(2021,8,24),"a":1}]))
+        self.assertNotEqual(SourceMeta.lodFingerprint(lod),SourceMeta.lodFingerprint([{"a":2}]))
+
+    def testCacheOnly(self):
+        '''
+        test loading from the cache only without configuring the access to the sources
+        '''
+        with tempfile.TemporaryDirectory() as tmpDir:
+            config=EventStorage.getStorageConfig()
+            config.cacheFile=os.path.join(tmpDir,"EventCorpus.db")
+            eventCorpus=EventCorpus()
+            for lookupId in ["cached","missing"]:
+                sourceConfig=EventDataSourceConfig(lookupId=lookupId,name=lookupId,title=lookupId,url="http://example.org",tableSuffix=lookupId)
+                # the base managers raise an exception on configure
+                eventManager=EventManager(name=f"{lookupId}Events",sourceConfig=sourceConfig,clazz=Event,config=config)
+                eventSeriesManager=EventSeriesManager(name=f"{lookupId}EventSeries",sourceConfig=sourceConfig,clazz=EventSeries,config=config)
+                eventCorpus.addDataSource(EventDataSource(eventManager,eventSeriesManager,sourceConfig))
+            cached=eventCorpus.eventDataSources["cached"]
+            cached.eventManager.storeLoD([{"eventId":"e1","acronym":"E 2021","inEventSeries":"E"}])
+            cached.eventSeriesManager.storeLoD([{"eventSeriesId":"s1","acronym":"E"}])
+            with self.assertRaises(Exception):
+                eventCorpus.loadAll()
+            sqlDB=cached.getSqlDB()
+            totalChanges=sqlDB.c.total_changes
+            self.assertEqual([],eventCorpus.loadAll(cacheOnly=True))
+            # nothing is written in cache only mode
+            self.assertEqual(totalChanges,sqlDB.c.total_changes)
+            self.assertFalse(SourceMeta.table.exists(sqlDB))
+            self.assertEqual("cached",cached.status)
+            self.assertEqual(1,len(cached.eventManager.getList()))
+            self.assertEqual("missing event_missing,eventseries_missing",eventCorpus.eventDataSources["missing"].status)
+            report={record["lookupId"]:record for record in eventCorpus.getStartupReport()}
+            self.assertEqual("cached",report["cached"]["status"])
+            self.assertTrue(report["missing"]["startupTime"]<1.0)
+            # fail fast if nothing is cached
+            del eventCorpus.eventDataSources["cached"]
+            with self.assertRaises(Exception):
+                eventCorpus.loadAll(cacheOnly=True)
+            EventStorage.closeConnections()
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from corpus.compactentity import CompactEntity
+from corpus.datasources.crossref import CrossrefEvent
+from corpus.event import EventManager, Event
+
+class TestCompactEntity(unittest.TestCase):
+    '''
+    test the slotted compact entities
+    '''
+
+    def setUp(self):
+        self.debug=False
+
+    def getLoD(self,size:int)->list:
+        '''
+        get crossref like event records
+        '''
+        lod=[]
+        for i in range(size):
+            lod.append({
+                "eventId":f"10.1145/{i}",
+                "acronym":f"C{i%1000} {1990+i%30}",
+                "title":f"Proceedings of C{i%1000}",
+                "year":1990+i%30,
+                "location":f"City {i%500}",
+                "source":"crossref"
+            })
+        return lod
+
+    def testCompactClass(self):
+        '''
+        test that compact entities behave like the entities of their class
+        '''
+        compactClass=CompactEntity.getCompactClass(CrossrefEvent)
+        self.assertIs(compactClass,CompactEntity.getCompactClass(CrossrefEvent))
+        self.assertIs(compactClass,CompactEntity.getCompactClass(compactClass))
+        self.assertTrue("title" in compactClass.compactFields)
+        event=compactClass()
+        event.fromDict({"eventId":"10.1145/1","title":"ISWC 2019","extra":1})
+        self.assertTrue(isinstance(event,CrossrefEvent))
+        self.assertTrue(isinstance(event,Event))
+        self.assertFalse(hasattr(event,"acronym"))
+        event.acronym="ISWC 2019"
+        self.assertEqual({"eventId":"10.1145/1","title":"ISWC 2019","acronym":"ISWC 2019","extra":1},event.asDict())
+        # the instance dict only holds the attributes without slot
+        self.assertEqual({"extra":1},vars(event))
+        event.title="ISWC 2020"
+        self.assertEqual("ISWC 2020",CompactEntity.getDict(event)["title"])
+        self.assertEqual({"acronym":"ISWC 2019","eventId":"10.1145/1","title":"ISWC 2020"},event.getRecord())
+        json=event.toJSON()
+        self.assertTrue('"extra": 1' in json)
+        self.assertTrue('"title": "ISWC 2020"' in json)
+
+    def testManager(self):
+        '''
+        test the compact mode of an event manager
+        '''
+        lod=self.getLoD(1000)
+        eventManager=EventManager(name="TestCompact",clazz=CrossrefEvent)
+        eventManager.setCompact()
+        events=eventManager.setListFromLoD(lod)
+        self.assertEqual("CompactCrossrefEvent",type(events[0]).__name__)
+        # the entity class of the manager is kept
+        self.assertIs(CrossrefEvent,eventManager.clazz)
+        self.assertEqual(lod,eventManager.getLoD())
+        self.assertTrue('"eventId": "10.1145/0"' in eventManager.toJSON())
+        # classes without samples get slots for the fields of the records
+        eventManager=EventManager(name="TestCompact",clazz=Event)
+        eventManager.setCompact()
+        events=eventManager.setListFromLoD(lod)
+        self.assertEqual(("eventId","acronym","title","year","location","source"),type(events[0]).compactFields)
+        eventManager.setCompact(False)
+        events=eventManager.setListFromLoD(lod)
+        self.assertIs(Event,type(events[0]))
+
+    def testMemoryReport(self):
+        '''
+        test the memory report per 100k events
+        '''
+        report=CompactEntity.getMemoryReport([CrossrefEvent],self.getLoD(100000))
+        if self.debug:
+            print(report)
+        for row in report:
+            self.assertTrue(row["after"]<row["before"])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -4,6 +4,8 @@ Created on 2021-07-26
 @author: wf
 '''
 import unittest
+import io
+import json
 from tests.testSMW import TestSMW
 from tests.testDblpXml import TestDblp
 from corpus.lookup import CorpusLookup
@@ -92,6 +94,27 @@ class TestCorpusLookup(DataSourceTest):
             self.assertTrue(f"{baseEntity} <|-- {baseEntity.lower()}_dblp" in plantUml)
             self.assertTrue(f"class {baseEntity} " in plantUml)
 
+    def testPerformQuery(self):
+        '''
+        test running named and SQL queries with the different output formats
+        '''
+        lookup=CorpusLookup(configure=self.configureCorpusLookup)
+        lookup.load()
+        self.assertTrue(lookup.isCachePopulated())
+        for outputFormat in ["csv","json","tabulate","mediawiki"]:
+            fileObj=io.StringIO()
+            count=lookup.performQuery("Count of Events grouped by source",outputFormat=outputFormat,fileObj=fileObj)
+            if self.debug:
+                print(fileObj.getvalue())
+            self.assertTrue(count>1)
+        fileObj=io.StringIO()
+        count=lookup.performQuery("select source,acronym from event where source='dblp' limit 5",outputFormat="json",fileObj=fileObj)
+        self.assertEqual(5,count)
+        for line in fileObj.getvalue().splitlines():
+            self.assertEqual("dblp",json.loads(line)["source"])
+        with self.assertRaises(Exception):
+            lookup.performQuery("select 1",outputFormat="xml")
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
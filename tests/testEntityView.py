@@ -0,0 +1,108 @@
+import unittest
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+from corpus.event import EventStorage, EventManager, Event
+from corpus.entityview import EntityView
+
+class TestEntityView(unittest.TestCase):
+    '''
+    test the lazy SQLite backed entity views
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.tmpDir=tempfile.TemporaryDirectory()
+        self.dbFile=os.path.join(self.tmpDir.name,"EventCorpus.db")
+
+    def tearDown(self):
+        EventStorage.closeConnections()
+        self.tmpDir.cleanup()
+
+    def createEventTable(self,size:int):
+        '''
+        create the Event table with the given number of events
+        '''
+        sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        sqlDB.execute("CREATE TABLE Event (eventId TEXT,acronym TEXT,title TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO Event VALUES (?,?,?,?)",[
+            (f"e{i}",f"C{i%1000} {2000+i%20}",f"Conference {i}",2000+i%20 if i%10 else None) for i in range(size)
+        ])
+        sqlDB.c.commit()
+
+    def testView(self):
+        '''
+        test iteration, len, rowid access and filters
+        '''
+        self.createEventTable(1000)
+        sqlDB=EventStorage.getSqlDB(readOnly=True,cacheFile=self.dbFile)
+        view=EntityView(sqlDB,"Event",Event,pageSize=64)
+        self.assertEqual(1000,len(view))
+        events=list(view)
+        self.assertEqual(1000,len(events))
+        self.assertTrue(isinstance(events[0],Event))
+        self.assertEqual(["e0","e1"],[event.eventId for event in events[:2]])
+        self.assertEqual("e41",view[42].eventId)
+        with self.assertRaises(IndexError):
+            view[1001]
+        filtered=view.filter(year=2019)
+        self.assertEqual(50,len(filtered))
+        self.assertEqual(set([2019]),set([event.year for event in filtered]))
+        self.assertEqual(100,len(view.filter(year=None)))
+        recent=view.filter(where="year>?",params=[2015]).filter(acronym="C19 2019")
+        self.assertEqual(["e19"],[event.eventId for event in recent])
+        with self.assertRaises(IndexError):
+            filtered[1]
+        self.assertEqual("e19",filtered[20].eventId)
+        with self.assertRaises(Exception):
+            view.filter(missing=1)
+        self.assertEqual({"eventId":"e0","acronym":"C0 2000","title":"Conference 0","year":None},view.getLoD()[0])
+
+    def testLazyManager(self):
+        '''
+        test restoring a manager in lazy mode
+        '''
+        self.createEventTable(1000)
+        eventManager=EventManager(name="TestLazy",clazz=Event)
+        self.assertEqual("Event",eventManager.tableName)
+        eventManager.setLazy()
+        events=eventManager.fromStore(cacheFile=self.dbFile)
+        self.assertTrue(isinstance(events,EntityView))
+        self.assertIs(events,eventManager.getList())
+        self.assertEqual(1000,len(eventManager.getList()))
+        fileObj=io.StringIO()
+        self.assertEqual(1000,eventManager.writeCsv(fileObj=fileObj))
+        eventManager.setLazy(False)
+        events=eventManager.fromStore(cacheFile=self.dbFile)
+        self.assertTrue(isinstance(eventManager.getList(),list))
+        self.assertEqual(1000,len(eventManager.getList()))
+
+    def testPerformance(self):
+        '''
+        test that iterating a large table keeps the memory flat
+        '''
+        size=100000
+        self.createEventTable(size)
+        eventManager=EventManager(name="TestLazy",clazz=Event)
+        eventManager.setLazy()
+        startTime=time.time()
+        events=eventManager.fromStore(cacheFile=self.dbFile)
+        count=len(events)
+        openTime=time.time()-startTime
+        tracemalloc.start()
+        iterated=0
+        for _event in events:
+            iterated+=1
+        _size,peak=tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if self.debug:
+            print(f"opening a view of {count} events took {openTime*1000:5.1f} ms - iterating needed {peak/1024/1024:5.1f} MB")
+        self.assertEqual(size,iterated)
+        self.assertTrue(openTime<0.5)
+        self.assertTrue(peak<5*1024*1024)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
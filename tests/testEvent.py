@@ -1,6 +1,12 @@
 from datetime import datetime
 from functools import partial
 from unittest import TestCase
+from lodstorage.sql import SQLDB
+from corpus.querystream import QueryStream
+import gzip
+import io
+import tempfile
+import time
 
 from corpus.event import EventManager, Event, EventSeries, EventSeriesManager
 
@@ -27,6 +33,49 @@ class TestEvent(TestCase):
             if getattr(event,self.eventManager.primaryKey) == "IDC 2009":
                 self.assertEqual(getattr(event,'yearStr'),'2010')
 
+    def testFromCsvInsert(self):
+        """
+        test that rows with an unknown primary key are ignored and rows of a csv without primary key column are inserted once
+        """
+        csvString='''"pageTitle","acronym","title","year"\r
+"WebSci 2019","WebSci 2019","Web Science 2019",2019\r
+"ISWC 2019","ISWC 2019","",2019\r
+"","ESWC 2019","",2019\r
+'''
+        stats=self.eventManager.fromCsv(csvString=csvString)
+        self.assertEqual({"updated":1,"inserted":0,"ignored":2},stats)
+        self.assertEqual(4,len(self.eventManager.getList()))
+        csvString='''"acronym","title","year"\r
+"ISWC 2019","",2019\r
+"ESWC 2019","",2019\r
+'''
+        stats=self.eventManager.fromCsv(csvString=csvString)
+        self.assertEqual({"updated":0,"inserted":2,"ignored":0},stats)
+        self.assertEqual(6,len(self.eventManager.getList()))
+        eventsByAcronym,_duplicates=self.eventManager.getLookup("acronym")
+        self.assertEqual("Web Science 2019",eventsByAcronym["WebSci 2019"].title)
+        self.assertIsNone(eventsByAcronym["ISWC 2019"].title)
+
+    def testFromCsvPerformance(self):
+        """
+        test importing a csv with 100k rows - half of them updates and half of them with an unknown primary key
+        """
+        debug=False
+        eventManager=EventManager(name="TestEventManager", clazz=Event, primaryKey='pageTitle')
+        eventManager.fromLoD([{"pageTitle":f"E{i}","acronym":f"E{i}","title":None,"year":2000+i%20} for i in range(50000)])
+        csvLines=['"pageTitle","acronym","title","year"\r\n']
+        for i in range(0,100000):
+            csvLines.append(f'"E{i}","E{i}","Event {i}",{2000+i%20}\r\n')
+        csvString="".join(csvLines)
+        startTime=time.time()
+        stats=eventManager.fromCsv(csvString=csvString)
+        elapsed=time.time()-startTime
+        if debug:
+            print(f"importing 100k csv rows took {elapsed:5.1f} s")
+        self.assertEqual({"updated":50000,"inserted":0,"ignored":50000},stats)
+        self.assertEqual(50000,len(eventManager.getList()))
+        self.assertEqual("Event 1",eventManager.getList()[1].title)
+
     def testAsCsv(self):
         '''
         test csv conversion of events
@@ -40,6 +89,27 @@ class TestEvent(TestCase):
         actualCsvString=self.eventManager.asCsv()
         self.assertEqual(expectedCsvString,actualCsvString)
 
+    def testWriteCsv(self):
+        '''
+        test streaming csv export to a gzip file and of SQL rows
+        '''
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filePath=f"{tmpDir}/events.csv.gz"
+            count=self.eventManager.writeCsv(filePath=filePath,chunkSize=3)
+            self.assertEqual(4,count)
+            with gzip.open(filePath,"rt",newline="") as csvFile:
+                self.assertEqual(self.eventManager.asCsv(),csvFile.read())
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_test (pageTitle TEXT,acronym TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?,?)",[(f"E{i}",f"E {2000+i}",2000+i) for i in range(10)])
+        queryStream=QueryStream(sqlDB,"SELECT * FROM event_test",batchSize=4)
+        csvStream=io.StringIO()
+        self.assertEqual(10,self.eventManager.writeCsv(fileObj=csvStream,entities=queryStream,chunkSize=4))
+        csvString=csvStream.getvalue()
+        # without samples the fields of the first row are used
+        self.assertTrue(csvString.startswith('"pageTitle","acronym","year"\r\n"E0","E 2000",2000\r\n'))
+        self.assertTrue(csvString.endswith('"E9","E 2009",2009\r\n'))
+
     def testAsCsvEventSelection(self):
         '''
         test csv export with event selection callback
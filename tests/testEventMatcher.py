@@ -0,0 +1,87 @@
+import unittest
+import time
+from lodstorage.sql import SQLDB
+from corpus.eventmatcher import EventMatcher, UnionFind
+from corpus.normalizer import EventNormalizer
+
+class TestEventMatcher(unittest.TestCase):
+    '''
+    test the cross source event matching
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=SQLDB()
+        self.sqlDB.execute("CREATE TABLE event_wikidata (eventId TEXT,acronym TEXT,title TEXT,year INTEGER,startDate DATE,city TEXT,dblpConferenceId TEXT,wikiCfpId TEXT)")
+        self.sqlDB.execute("CREATE TABLE event_dblp (eventId TEXT,acronym TEXT,title TEXT,year INTEGER)")
+        self.sqlDB.execute("CREATE TABLE event_wikicfp (eventId TEXT,acronym TEXT,title TEXT,year INTEGER,startDate DATE,city TEXT)")
+        self.sqlDB.execute("CREATE TABLE event_crossref (eventId TEXT,acronym TEXT,title TEXT,year INTEGER)")
+        self.sqlDB.c.executemany("INSERT INTO event_wikidata VALUES (?,?,?,?,?,?,?,?)",[
+            ("Q1","ISWC 2019","International Semantic Web Conference 2019",2019,"2019-10-26","Auckland","conf/semweb/2019-1",None),
+            ("Q2","ESWC 2019","Extended Semantic Web Conference 2019",2019,"2019-06-02","Portoroz",None,"83567")
+        ])
+        self.sqlDB.c.executemany("INSERT INTO event_dblp VALUES (?,?,?,?)",[
+            ("conf/semweb/2019-1","The Semantic Web - ISWC 2019","The Semantic Web - ISWC 2019 - 18th International Semantic Web Conference",2019)
+        ])
+        self.sqlDB.c.executemany("INSERT INTO event_wikicfp VALUES (?,?,?,?,?,?)",[
+            ("83567","ESWC 2019","ESWC 2019 : Extended Semantic Web Conference",2019,"2019-06-02","Portoroz"),
+            ("90000","ISWC 2019","ISWC 2019 : International Symposium on Wearable Computers",2019,"2019-09-09","London")
+        ])
+        self.sqlDB.c.executemany("INSERT INTO event_crossref VALUES (?,?,?,?)",[
+            ("10.1/iswc","ISWC '19","Proceedings of the International Semantic Web Conference",2019)
+        ])
+        self.sqlDB.c.commit()
+
+    def testUnionFind(self):
+        '''
+        test the disjoint sets
+        '''
+        unionFind=UnionFind(5)
+        unionFind.union(3,4)
+        unionFind.union(4,1)
+        self.assertEqual(1,unionFind.find(3))
+        self.assertNotEqual(unionFind.find(0),unionFind.find(4))
+
+    def testAcronymStem(self):
+        '''
+        test the acronym normalization used for blocking
+        '''
+        for acronym,expected in [("ISWC 2019","iswc"),("ISWC '19","iswc"),("SIGMIS-CPR 2006","sigmis cpr"),("2019",None),(None,None)]:
+            self.assertEqual(expected,EventNormalizer.getAcronymStem(acronym))
+
+    def testMatch(self):
+        '''
+        test matching and clustering the events
+        '''
+        stats=EventMatcher(self.sqlDB,debug=self.debug).run()
+        self.assertEqual(6,stats["events"])
+        clusters={}
+        for record in self.sqlDB.query("SELECT * FROM event_cluster"):
+            clusters[f"{record['sourceTable']}:{record['eventId']}"]=record["canonicalId"]
+        # linked by the dblp id
+        self.assertEqual("event_wikidata:Q1",clusters["event_dblp:conf/semweb/2019-1"])
+        # linked by the wikicfp id
+        self.assertEqual("event_wikidata:Q2",clusters["event_wikicfp:83567"])
+        # linked by acronym, year and title
+        self.assertEqual("event_wikidata:Q1",clusters["event_crossref:10.1/iswc"])
+        # same acronym and year but different title, date and location
+        self.assertEqual("event_wikicfp:90000",clusters["event_wikicfp:90000"])
+
+    def testPerformance(self):
+        '''
+        test that blocking scales to a large number of events
+        '''
+        sqlDB=SQLDB()
+        for source in ["dblp","wikicfp","crossref"]:
+            sqlDB.execute(f"CREATE TABLE event_{source} (eventId TEXT,acronym TEXT,title TEXT,year INTEGER)")
+            sqlDB.c.executemany(f"INSERT INTO event_{source} VALUES (?,?,?,?)",[(f"{source}{i}",f"C{i%5000} {1990+i%30}",f"Conference on Topic {i%5000}",1990+i%30) for i in range(30000)])
+        startTime=time.time()
+        stats=EventMatcher(sqlDB,debug=self.debug).run()
+        self.assertEqual(90000,stats["events"])
+        # there are 15000 distinct acronym/year combinations
+        self.assertEqual(15000,stats["clusters"])
+        self.assertTrue(time.time()-startTime<60)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,218 @@
+import unittest
+import os
+import tempfile
+from lodstorage.sql import SQLDB
+from corpus.cachemeta import TableMeta
+from corpus.config import EventDataSourceConfig
+from corpus.event import EventStorage, EventManager, Event, EventSeriesManager, EventSeries
+from corpus.eventcorpus import EventDataSource
+from corpus.serieslink import EventSeriesLink
+
+class TestEventStorage(unittest.TestCase):
+    '''
+    test the common storage aspects of events and event series
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=EventStorageTestDB.create()
+
+    def testCommonViewDDLs(self):
+        '''
+        test the schema driven common view generation
+        '''
+        viewDDLs=EventStorage.getCommonViewDDLs(sqlDB=self.sqlDB)
+        if self.debug:
+            for viewDDL in viewDDLs:
+                print(viewDDL)
+        self.assertEqual(2,len(viewDDLs))
+        # event_beta has no startDate column
+        self.assertTrue("NULL AS startDate FROM event_beta" in viewDDLs[0])
+        self.assertTrue(viewDDLs[0].startswith("CREATE VIEW IF NOT EXISTS event AS\n  SELECT eventId,title,url"))
+
+    def testCreateViews(self):
+        '''
+        test that the views are only recreated when a source table schema changes
+        '''
+        sqlDB=self.sqlDB
+        EventStorage.createViews(sqlDB=sqlDB)
+        self.assertEqual(5,sqlDB.query("SELECT count(*) AS count FROM event")[0]["count"])
+        # source rows that are equal in all columns are kept
+        self.assertEqual(5,sqlDB.query("SELECT count(*) AS count FROM eventseries")[0]["count"])
+        viewMeta=EventStorage.viewMetaTable.getLookup(sqlDB)
+        schemaHash=viewMeta["event"]["schemaHash"]
+        EventStorage.createViews(sqlDB=sqlDB)
+        self.assertEqual(schemaHash,EventStorage.viewMetaTable.getLookup(sqlDB)["event"]["schemaHash"])
+        sqlDB.execute("ALTER TABLE event_beta ADD COLUMN homepage TEXT")
+        EventStorage.createViews(sqlDB=sqlDB)
+        self.assertNotEqual(schemaHash,EventStorage.viewMetaTable.getLookup(sqlDB)["event"]["schemaHash"])
+        columns=[columnInfo["name"] for columnInfo in sqlDB.query("pragma table_info('event')")]
+        self.assertTrue("homepage" in columns)
+        self.assertTrue("startDate" in columns)
+
+    def testMaterializeViews(self):
+        '''
+        test materializing the common views as indexed tables
+        '''
+        sqlDB=self.sqlDB
+        self.assertFalse(EventStorage.isMaterialized(sqlDB))
+        EventStorage.materializeViews(sqlDB=sqlDB,profile=self.debug)
+        self.assertTrue(EventStorage.isMaterialized(sqlDB))
+        for viewName in ["event","eventseries"]:
+            kind=sqlDB.query("SELECT type FROM sqlite_master WHERE name=?",(viewName,))
+            self.assertEqual("table",kind[0]["type"])
+        self.assertEqual(5,sqlDB.query("SELECT count(*) AS count FROM event")[0]["count"])
+        self.assertEqual(5,sqlDB.query("SELECT count(*) AS count FROM eventseries")[0]["count"])
+        plan=sqlDB.query("EXPLAIN QUERY PLAN SELECT * FROM event WHERE acronym='ISWC 2019'")
+        self.assertTrue("idx_event_acronym" in plan[0]["detail"])
+        # incremental refresh of a single source
+        sqlDB.execute("DELETE FROM event_beta WHERE eventId='b2'")
+        EventStorage.materializeViews(refreshTables=["event_beta"],sqlDB=sqlDB)
+        counts={record["sourceTable"]:record["count"] for record in sqlDB.query("SELECT sourceTable,count(*) AS count FROM event GROUP BY sourceTable")}
+        self.assertEqual({"event_alpha":3,"event_beta":1},counts)
+        # source tables changed since they were materialized are refreshed as well
+        sqlDB.execute("DELETE FROM event_alpha WHERE eventId='a3'")
+        EventStorage.materializeViews(sqlDB=sqlDB)
+        self.assertEqual(3,sqlDB.query("SELECT count(*) AS count FROM event")[0]["count"])
+        sqlDB.execute("INSERT INTO event_alpha (eventId,acronym) VALUES ('a3','ISWC 2020')")
+        TableMeta.recordChange(sqlDB,"event_alpha")
+        EventStorage.materializeViews(sqlDB=sqlDB)
+        self.assertEqual(4,sqlDB.query("SELECT count(*) AS count FROM event")[0]["count"])
+        # schema changes lead to a rebuild
+        sqlDB.execute("ALTER TABLE event_alpha ADD COLUMN homepage TEXT")
+        EventStorage.materializeViews(sqlDB=sqlDB)
+        columns=[columnInfo["name"] for columnInfo in sqlDB.query("pragma table_info('event')")]
+        self.assertEqual("sourceTable",columns[-1])
+        self.assertTrue("homepage" in columns)
+        self.assertEqual(4,sqlDB.query("SELECT count(*) AS count FROM event")[0]["count"])
+        # dropped sources are removed
+        sqlDB.execute("DROP TABLE event_beta")
+        EventStorage.materializeViews(sqlDB=sqlDB)
+        self.assertEqual(3,sqlDB.query("SELECT count(*) AS count FROM event")[0]["count"])
+
+    def testInstanceCounts(self):
+        '''
+        test the instance counts maintained by the write paths
+        '''
+        with tempfile.TemporaryDirectory() as tmpDir:
+            config=EventStorage.getStorageConfig()
+            config.cacheFile=os.path.join(tmpDir,"EventCorpus.db")
+            em=EventManager(name="TestEvents",clazz=Event,config=config)
+            self.assertFalse(em.isCached())
+            lod=[{"eventId":f"e{i}","acronym":f"E {i}"} for i in range(150)]
+            em.storeLoD(lod)
+            sqlDB=EventStorage.getSqlDB(cacheFile=config.cacheFile)
+            self.assertEqual(150,TableMeta.getCounts(sqlDB)[em.tableName])
+            self.assertTrue(em.isCached())
+            # the recorded count is used instead of counting
+            TableMeta.recordCount(sqlDB,em.tableName,42)
+            self.assertFalse(em.isCached())
+            # changes invalidate the recorded count
+            TableMeta.recordChange(sqlDB,em.tableName)
+            self.assertFalse(em.tableName in TableMeta.getCounts(sqlDB))
+            self.assertTrue(em.isCached())
+            EventStorage.closeConnections()
+
+    def testTableListReadOnly(self):
+        '''
+        test that listing the tables does not write
+        '''
+        sqlDB=self.sqlDB
+        tableList=EventStorage.getTableList(sqlDB=sqlDB)
+        counts={table["name"]:table["instances"] for table in tableList}
+        self.assertEqual(3,counts["event_alpha"])
+        self.assertFalse(TableMeta.table.exists(sqlDB))
+        self.assertFalse(sqlDB.c.in_transaction)
+        # materializing invalidates the count of the materialized tables
+        TableMeta.recordCount(sqlDB,"event",42)
+        EventStorage.materializeViews(sqlDB=sqlDB)
+        tableList=EventStorage.getTableList(withAuxiliaryTables=True,sqlDB=sqlDB)
+        counts={table["name"]:table["instances"] for table in tableList}
+        self.assertEqual(5,counts["event"])
+
+    def testEventSeriesLink(self):
+        '''
+        test linking events and series via the indexed link table
+        '''
+        with tempfile.TemporaryDirectory() as tmpDir:
+            config=EventStorage.getStorageConfig()
+            config.cacheFile=os.path.join(tmpDir,"EventCorpus.db")
+            sourceConfig=EventDataSourceConfig(lookupId="test",name="test",title="test",url="http://example.org",tableSuffix="test",seriesForeignKey="series",seriesKey="eventSeriesId")
+            eventManager=EventManager(name="TestEvents",sourceConfig=sourceConfig,clazz=Event,config=config)
+            eventSeriesManager=EventSeriesManager(name="TestEventSeries",sourceConfig=sourceConfig,clazz=EventSeries,config=config)
+            dataSource=EventDataSource(eventManager,eventSeriesManager,sourceConfig)
+            eventManager.storeLoD([{"eventId":f"e{i}","acronym":f"S{i%10} {2000+i}","series":f"conf/s{i%10}" if i%20!=19 else None} for i in range(1000)])
+            eventSeriesManager.storeLoD([{"eventSeriesId":f"conf/s{i}","acronym":f"S{i}"} for i in range(10)])
+            dataSource.load(cacheOnly=True)
+            sqlDB=dataSource.getSqlDB()
+            # nothing is written in cache only mode
+            self.assertFalse(EventSeriesLink.hasLinks(sqlDB,"test"))
+            self.assertEqual(950,dataSource.linkSeriesAndEvents())
+            self.assertEqual(950,sqlDB.query("SELECT count(*) AS count FROM event_series_link")[0]["count"])
+            # the existing links are kept
+            self.assertEqual(-1,dataSource.linkSeriesAndEvents())
+            for series in ["S3","conf/s3"]:
+                events=eventManager.getEventsInSeries(series)
+                self.assertEqual(100,len(events))
+                self.assertTrue(isinstance(events[0],Event))
+            self.assertEqual(50,len(eventManager.getEventsInSeries("S9")))
+            self.assertIsNone(eventManager.getEventsInSeries("unknown"))
+            plan=sqlDB.query(f"EXPLAIN QUERY PLAN SELECT eventId FROM {EventSeriesLink.tableName} WHERE source='test' AND seriesId='conf/s3'")
+            self.assertTrue("INDEX" in plan[0]["detail"])
+            self.assertFalse(EventSeriesLink.tableName in EventStorage.getSourceTableSchemas("event",sqlDB))
+            EventStorage.closeConnections()
+
+    def testEventsInSeriesFallback(self):
+        '''
+        test the in memory lookups for data sources that have not been linked and the zero link case
+        '''
+        with tempfile.TemporaryDirectory() as tmpDir:
+            config=EventStorage.getStorageConfig()
+            config.cacheFile=os.path.join(tmpDir,"EventCorpus.db")
+            sourceConfig=EventDataSourceConfig(lookupId="test",name="test",title="test",url="http://example.org",tableSuffix="test",seriesForeignKey="inEventSeries",seriesKey="acronym")
+            eventManager=EventManager(name="TestEvents",sourceConfig=sourceConfig,clazz=Event,config=config)
+            eventSeriesManager=EventSeriesManager(name="TestEventSeries",sourceConfig=sourceConfig,clazz=EventSeries,config=config)
+            dataSource=EventDataSource(eventManager,eventSeriesManager,sourceConfig)
+            eventManager.storeLoD([{"eventId":f"e{i}","acronym":f"S{i%2} {2000+i}","inEventSeries":f"S{i%2}"} for i in range(10)])
+            eventSeriesManager.storeLoD([{"acronym":f"S{i}"} for i in range(2)])
+            # cache only mode does not link
+            dataSource.load(cacheOnly=True)
+            self.assertFalse(dataSource.isLinked())
+            self.assertEqual(5,len(eventManager.getEventsInSeries("S1")))
+            self.assertIsNone(eventManager.getEventsInSeries("S2"))
+            # a data source without links is linked only once
+            sourceConfig.seriesForeignKey="unknownColumn"
+            self.assertEqual(0,dataSource.linkSeriesAndEvents())
+            self.assertTrue(dataSource.isLinked())
+            self.assertEqual(-1,dataSource.linkSeriesAndEvents())
+            EventStorage.closeConnections()
+
+class EventStorageTestDB:
+    '''
+    a small in memory database with the structure of the EventCorpus.db
+    '''
+
+    @staticmethod
+    def create()->SQLDB:
+        '''
+        create an in memory database with two sources
+        '''
+        sqlDB=SQLDB()
+        columns="eventId TEXT,title TEXT,url TEXT,city TEXT,country TEXT,region TEXT,countryIso TEXT,regionIso TEXT,acronym TEXT,source TEXT,year INTEGER"
+        for source,events in [
+            ("alpha",[("a1","ISWC 2019",2019,"Auckland"),("a2","ESWC 2019",2019,"Portoroz"),("a3","ISWC 2020",2020,None)]),
+            ("beta",[("b1","ISWC 2019",2019,"Auckland"),("b2","AAAI 2020",2020,"New York")])
+        ]:
+            # only alpha has dates
+            extraColumns=",startDate DATE" if source=="alpha" else ""
+            sqlDB.execute(f"CREATE TABLE event_{source} ({columns}{extraColumns})")
+            sqlDB.execute(f"CREATE TABLE eventseries_{source} (source TEXT,acronym TEXT)")
+            for eventId,acronym,year,city in events:
+                sqlDB.c.execute(f"INSERT INTO event_{source} (eventId,title,acronym,year,city,source) VALUES (?,?,?,?,?,?)",(eventId,acronym,acronym,year,city,source))
+                sqlDB.c.execute(f"INSERT INTO eventseries_{source} (source,acronym) VALUES (?,?)",(source,acronym.split(" ")[0]))
+        sqlDB.c.commit()
+        return sqlDB
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from corpus.geocoder import AliasIndexGeocoder
+from corpus.config import GeocoderConfig
+
+class TestGeocoder(unittest.TestCase):
+    '''
+    test the geocoder backends
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.cityRecords=[
+            {"name":"Santa Barbara","wikidataid":"Q159288","pop":"88665","regionName":"California","regionIso":"US-CA","countryName":"United States of America","countryIso":"US"},
+            {"name":"Santa Barbara","wikidataid":"Q1018653","pop":"12000","regionName":"Minas Gerais","regionIso":"BR-MG","countryName":"Brazil","countryIso":"BR"},
+            {"name":"Beijing","wikidataid":"Q956","pop":21893095,"regionName":"Beijing","regionIso":"CN-BJ","countryName":"China","countryIso":"CN"},
+            {"name":"Nowhere","wikidataid":None}
+        ]
+
+    def testAliasIndexGeocoder(self):
+        '''
+        test geocoding with the offline alias index
+        '''
+        geocoder=AliasIndexGeocoder()
+        with self.assertRaises(Exception):
+            geocoder.geocode("Beijing")
+        aliasCount=geocoder.build(self.cityRecords)
+        if self.debug:
+            print(f"{aliasCount} aliases")
+        texts=["Santa Barbara, CA","Santa Barbara","Santa Barbara, Brazil","Beijing, China","Beijing China",None]
+        wikidataIds=geocoder.geocodeMany(texts)
+        self.assertEqual({
+            "Santa Barbara, CA":"Q159288",
+            # the name of several cities is not resolved to the most populous one
+            "Santa Barbara":None,
+            "Santa Barbara, Brazil":"Q1018653",
+            "Beijing, China":"Q956",
+            "Beijing China":"Q956",
+            None:None
+        },wikidataIds)
+        self.assertEqual("Q956",geocoder.geocode(" beijing ,CN"))
+        # rebuilding replaces the aliases
+        geocoder.build(self.cityRecords[2:])
+        self.assertIsNone(geocoder.geocode("Santa Barbara, CA"))
+
+    def testGeocoderConfig(self):
+        '''
+        test the configuration of the geocoder backend
+        '''
+        geocoderConfig=GeocoderConfig()
+        self.assertEqual("nominatim",geocoderConfig.backend)
+        self.assertIsNone(geocoderConfig.endpoint)
+        geocoderConfig=GeocoderConfig(backend="offline")
+        self.assertEqual("offline",geocoderConfig.backend)
+        with self.assertRaises(Exception):
+            GeocoderConfig(backend="google")
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
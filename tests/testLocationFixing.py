@@ -6,15 +6,39 @@ Created on 2021-08-06
 import unittest
 from tests.datasourcetoolbox import DataSourceTest
 from corpus.lookup import CorpusLookup
-from corpus.location import LocationLookup
+from corpus.location import LocationLookup, NominatimGeocoder
+from corpus.geocoder import Geocoder, AliasIndexGeocoder
+from corpus.config import GeocoderConfig
+from corpus.locationindex import LocationAliasIndex
+from corpus.locationnormalizer import LocationNormalizer
 from collections import Counter
 from geograpy.locator import City,Locator
 from lodstorage.query import Query
+from lodstorage.sql import SQLDB
 from lodstorage.tabulateCounter import TabulateCounter
 from corpus.event import EventStorage
 import getpass
 import os
 
+class StubGeocoder(Geocoder):
+    '''
+    geocoder with fixed results instead of a Nominatim service
+    '''
+
+    def __init__(self,wikidataIds:dict):
+        '''
+        constructor
+
+        Args:
+            wikidataIds(dict): map of location texts to wikidata ids
+        '''
+        self.wikidataIds=wikidataIds
+        self.queries=[]
+
+    def geocode(self,locationText:str)->str:
+        self.queries.append(locationText)
+        return self.wikidataIds.get(locationText)
+
 class TestLocationFixing(DataSourceTest):
     '''
     test fixing Locations from different Datasources
@@ -93,6 +117,120 @@ limit 20"""),
             print(f"locationLooup failed for {failures}")
         self.assertEqual(0,len(failures))
 
+    def testLookupMany(self):
+        '''
+        test looking up many location texts with the resolution cache
+        '''
+        geocoder=StubGeocoder({"Beijing, China":"Q956","Brno":"Q14960"})
+        locationLookup=LocationLookup(sqlDB=SQLDB(),geocoder=geocoder)
+        locationTexts=["Beijing, China","Brno","Online","Beijing, China",None,"Brno"]
+        resolved=locationLookup.lookupMany(locationTexts)
+        if self.debug:
+            print(resolved)
+        self.assertEqual(["Beijing, China","Brno","Online"],list(resolved.keys()))
+        self.assertEqual("Q956",resolved["Beijing, China"].wikidataid)
+        self.assertIsNone(resolved["Online"])
+        self.assertEqual({"distinct":3,"hits":0,"misses":3},locationLookup.cacheStats)
+        queryCount=len(geocoder.queries)
+        # the second run only has cache hits
+        resolved=locationLookup.lookupMany(locationTexts)
+        self.assertEqual({"distinct":3,"hits":3,"misses":0},locationLookup.cacheStats)
+        self.assertEqual("Q14960",resolved["Brno"].wikidataid)
+        # the cache hits are not geocoded again
+        self.assertEqual(queryCount,len(geocoder.queries))
+        # unresolved texts are resolved again after the retry age
+        locationLookup.lookupMany(["Nowhere Land"])
+        locationLookup.lookupMany(["Nowhere Land"])
+        self.assertEqual({"distinct":1,"hits":1,"misses":0},locationLookup.cacheStats)
+        locationLookup.retryAge=0
+        locationLookup.lookupMany(["Nowhere Land","Brno"])
+        self.assertEqual({"distinct":2,"hits":1,"misses":1},locationLookup.cacheStats)
+        self.assertEqual("Nowhere Land",geocoder.queries[-1])
+
+    def testLookupManyNominatim(self):
+        '''
+        test looking up many location texts with the public Nominatim service
+        '''
+        if self.inCI():
+            self.skipTest("the public Nominatim service is rate limited")
+        locationLookup=LocationLookup(sqlDB=SQLDB())
+        resolved=locationLookup.lookupMany(["Beijing, China","Brno","Online"])
+        if self.debug:
+            print(resolved)
+        self.assertEqual("Q956",resolved["Beijing, China"].wikidataid)
+        self.assertIsNone(resolved["Online"])
+        
+    def testOfflineGeocoder(self):
+        '''
+        test the location lookup with the alias index instead of the Nominatim service
+        '''
+        sqlDB=SQLDB()
+        geocoder=AliasIndexGeocoder()
+        aliasCount=geocoder.build(LocationAliasIndex.getCityRecords(self.locationLookup.locationContext))
+        if self.debug:
+            print(f"{aliasCount} aliases")
+        locationLookup=LocationLookup(sqlDB=sqlDB,geocoder=geocoder,aliasIndex=geocoder.aliasIndex)
+        resolved=locationLookup.lookupMany(["Beijing, China","Brno"])
+        self.assertEqual(["Q956","Q14960"],[location.wikidataid for location in resolved.values()])
+
+    def testGeocoderConfig(self):
+        '''
+        test selecting the geocoder backend of the location lookup
+        '''
+        locationLookup=LocationLookup(sqlDB=SQLDB(),geocoderConfig=GeocoderConfig(backend="offline"))
+        self.assertIsInstance(locationLookup.geocoder,AliasIndexGeocoder)
+        # the offline geocoder uses the alias index of the lookup
+        self.assertIs(locationLookup.aliasIndex,locationLookup.geocoder.aliasIndex)
+        self.assertEqual("Q956",locationLookup.geocoder.geocode("Beijing, China"))
+        geocoder=locationLookup.getGeocoder(GeocoderConfig(endpoint="http://localhost/nominatim/",maxWorkers=4))
+        self.assertIsInstance(geocoder,NominatimGeocoder)
+        self.assertEqual("http://localhost/nominatim/",geocoder.endpoint)
+        self.assertEqual(4,geocoder.maxWorkers)
+        self.assertEqual(1,locationLookup.getGeocoder().maxWorkers)
+
+    def testGeocodingFailures(self):
+        '''
+        test that failing geocoder queries only affect the texts they were made for
+        '''
+        class FailingGeocoder(NominatimGeocoder):
+            def geocode(self,locationText:str)->str:
+                if locationText=="Brno":
+                    raise Exception("timed out")
+                return "Q956"
+        geocoder=FailingGeocoder(endpoint="http://localhost/nominatim/",maxWorkers=2)
+        self.assertEqual({"Beijing, China":"Q956"},geocoder.geocodeMany(["Beijing, China","Brno"]))
+        # without aliases so that the geograpy result needs to be cross checked
+        locationLookup=LocationLookup(sqlDB=SQLDB(),geocoder=geocoder,aliasIndex=LocationAliasIndex())
+        location,method=locationLookup.resolve("Brno")
+        self.assertEqual("unchecked",method)
+        self.assertEqual("Q14960",location.wikidataid)
+        
+    def testLocationNormalizer(self):
+        '''
+        test normalizing the locations of event tables
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_confref (eventId TEXT,city TEXT,country TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_confref VALUES (?,?,?)",[("c1","Beijing","China"),("c2","Brno","Czech Republic"),("c3",None,None)])
+        sqlDB.execute("CREATE TABLE event_wikicfp (eventId TEXT,locality TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_wikicfp VALUES (?,?)",[("w1","Beijing, China"),("w2","Online")])
+        sqlDB.c.commit()
+        geocoder=AliasIndexGeocoder(self.locationLookup.aliasIndex)
+        locationLookup=LocationLookup(sqlDB=sqlDB,geocoder=geocoder,aliasIndex=geocoder.aliasIndex)
+        normalizer=LocationNormalizer(sqlDB,locationLookup=locationLookup,debug=self.debug)
+        stats=normalizer.normalize()
+        self.assertEqual(["event_wikicfp","event_confref"],list(stats.keys()))
+        self.assertEqual(2,stats["event_confref"]["updated"])
+        self.assertEqual(1,stats["event_wikicfp"]["updated"])
+        records=sqlDB.query("SELECT eventId,locationText,city,cityWikidataid,countryIso FROM event_confref ORDER BY eventId")
+        self.assertEqual({"eventId":"c1","locationText":"Beijing, China","city":"Beijing","cityWikidataid":"Q956","countryIso":"CN"},records[0])
+        self.assertEqual("Q14960",records[1]["cityWikidataid"])
+        self.assertIsNone(records[2]["locationText"])
+        # the second run only looks at the events that are not normalized yet
+        stats=normalizer.normalize()
+        self.assertEqual({"distinct":1,"hits":1,"misses":0,"updated":0},stats["event_wikicfp"])
+        self.assertEqual(0,stats["event_confref"]["distinct"])
+
     def testCrossRefParts(self):
         '''
         test CrossRef locations
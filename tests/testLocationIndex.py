@@ -0,0 +1,126 @@
+import unittest
+import os
+import tempfile
+import time
+from corpus.locationindex import LocationAliasIndex
+
+class TestLocationIndex(unittest.TestCase):
+    '''
+    test the location alias index
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.cityRecords=[
+            {"name":"Phoenix","wikidataid":"Q16556","pop":1608139,"regionName":"Arizona","regionIso":"US-AZ","countryName":"United States of America","countryIso":"US"},
+            {"name":"Santa Barbara","wikidataid":"Q159288","pop":88665,"regionName":"California","regionIso":"US-CA","countryName":"United States of America","countryIso":"US"},
+            {"name":"Santa Barbara","wikidataid":"Q1018653","pop":12000,"regionName":"Minas Gerais","regionIso":"BR-MG","countryName":"Brazil","countryIso":"BR"},
+            {"name":"Montreal","wikidataid":"Q340","pop":1762949,"regionName":"Quebec","regionIso":"CA-QC","countryName":"Canada","countryIso":"CA"},
+            {"name":"Saint Petersburg","wikidataid":"Q656","pop":5383890,"regionName":"Saint Petersburg","regionIso":"RU-SPE","countryName":"Russia","countryIso":"RU"},
+            {"name":"Paris","wikidataid":"Q90","pop":2165423,"regionName":"Île-de-France","regionIso":"FR-IDF","countryName":"France","countryIso":"FR"},
+            {"name":"Paris","wikidataid":"Q830149","pop":24171,"regionName":"Texas","regionIso":"US-TX","countryName":"United States of America","countryIso":"US"},
+            {"name":"Cambridge","wikidataid":"Q350","pop":145700,"regionName":"England","regionIso":"GB-ENG","countryName":"United Kingdom","countryIso":"GB"},
+            {"name":"Cambridge","wikidataid":"Q49111","pop":118403,"regionName":"Massachusetts","regionIso":"US-MA","countryName":"United States of America","countryIso":"US"}
+        ]
+        self.curated={"Online":None,"Not Known":None,"Cambridge, MA":"Q49111"}
+
+    def getIndex(self)->LocationAliasIndex:
+        index=LocationAliasIndex()
+        index.build(self.cityRecords,self.curated)
+        return index
+
+    def testNormalize(self):
+        '''
+        test the normalization of location texts
+        '''
+        index=self.getIndex()
+        for text,expected in [
+            ("Phoenix, Arizona, USA","phoenix az us"),
+            ("Montrèal, Québec","montreal qc"),
+            ("St. Petersburg","saint petersburg"),
+            ("Amsterdam, The Netherlands","amsterdam nl")
+        ]:
+            self.assertEqual(expected,index.normalize(text),text)
+        self.assertEqual(index.getKey("USA Phoenix AZ"),index.getKey("Phoenix, Arizona, United States"))
+
+    def testLookup(self):
+        '''
+        test exact and prefix lookups
+        '''
+        index=self.getIndex()
+        for text,expected in [
+            ("Phoenix, AZ",(True,"Q16556")),
+            ("Phoenix AZ USA",(True,"Q16556")),
+            ("Phoenix, USA",(True,"Q16556")),
+            ("USA, Phoenix",(True,"Q16556")),
+            ("Santa Barbara, CA",(True,"Q159288")),
+            ("Santa Barbara, Brazil",(True,"Q1018653")),
+            ("Montrèal, Canada",(True,"Q340")),
+            ("Saint-Petersburg, Russia",(True,"Q656")),
+            ("Cambridge, MA",(True,"Q49111")),
+            ("Online",(True,None)),
+            ("Atlantis",(False,None))
+        ]:
+            self.assertEqual(expected,index.lookup(text),text)
+        prefixResult=index.lookupPrefix("Santa Bar")
+        if self.debug:
+            print(prefixResult)
+        self.assertEqual(set(["Q159288","Q1018653"]),set([wikidataid for _alias,wikidataid in prefixResult]))
+        self.assertEqual([("phoenix az","Q16556")],index.lookupPrefix("Phoenix, AZ",limit=1))
+        self.assertEqual(["saint petersburg","saint petersburg ru"],[alias for alias,_wikidataid in index.lookupPrefix("St. Peters")])
+        self.assertEqual([],index.lookupPrefix("atl"))
+
+    def testAmbiguousNames(self):
+        '''
+        test that city names shared by several cities are no aliases of the most populous one
+        '''
+        index=self.getIndex()
+        for text,expected in [
+            ("Paris",(False,None)),
+            ("Cambridge",(False,None)),
+            ("Santa Barbara",(False,None)),
+            ("Paris, France",(True,"Q90")),
+            ("Paris, TX",(True,"Q830149")),
+            ("Cambridge, UK",(True,"Q350")),
+            ("Cambridge, Massachusetts",(True,"Q49111")),
+            ("Montreal",(True,"Q340"))
+        ]:
+            self.assertEqual(expected,index.lookup(text),text)
+        # curated entries may still resolve an ambiguous name
+        self.curated["Paris"]="Q90"
+        self.assertEqual((True,"Q90"),self.getIndex().lookup("Paris"))
+
+    def testStore(self):
+        '''
+        test storing and loading the index
+        '''
+        index=self.getIndex()
+        with tempfile.TemporaryDirectory() as tmpDir:
+            indexFile=os.path.join(tmpDir,"locationaliases.pickle")
+            self.assertIsNone(LocationAliasIndex.load(indexFile))
+            index.store(indexFile)
+            startTime=time.time()
+            loaded=LocationAliasIndex.load(indexFile)
+            loadTime=time.time()-startTime
+            if self.debug:
+                print(f"loading the index took {loadTime*1000:5.1f} ms")
+            self.assertEqual(index.keys,loaded.keys)
+            self.assertEqual((True,"Q340"),loaded.lookup("Montreal, QC"))
+            self.assertEqual(index.lookupPrefix("s"),loaded.lookupPrefix("s"))
+            # an index built from another city database or other curated entries is not loaded
+            cityDataFile=os.path.join(tmpDir,"locations.db")
+            with open(cityDataFile,"w") as cityData:
+                cityData.write("cities")
+            fingerprint=LocationAliasIndex.getFingerprint(cityDataFile,self.curated)
+            index.build(self.cityRecords,self.curated,fingerprint)
+            index.store(indexFile)
+            self.assertEqual(fingerprint,LocationAliasIndex.load(indexFile,fingerprint).fingerprint)
+            self.curated["Berlin"]="Q64"
+            self.assertIsNone(LocationAliasIndex.load(indexFile,LocationAliasIndex.getFingerprint(cityDataFile,self.curated)))
+            with open(cityDataFile,"a") as cityData:
+                cityData.write(" and more cities")
+            self.assertIsNone(LocationAliasIndex.load(indexFile,LocationAliasIndex.getFingerprint(cityDataFile,self.curated)))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
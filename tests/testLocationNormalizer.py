@@ -0,0 +1,107 @@
+import unittest
+from geograpy.locator import City, Region, Country
+from lodstorage.sql import SQLDB
+from corpus.locationnormalizer import LocationNormalizer
+
+class StubLocationLookup(object):
+    '''
+    location lookup with fixed resolutions instead of the geograpy3 data and the geocoder
+    '''
+
+    def __init__(self,resolutions:dict):
+        '''
+        constructor
+
+        Args:
+            resolutions(dict): map of location texts to locations
+        '''
+        self.resolutions=resolutions
+        self.cacheStats={}
+
+    def lookupMany(self,locationTexts:list,withCache:bool=True)->dict:
+        distinct=list(dict.fromkeys(locationTexts))
+        self.cacheStats={"distinct":len(distinct),"hits":0,"misses":len(distinct)}
+        return {text:self.resolutions.get(text) for text in distinct}
+
+class TestLocationNormalizer(unittest.TestCase):
+    '''
+    test the location normalizer without the network
+    '''
+
+    def setUp(self):
+        self.debug=False
+        china=Country(name="China",wikidataid="Q148",iso="CN")
+        usa=Country(name="United States of America",wikidataid="Q30",iso="US")
+        beijing=City(name="Beijing",wikidataid="Q956")
+        beijing.country=china
+        beijing.region=Region(name="Beijing",wikidataid="Q956",iso="CN-BJ")
+        california=Region(name="California",wikidataid="Q99",iso="US-CA")
+        california.country=usa
+        germany=Country(name="Germany",wikidataid="Q183",iso="DE")
+        self.locationLookup=StubLocationLookup({
+            "Beijing, China":beijing,
+            "Bay Area, USA":california,
+            "Germany":germany
+        })
+
+    def testNormalize(self):
+        '''
+        test that the normalization fills the location columns and keeps the values of the source
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_confref (eventId TEXT,city TEXT,country TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_confref VALUES (?,?,?)",[("c1","Beijing","China"),("c2","Bay Area","USA"),("c3",None,"Germany"),("c4","Atlantis",None)])
+        sqlDB.execute("CREATE TABLE event_wikicfp (eventId TEXT,locality TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_wikicfp VALUES (?,?)",[("w1","Beijing, China"),("w2",None)])
+        sqlDB.c.commit()
+        normalizer=LocationNormalizer(sqlDB,locationLookup=self.locationLookup,debug=self.debug)
+        stats=normalizer.normalize(["event_confref","event_wikicfp"])
+        self.assertEqual(3,stats["event_confref"]["updated"])
+        self.assertEqual(1,stats["event_wikicfp"]["updated"])
+        records=sqlDB.query("SELECT eventId,city,cityWikidataid,region,country,countryIso FROM event_confref ORDER BY eventId")
+        if self.debug:
+            print(records)
+        self.assertEqual({"eventId":"c1","city":"Beijing","cityWikidataid":"Q956","region":"Beijing","country":"China","countryIso":"CN"},records[0])
+        # a region does not replace the raw city
+        self.assertEqual({"eventId":"c2","city":"Bay Area","cityWikidataid":None,"region":"California","country":"USA","countryIso":"US"},records[1])
+        self.assertEqual({"eventId":"c3","city":None,"cityWikidataid":None,"region":None,"country":"Germany","countryIso":"DE"},records[2])
+        self.assertIsNone(records[3]["countryIso"])
+        records=sqlDB.query("SELECT eventId,locationText,city,country FROM event_wikicfp ORDER BY eventId")
+        self.assertEqual({"eventId":"w1","locationText":"Beijing, China","city":"Beijing","country":"China"},records[0])
+        self.assertIsNone(records[1]["city"])
+        # a forced update resolves all events again but still keeps the values of the source
+        sanFrancisco=City(name="San Francisco",wikidataid="Q62")
+        sanFrancisco.region=self.locationLookup.resolutions["Bay Area, USA"]
+        sanFrancisco.country=sanFrancisco.region.country
+        self.locationLookup.resolutions["Bay Area, USA"]=sanFrancisco
+        stats=normalizer.normalize(["event_confref"],forceUpdate=True)
+        self.assertEqual(4,stats["event_confref"]["distinct"])
+        records=sqlDB.query("SELECT eventId,city,cityWikidataid,region,country FROM event_confref ORDER BY eventId")
+        self.assertEqual({"eventId":"c2","city":"Bay Area","cityWikidataid":"Q62","region":"California","country":"USA"},records[1])
+
+    def testUpdateStatement(self):
+        '''
+        test that the join and the correlated subquery fallback for SQLite < 3.33 update the same events
+        '''
+        resolutionTable=LocationNormalizer.resolutionTableName
+        results=[]
+        for withJoin in [True,False]:
+            sqlDB=SQLDB()
+            sqlDB.execute("CREATE TABLE event_confref (eventId TEXT,locationText TEXT,city TEXT,cityWikidataid TEXT,locationWikidataid TEXT)")
+            sqlDB.c.executemany("INSERT INTO event_confref VALUES (?,?,?,?,?)",[("c1","Beijing, China",None,None,None),("c2","Bay Area, USA","Bay Area",None,None),("c3","Atlantis",None,None,None)])
+            sqlDB.execute(f"CREATE TEMP TABLE {resolutionTable} (locationText TEXT PRIMARY KEY,locationWikidataid TEXT,city TEXT,cityWikidataid TEXT)")
+            sqlDB.c.executemany(f"INSERT INTO {resolutionTable} VALUES (?,?,?,?)",[("Beijing, China","Q956","Beijing","Q956"),("Bay Area, USA","Q62","San Francisco","Q62")])
+            updateSql=LocationNormalizer.getUpdateStatement("event_confref",["locationWikidataid","city","cityWikidataid"]," AND event_confref.locationWikidataid IS NULL",withJoin=withJoin)
+            if self.debug:
+                print(updateSql)
+            self.assertEqual(withJoin,"SET locationWikidataid=r.locationWikidataid" in updateSql)
+            cursor=sqlDB.c.execute(updateSql)
+            self.assertEqual(2,cursor.rowcount)
+            results.append(sqlDB.query("SELECT * FROM event_confref ORDER BY eventId"))
+        self.assertEqual(results[0],results[1])
+        self.assertEqual({"eventId":"c2","locationText":"Bay Area, USA","city":"Bay Area","cityWikidataid":"Q62","locationWikidataid":"Q62"},results[0][1])
+        self.assertIsNone(results[0][2]["locationWikidataid"])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
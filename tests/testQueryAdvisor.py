@@ -0,0 +1,79 @@
+import unittest
+from lodstorage.query import Query
+from lodstorage.sql import SQLDB
+from corpus.queryadvisor import QueryAdvisor
+
+class TestQueryAdvisor(unittest.TestCase):
+    '''
+    test the EXPLAIN based index advisor for the query catalog
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=SQLDB()
+        self.createTable()
+        self.queries=[
+            Query("Crossref top 50 locations","""select count(*),location
+from event_crossref
+where location is not null
+group by location
+order by  1 desc
+limit 50""",lang="sql"),
+            Query("Crossref year","select title from event_crossref where year=2020",lang="sql"),
+            Query("Crossref Schema","pragma table_info('event_crossref');",lang="sql"),
+            Query("Missing table","select * from event_CEURWS",lang="sql")
+        ]
+
+    def createTable(self):
+        '''
+        create the crossref test table
+        '''
+        self.sqlDB.execute("CREATE TABLE event_crossref (eventId TEXT,title TEXT,location TEXT,year INTEGER,number TEXT)")
+        self.sqlDB.c.executemany("INSERT INTO event_crossref VALUES (?,?,?,?,?)",[(f"e{i}",f"Conference {i}",f"City {i%300}" if i%7 else None,1990+i%30,str(i%60)) for i in range(20000)])
+        self.sqlDB.c.commit()
+
+    def testAdvise(self):
+        '''
+        test the analysis, index proposals and before/after benchmark
+        '''
+        advisor=QueryAdvisor(self.sqlDB,self.queries,repeat=1,debug=self.debug)
+        top50=advisor.analyze(self.queries[0])
+        self.assertEqual(["event_crossref"],top50["scans"])
+        self.assertEqual([("event_crossref",["location"])],advisor.proposeIndexes(self.queries[0],top50["scans"]))
+        self.assertEqual([("event_crossref",["year"])],advisor.proposeIndexes(self.queries[1],["event_crossref"]))
+        report=advisor.advise(createIndexes=True)
+        if self.debug:
+            print(QueryAdvisor.asReport(report))
+        self.assertEqual("not a select statement",report[2]["error"])
+        self.assertTrue("no such table" in report[3]["error"])
+        for record in report[:2]:
+            self.assertEqual("event_crossref",record["scans"])
+            self.assertEqual("",record["scans after"])
+        self.assertEqual("idx_event_crossref_year",report[1]["indexes used after"])
+        # reloading the source table drops the indexes
+        self.sqlDB.execute("DROP TABLE event_crossref")
+        self.createTable()
+        restored=QueryAdvisor.restoreIndexes(self.sqlDB)
+        self.assertEqual(["idx_event_crossref_location","idx_event_crossref_year"],sorted(restored))
+        self.assertEqual([],advisor.analyze(self.queries[1])["scans"])
+
+    def testProposeIndexes(self):
+        '''
+        test that only the predicate, grouping and ordering columns are proposed unless the index should be covering
+        '''
+        advisor=QueryAdvisor(self.sqlDB,[],debug=self.debug)
+        coveringAdvisor=QueryAdvisor(self.sqlDB,[],covering=True,debug=self.debug)
+        for sql,expected,expectedCovering in [
+            ("select title from event_crossref where year=2020",["year"],["year","title"]),
+            # select list expressions, their aliases and string literals are no index columns
+            ("select e.title,upper(e.location) as number from event_crossref e where e.year=2020 and e.eventId<>'title' order by number",["year","eventId"],["year","eventId","title","location"]),
+            # columns of other tables are left out and joins get no covering index
+            ("select a.title from event_crossref AS a join event_crossref_other b on a.eventId=b.eventId where b.year=2020 order by a.number",["number"],["number"])
+        ]:
+            query=Query("test",sql,lang="sql")
+            self.assertEqual([("event_crossref",expected)],advisor.proposeIndexes(query,["event_crossref"]),sql)
+            self.assertEqual([("event_crossref",expectedCovering)],coveringAdvisor.proposeIndexes(query,["event_crossref"]),sql)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import os
+import tempfile
+import time
+from corpus.cachemeta import SourceMeta, TableMeta
+from corpus.event import EventStorage
+from corpus.queryservice import QueryService
+
+class TestQueryService(unittest.TestCase):
+    '''
+    test the read-only query service
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.tmpDir=tempfile.TemporaryDirectory()
+        self.dbFile=os.path.join(self.tmpDir.name,"EventCorpus.db")
+        sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        sqlDB.execute("CREATE TABLE event_test (eventId TEXT,acronym TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?,?)",[(f"e{i}",f"CONF{i%500}",1990+i%30) for i in range(50000)])
+        sqlDB.c.commit()
+        SourceMeta.recordLoad(sqlDB,"test",50000,0,None,0.0)
+        self.queryService=QueryService(cacheFile=self.dbFile)
+
+    def tearDown(self):
+        EventStorage.closeConnections()
+        self.tmpDir.cleanup()
+
+    def testNormalizeQuery(self):
+        '''
+        test the normalization of queries for the cache key
+        '''
+        self.assertEqual("SELECT * FROM event",QueryService.normalizeQuery("  SELECT *\n  FROM event;\n"))
+        # whitespace in literals is kept and comments are removed
+        self.assertEqual("SELECT * FROM event WHERE title='A  B'",QueryService.normalizeQuery("SELECT * FROM event -- all\nWHERE title='A  B'"))
+        self.assertNotEqual(QueryService.normalizeQuery("SELECT * FROM event WHERE title='A B'"),QueryService.normalizeQuery("SELECT * FROM event WHERE title='A  B'"))
+
+    def testOriginalQuery(self):
+        '''
+        test that the original query is executed
+        '''
+        sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        sqlDB.execute("UPDATE event_test SET acronym='A  B' WHERE eventId='e1'")
+        sqlDB.c.commit()
+        query="SELECT eventId FROM event_test -- the spaced acronym\nWHERE acronym='A  B'"
+        for offset,limit in [(0,None),(0,10)]:
+            lod=self.queryService.query(query,offset=offset,limit=limit)
+            self.assertEqual([{"eventId":"e1"}],lod)
+        self.assertEqual([],self.queryService.query("SELECT eventId FROM event_test WHERE acronym='A B'"))
+
+    def testCaching(self):
+        '''
+        test cached versus uncached query latency
+        '''
+        query="""SELECT acronym,count(*) AS count,min(year) AS minYear
+FROM event_test
+GROUP BY acronym
+ORDER BY 2 DESC"""
+        startTime=time.time()
+        lod=self.queryService.query(query)
+        uncached=time.time()-startTime
+        startTime=time.time()
+        for _i in range(100):
+            cachedLod=self.queryService.query(query)
+        cached=(time.time()-startTime)/100
+        if self.debug:
+            print(f"uncached: {uncached*1000:.2f} ms cached: {cached*1000:.3f} ms")
+        self.assertEqual(500,len(lod))
+        self.assertEqual(lod,cachedLod)
+        # callers get a copy of the cached result
+        cachedLod[0]["acronym"]="changed"
+        self.assertEqual(lod[0]["acronym"],self.queryService.query(query)[0]["acronym"])
+        self.assertEqual(1,self.queryService.misses)
+        self.assertEqual(101,self.queryService.hits)
+        # reloading a source invalidates the cache
+        SourceMeta.recordLoad(EventStorage.getSqlDB(cacheFile=self.dbFile),"test",50000,0,None,0.0)
+        self.assertEqual(lod,self.queryService.query(query))
+        self.assertEqual(2,self.queryService.misses)
+        # changes of tables recorded by the write paths invalidate the cache as well
+        TableMeta.recordChange(EventStorage.getSqlDB(cacheFile=self.dbFile),"event_test")
+        self.queryService.query(query)
+        self.assertEqual(3,self.queryService.misses)
+
+    def testPagination(self):
+        '''
+        test paging and streaming of large results
+        '''
+        query="SELECT eventId FROM event_test ORDER BY rowid"
+        page=self.queryService.query(query,offset=100,limit=10)
+        self.assertEqual(10,len(page))
+        self.assertEqual("e100",page[0]["eventId"])
+        total=0
+        for batch in self.queryService.stream(query,batchSize=5000).batches():
+            self.assertTrue(len(batch)<=5000)
+            total+=len(batch)
+        self.assertEqual(50000,total)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import io
+import json
+import tracemalloc
+from lodstorage.csv import CSV
+from lodstorage.query import Query
+from lodstorage.sql import SQLDB
+from tabulate import tabulate
+from corpus.querystream import QueryStream, QueryStreamWriter
+
+class TestQueryStream(unittest.TestCase):
+    '''
+    test streaming query results
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=SQLDB()
+        self.sqlDB.execute("CREATE TABLE event (eventId TEXT,acronym TEXT,year INTEGER)")
+        self.sqlDB.c.executemany("INSERT INTO event VALUES (?,?,?)",[(f"e{i}",f"CONF {2000+i%10}",2000+i%10) for i in range(1,10)])
+        self.sqlDB.c.commit()
+
+    def testRowFormats(self):
+        '''
+        test the different row formats and batching
+        '''
+        query="SELECT * FROM event ORDER BY eventId"
+        batches=list(QueryStream(self.sqlDB,query,batchSize=4).batches())
+        self.assertEqual([4,4,1],[len(batch) for batch in batches])
+        self.assertEqual({"eventId":"e1","acronym":"CONF 2001","year":2001},batches[0][0])
+        rows=list(QueryStream(self.sqlDB,query,rowFormat="tuple"))
+        self.assertEqual(("e1","CONF 2001",2001),rows[0])
+        rows=list(QueryStream(self.sqlDB,query,rowFormat="namedtuple"))
+        self.assertEqual(2001,rows[0].year)
+        with self.assertRaises(Exception):
+            QueryStream(self.sqlDB,query,rowFormat="xml")
+        self.assertEqual(["eventId","acronym","year"],QueryStream(self.sqlDB,query).getColumns())
+
+    def testWriters(self):
+        '''
+        test that the streamed output is the same as the output for the whole list of dicts
+        '''
+        query="SELECT * FROM event ORDER BY eventId"
+        lod=self.sqlDB.query(query)
+        csvFile=io.StringIO()
+        QueryStreamWriter.writeCsv(QueryStream(self.sqlDB,query,batchSize=2),csvFile)
+        self.assertEqual(CSV.toCSV(lod),csvFile.getvalue())
+        jsonFile=io.StringIO()
+        count=QueryStreamWriter.writeJsonLines(QueryStream(self.sqlDB,query,batchSize=2),jsonFile)
+        self.assertEqual(9,count)
+        self.assertEqual(lod,[json.loads(line) for line in jsonFile.getvalue().splitlines()])
+        for tablefmt in ["mediawiki","github","latex"]:
+            tableFile=io.StringIO()
+            QueryStreamWriter.writeTable(QueryStream(self.sqlDB,query,batchSize=2),tableFile,tablefmt=tablefmt)
+            expected=tabulate(lod,headers="keys",tablefmt=tablefmt)+"\n"
+            self.assertEqual(expected,tableFile.getvalue(),tablefmt)
+        docFile=io.StringIO()
+        QueryStreamWriter.documentQueryResult(Query("events",query,lang="sql"),QueryStream(self.sqlDB,query),docFile)
+        self.assertTrue(docFile.getvalue().startswith("== events =="))
+
+    def testConstantMemory(self):
+        '''
+        test that streaming does not materialize the whole result
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event (eventId TEXT,title TEXT)")
+        sqlDB.c.executemany("INSERT INTO event VALUES (?,?)",[(f"e{i}",f"Conference {i}") for i in range(100000)])
+        query="SELECT * FROM event"
+        peaks={}
+        for mode in ["lod","stream"]:
+            tracemalloc.start()
+            if mode=="lod":
+                CSV.toCSV(sqlDB.query(query))
+            else:
+                QueryStreamWriter.writeCsv(QueryStream(sqlDB,query),io.StringIO())
+            _current,peaks[mode]=tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if self.debug:
+            print(peaks)
+        self.assertTrue(peaks["stream"]<peaks["lod"])
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import tempfile
+import time
+from corpus.event import EventStorage
+from corpus.quality.ratingengine import RatingEngine
+
+class TestRatingEngine(unittest.TestCase):
+    '''
+    test rating the event tables with the rules of the RatingEngine
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.tmpDir=tempfile.TemporaryDirectory()
+        self.dbFile=os.path.join(self.tmpDir.name,"EventCorpus.db")
+
+    def tearDown(self):
+        EventStorage.closeConnections()
+        self.tmpDir.cleanup()
+
+    def testRules(self):
+        '''
+        test the single rules and re-rating a source
+        '''
+        sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        sqlDB.execute("CREATE TABLE event_wikicfp (eventId TEXT,acronym TEXT,startDate TEXT,endDate TEXT,locality TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_wikicfp VALUES (?,?,?,?,?)",[
+            ("1","ISWC 2019","2019-10-26","2019-10-30","Auckland, New Zealand"),
+            ("2","ISWC 2019","2019-10-26","2019-10-20","Auckland, New Zealand"),
+            # localities with a numeric prefix are legitimate e.g. street addresses
+            ("3","WWW 2020","2020-01-01","2020-01-02","10 Downing Street, London"),
+            ("4","AAAI 2020",None,None,None)
+        ])
+        # gnd has no date columns
+        sqlDB.execute("CREATE TABLE event_gnd (eventId TEXT,title TEXT,location TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_gnd VALUES (?,?,?)",[("g1","Tagung",None),("g2","Konferenz","Berlin")])
+        sqlDB.c.commit()
+        engine=RatingEngine(cacheFile=self.dbFile,debug=self.debug)
+        counts=engine.run()
+        self.assertEqual({"event_wikicfp":5,"event_gnd":1},counts)
+        ratings=sqlDB.query("SELECT * FROM ratings ORDER BY source,entityId,pain")
+        if self.debug:
+            for rating in ratings:
+                print(rating)
+        self.assertEqual([
+            ("gnd","g1","❌","location missing"),
+            ("wikicfp","1","👎","duplicate acronym ISWC 2019"),
+            ("wikicfp","2","👎","duplicate acronym ISWC 2019"),
+            ("wikicfp","2","👎","endDate 2019-10-20 before startDate 2019-10-26"),
+            ("wikicfp","4","❌","location missing"),
+            ("wikicfp","4","❌","startDate missing")
+        ],[(rating["source"],rating["entityId"],rating["reason"],rating["hint"]) for rating in ratings])
+        # re-rating a single source replaces its ratings only
+        sqlDB.execute("UPDATE event_wikicfp SET startDate='2020-02-02' WHERE eventId='4'")
+        sqlDB.c.commit()
+        counts=engine.run(["event_wikicfp"])
+        self.assertEqual({"event_wikicfp":4},counts)
+        self.assertEqual(5,sqlDB.query("SELECT count(*) AS count FROM ratings")[0]["count"])
+
+    def testPerformance(self):
+        '''
+        test rating several large event tables
+        '''
+        sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        size=100000
+        sourceTables=[f"event_source{s}" for s in range(4)]
+        for tableName in sourceTables:
+            sqlDB.execute(f"CREATE TABLE {tableName} (eventId TEXT,acronym TEXT,startDate TEXT,endDate TEXT,locality TEXT)")
+            sqlDB.c.executemany(f"INSERT INTO {tableName} VALUES (?,?,?,?,?)",[
+                (f"e{i}",f"C{i%(size//2)} {1990+i%30}",f"{1990+i%30}-01-0{1+i%9}" if i%10 else None,f"{1990+i%30}-01-05",f"{i%10} City" if i%4 else None)
+                for i in range(size)
+            ])
+        sqlDB.c.commit()
+        startTime=time.time()
+        counts=RatingEngine(cacheFile=self.dbFile,debug=self.debug).run(sourceTables)
+        elapsed=time.time()-startTime
+        if self.debug:
+            print(f"rating {len(sourceTables)*size} events took {elapsed:5.1f} s")
+        self.assertEqual(len(sourceTables),len(counts))
+        total=sqlDB.query("SELECT count(*) AS count FROM ratings")[0]["count"]
+        self.assertEqual(sum(counts.values()),total)
+        self.assertTrue(elapsed<10)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
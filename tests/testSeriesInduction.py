@@ -0,0 +1,100 @@
+import unittest
+import time
+from lodstorage.sql import SQLDB
+from corpus.seriesinduction import SeriesInduction
+from corpus.normalizer import EventNormalizer
+
+class TestSeriesInduction(unittest.TestCase):
+    '''
+    test inducing event series from event tables
+    '''
+
+    def setUp(self):
+        self.debug=False
+
+    def testNormalizer(self):
+        '''
+        test the series acronym and title template normalization
+        '''
+        for acronym,expected in [("SIGMIS CPR '06","SIGMIS CPR"),("ISWC 2019","ISWC"),("18th AAAI-2020","AAAI"),("2019",None),(None,None)]:
+            self.assertEqual(expected,EventNormalizer.getSeriesAcronym(acronym),acronym)
+        for title,expected in [
+            ("Proceedings of the 18th ISWC 2019","Proceedings of the {ordinal} ISWC {year}"),
+            ("Twelfth  AAAI Conference '20","{ordinal} AAAI Conference {year}"),
+            (None,None)
+        ]:
+            self.assertEqual(expected,EventNormalizer.getTitleTemplate(title),title)
+
+    def testInduce(self):
+        '''
+        test inducing the series of crossref, gnd and confref like event tables
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_crossref (eventId TEXT,acronym TEXT,title TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO event_crossref VALUES (?,?,?,?)",[
+            ("10.1145/1125170","SIGMIS CPR '06","Proceedings of the 2006 ACM SIGMIS CPR conference",2006),
+            ("10.1145/1355238","SIGMIS CPR '08","Proceedings of the 2008 ACM SIGMIS CPR conference",2008),
+            ("10.1145/1542130","SIGMIS-CPR 2009","Proceedings of the special interest group on management information system's 47th annual conference",2009),
+            ("10.1145/3340531",None,"Proceedings of the 28th ACM International Conference on Information and Knowledge Management",2019)
+        ])
+        seriesList=SeriesInduction.induce(sqlDB,"event_crossref","crossref")
+        if self.debug:
+            for series in seriesList:
+                print(series)
+        self.assertEqual(2,len(seriesList))
+        sigmis=seriesList[1]
+        self.assertEqual({
+            "eventSeriesId":"sigmis cpr",
+            "acronym":"SIGMIS CPR",
+            "title":"Proceedings of the {year} ACM SIGMIS CPR conference",
+            "count":3,
+            "minYear":2006,
+            "maxYear":2009,
+            "source":"crossref"
+        },sigmis)
+        # without an acronym the normalized title is the key
+        self.assertEqual("proceedings of the acm international conference on information and knowledge management",seriesList[0]["eventSeriesId"])
+        # gnd has no year and no acronym column
+        sqlDB.execute("CREATE TABLE event_gnd (eventId TEXT,title TEXT,date TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_gnd VALUES (?,?,?)",[
+            ("1","Internationale Konferenz Wissensmanagement","1999"),
+            ("2","Internationale Konferenz Wissensmanagement","2001"),
+            ("3","Tagung Datenbanksysteme",None)
+        ])
+        seriesList=SeriesInduction.induce(sqlDB,"event_gnd","gnd")
+        self.assertEqual([(2,1999,2001),(1,None,None)],[(series["count"],series["minYear"],series["maxYear"]) for series in seriesList])
+        self.assertEqual([None,None],[series["acronym"] for series in seriesList])
+        # confref has its own series key
+        sqlDB.execute("CREATE TABLE event_confref (eventId TEXT,acronym TEXT,title TEXT,year INTEGER,dblpSeriesId TEXT,seriesTitle TEXT)")
+        sqlDB.c.executemany("INSERT INTO event_confref VALUES (?,?,?,?,?,?)",[
+            ("btw2019","BTW 2019","BTW 2019",2019,"conf/btw","Datenbanksysteme für Business, Technologie und Web"),
+            ("btw2017","BTW 2017","BTW 2017",2017,"conf/btw","Datenbanksysteme für Business, Technologie und Web"),
+            ("x2017","X 2017","X 2017",2017,None,None)
+        ])
+        seriesList=SeriesInduction.induce(sqlDB,"event_confref","confref",seriesKey="dblpSeriesId",title="seriesTitle")
+        self.assertEqual([("conf/btw","BTW","Datenbanksysteme für Business, Technologie und Web",2,2017,2019)],[(series["eventSeriesId"],series["acronym"],series["title"],series["count"],series["minYear"],series["maxYear"]) for series in seriesList])
+        try:
+            SeriesInduction.induce(sqlDB,"event_missing","missing")
+            self.fail("missing event table should raise an exception")
+        except Exception as ex:
+            self.assertTrue("event_missing" in str(ex))
+
+    def testPerformance(self):
+        '''
+        test the induction time for a large event table
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_test (eventId TEXT,acronym TEXT,title TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?,?,?)",[(f"e{i}",f"C{i%5000} {1990+i%30}",f"Proceedings of the {i//5000+1}th Conference C{i%5000} {1990+i%30}",1990+i%30) for i in range(100000)])
+        startTime=time.time()
+        seriesList=SeriesInduction.induce(sqlDB,"event_test","test")
+        elapsed=time.time()-startTime
+        if self.debug:
+            print(f"inducing {len(seriesList)} series took {elapsed:5.1f} s")
+        self.assertEqual(5000,len(seriesList))
+        self.assertEqual(20,seriesList[0]["count"])
+        self.assertTrue(elapsed<5)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import gc
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from lodstorage.sql import SQLDB
+from corpus.event import EventStorage
+from corpus.sqlpool import ConnectionPool
+
+class TestSqlPool(unittest.TestCase):
+    '''
+    test the pooled connections of the EventStorage
+    '''
+
+    def setUp(self):
+        self.tmpDir=tempfile.TemporaryDirectory()
+        self.dbFile=os.path.join(self.tmpDir.name,"EventCorpus.db")
+        sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        sqlDB.execute("CREATE TABLE event_test (eventId TEXT,year INTEGER)")
+        sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?)",[(f"e{i}",2000+i%20) for i in range(1000)])
+        sqlDB.c.commit()
+
+    def tearDown(self):
+        EventStorage.closeConnections()
+        self.tmpDir.cleanup()
+
+    def testConnectionReuse(self):
+        '''
+        test that connections are reused and not closed by callers
+        '''
+        writer=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        writer.close()
+        self.assertIs(writer.c,EventStorage.getSqlDB(cacheFile=self.dbFile).c)
+        reader=EventStorage.getSqlDB(readOnly=True,cacheFile=self.dbFile)
+        self.assertIsNot(writer.c,reader.c)
+        self.assertIs(reader.c,EventStorage.getSqlDB(readOnly=True,cacheFile=self.dbFile).c)
+        with self.assertRaises(sqlite3.OperationalError):
+            reader.execute("DELETE FROM event_test")
+        # there is no writable fallback for missing database files
+        missingFile=os.path.join(self.tmpDir.name,"Missing.db")
+        reader=EventStorage.getSqlDB(readOnly=True,cacheFile=missingFile)
+        self.assertEqual([],reader.query("SELECT name FROM sqlite_master"))
+        with self.assertRaises(sqlite3.OperationalError):
+            reader.execute("CREATE TABLE event_test (eventId TEXT)")
+        self.assertFalse(os.path.isfile(missingFile))
+
+    def testConcurrentReaders(self):
+        '''
+        test concurrent queries from several threads
+        '''
+        def query(year):
+            sqlDB=EventStorage.getSqlDB(readOnly=True,cacheFile=self.dbFile)
+            lod=sqlDB.query("SELECT count(*) AS count FROM event_test WHERE year=?",(year,))
+            return id(sqlDB.c),lod[0]["count"]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results=list(executor.map(query,[2000+i%20 for i in range(200)]))
+        for _connectionId,count in results:
+            self.assertEqual(50,count)
+        connectionIds=set([connectionId for connectionId,_count in results])
+        self.assertTrue(len(connectionIds)<=4)
+        pool=EventStorage.connectionPools[self.dbFile]
+        # the read-only connections of the ended threads are closed
+        gc.collect()
+        self.assertEqual(0,pool.getReaderCount())
+        for _i in range(10):
+            thread=threading.Thread(target=query,args=(2000,))
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(0,pool.getReaderCount())
+        EventStorage.getSqlDB(readOnly=True,cacheFile=self.dbFile)
+        self.assertEqual(1,pool.getReaderCount())
+
+    def testConcurrentWrites(self):
+        '''
+        test multi statement writes of several threads on the shared writer
+        '''
+        def write(year):
+            sqlDB=EventStorage.getSqlDB(cacheFile=self.dbFile)
+            with ConnectionPool.getWriteLock(sqlDB):
+                sqlDB.c.execute("DELETE FROM event_test WHERE year=?",(year,))
+                sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?)",[(f"n{year}-{i}",year) for i in range(100)])
+                sqlDB.c.commit()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(write,[2000+i%20 for i in range(100)]))
+        sqlDB=EventStorage.getSqlDB(readOnly=True,cacheFile=self.dbFile)
+        self.assertEqual(2000,sqlDB.query("SELECT count(*) AS count FROM event_test")[0]["count"])
+        # queries of the writer use cursors that take the write lock as well
+        writer=EventStorage.getSqlDB(cacheFile=self.dbFile)
+        self.assertEqual(2000,writer.query("SELECT count(*) AS count FROM event_test")[0]["count"])
+        self.assertEqual(2000,len(list(writer.c.cursor().execute("SELECT eventId FROM event_test"))))
+        self.assertTrue(isinstance(ConnectionPool.getWriteLock(SQLDB()),nullcontext))
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import time
+from lodstorage.sql import SQLDB
+from corpus.titleindex import TitleIndex
+
+class TestTitleIndex(unittest.TestCase):
+    '''
+    test the trigram title index
+    '''
+
+    def setUp(self):
+        self.debug=False
+        self.sqlDB=SQLDB()
+        self.sqlDB.execute("CREATE TABLE event_dblp (eventId TEXT,title TEXT,year INTEGER)")
+        self.sqlDB.execute("CREATE TABLE event_crossref (eventId TEXT,title TEXT)")
+        self.sqlDB.execute("CREATE TABLE event_wikicfp (eventId TEXT,title TEXT,year INTEGER)")
+        self.sqlDB.c.executemany("INSERT INTO event_dblp VALUES (?,?,?)",[
+            ("conf/semweb/2019-1","The Semantic Web - ISWC 2019 - 18th International Semantic Web Conference",2019),
+            ("conf/semweb/2020-1","The Semantic Web - ISWC 2020 - 19th International Semantic Web Conference",2020),
+            ("conf/vldb/2019","Proceedings of the VLDB Endowment",2019)
+        ])
+        self.sqlDB.c.executemany("INSERT INTO event_crossref VALUES (?,?)",[
+            ("10.1007/978-3-030-30793-6","Lecture Notes in Computer Science - The Semantic Web – ISWC 2019")
+        ])
+        self.sqlDB.c.executemany("INSERT INTO event_wikicfp VALUES (?,?,?)",[
+            ("1","International Semantic Web Conference",2019),
+            ("2","Very Large Data Bases",2019)
+        ])
+        self.sqlDB.c.commit()
+
+    def testTrigrams(self):
+        '''
+        test the trigrams of a title
+        '''
+        self.assertEqual({" we","web","eb "},TitleIndex.getTrigrams("The Web 2019"))
+        self.assertEqual(set(),TitleIndex.getTrigrams(None))
+
+    def testSearch(self):
+        '''
+        test searching similar titles with year and source filters
+        '''
+        titleIndex=TitleIndex(self.sqlDB,debug=self.debug)
+        self.assertFalse(titleIndex.isIndexed())
+        self.assertEqual(6,titleIndex.update())
+        self.assertTrue(titleIndex.isIndexed())
+        title="Proceedings of the 18th International Semantic Web Conference ISWC 2019"
+        result=titleIndex.search(title)
+        if self.debug:
+            for record in result:
+                print(record)
+        self.assertEqual(4,len(result))
+        self.assertEqual(("event_dblp","conf/semweb/2019-1",1.0),(result[0]["sourceTable"],result[0]["eventId"],result[0]["score"]))
+        self.assertTrue(result[0]["score"]>=result[-1]["score"])
+        result=titleIndex.search(title,year=2019,sources=["event_dblp","event_crossref"])
+        self.assertEqual([("event_dblp","conf/semweb/2019-1"),("event_crossref","10.1007/978-3-030-30793-6")],[(record["sourceTable"],record["eventId"]) for record in result])
+        # the year of crossref is derived from the title
+        self.assertEqual(2019,result[1]["year"])
+        self.assertEqual([],titleIndex.search("Very Large Data Bases",sources=["event_crossref"],minScore=0.5))
+        # incremental update of a single source
+        self.sqlDB.execute("INSERT INTO event_wikicfp VALUES ('3','International Semantic Web Conference',2021)")
+        self.assertEqual(3,titleIndex.update(["event_wikicfp"]))
+        result=titleIndex.search("Semantic Web Conference",year=2021)
+        self.assertEqual([("event_wikicfp","3")],[(record["sourceTable"],record["eventId"]) for record in result])
+        # the persisted index can be reused
+        self.assertEqual(6,len(TitleIndex(self.sqlDB).search("Semantic Web Conference Data",limit=100)))
+
+    def testPerformance(self):
+        '''
+        test the search time once the index is warm
+        '''
+        sqlDB=SQLDB()
+        sqlDB.execute("CREATE TABLE event_test (eventId TEXT,title TEXT,year INTEGER)")
+        topics=["Semantic Web","Data Engineering","Software Engineering","Information Systems","Machine Learning","Databases","Robotics","Computer Vision"]
+        sqlDB.c.executemany("INSERT INTO event_test VALUES (?,?,?)",[(f"e{i}",f"Proceedings of the Conference on {topics[i%8]} Topic{i%5000} {1990+i%30}",1990+i%30) for i in range(50000)])
+        titleIndex=TitleIndex(sqlDB)
+        titleIndex.update()
+        titleIndex.search("Semantic Web Topic8")
+        startTime=time.time()
+        for i in range(100):
+            result=titleIndex.search(f"{topics[i%8]} Topic{i}",limit=5,year=1990+i%30)
+            self.assertEqual(f"Proceedings of the Conference on {topics[i%8]} Topic{i} {1990+i%30}",result[0]["title"])
+        elapsed=(time.time()-startTime)/100
+        if self.debug:
+            print(f"title search took {elapsed*1000:.3f} ms")
+        self.assertTrue(elapsed<0.05)
+
+if __name__ == "__main__":
+    #import sys;sys.argv = ['', 'Test.testName']
+    unittest.main()